@@ -0,0 +1,195 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import PIL
+
+from benchmarks.suite import all_benchmarks, BenchmarkSkipped
+
+# The least time each repeat runs for, a benchmark's function is called as many times as that takes.
+MIN_REPEAT_TIME = 0.2
+DEFAULT_REPEATS = 5
+# How much slower than its baseline a benchmark can be before it counts as a regression, as a fraction.
+DEFAULT_THRESHOLD = 0.1
+
+parser = argparse.ArgumentParser(description='Py Minutiae Viewer benchmarks')
+parser.add_argument('-k', '--filter', nargs='+', dest='filter',
+                    metavar='PATTERN',
+                    help='Only runs the benchmarks whose names match one of the glob PATTERNs, e.g. "read.*" or '
+                         '"*.large".')
+parser.add_argument('-o', '--output', dest='output',
+                    metavar='RESULTS_FILE',
+                    help='Saves the results as JSON, to be used as the baseline of a later run.')
+parser.add_argument('-c', '--compare', dest='compare',
+                    metavar='BASELINE_FILE',
+                    help='Compares the median times with a baseline saved by --output, exiting with 1 if any '
+                         'benchmark is slower than the threshold allows.')
+parser.add_argument('--results', dest='results',
+                    metavar='RESULTS_FILE',
+                    help='Compares saved results with the baseline instead of running the benchmarks.')
+parser.add_argument('-r', '--repeats', type=int, dest='repeats', default=DEFAULT_REPEATS,
+                    metavar='N',
+                    help='The number of times each benchmark is timed.')
+parser.add_argument('-t', '--threshold', type=float, dest='threshold', default=DEFAULT_THRESHOLD,
+                    metavar='FRACTION',
+                    help='How much slower than the baseline a benchmark may be, e.g. 0.1 for 10%%.')
+parser.add_argument('-l', '--list', action='store_true', dest='list',
+                    help='Lists the benchmarks without running them.')
+
+
+def time_function(function: Callable, repeats: int) -> dict:
+    """
+    Times a function. It is called once to warm up, then each repeat calls it enough times to take MIN_REPEAT_TIME.
+    :param function: The function.
+    :param repeats: The number of repeats.
+    :return: The median, minimum, mean and standard deviation of the seconds per call, and how it was timed.
+    """
+    function()
+
+    loops = 1
+    while True:
+        elapsed = _time_loops(function, loops)
+        if elapsed >= MIN_REPEAT_TIME:
+            break
+        # Aim past the minimum time so that one more calibration is usually enough:
+        loops = max(loops * 2, int(loops * 1.2 * MIN_REPEAT_TIME / max(elapsed, 1e-9)))
+
+    times = [elapsed / loops] + [_time_loops(function, loops) / loops for _ in range(repeats - 1)]
+    return {'median': statistics.median(times),
+            'min': min(times),
+            'mean': statistics.mean(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+            'loops': loops,
+            'repeats': repeats}
+
+
+def _time_loops(function: Callable, loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        function()
+    return time.perf_counter() - start
+
+
+def run_benchmarks(patterns, repeats: int) -> dict:
+    """
+    Runs the benchmarks, printing each result as it is measured.
+    :param patterns: Glob patterns of the benchmarks to run, or None for all of them.
+    :param repeats: The number of times each benchmark is timed.
+    :return: The results, with the environment they were measured in.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='pyminview_bench_') as scratch:
+        for benchmark in _selected(all_benchmarks(Path(scratch)), patterns):
+            try:
+                result = time_function(benchmark.setup(), repeats)
+            except BenchmarkSkipped as e:
+                results[benchmark.name] = {'skipped': str(e)}
+                print("{:<32} skipped: {}".format(benchmark.name, e), file=sys.stderr)
+                continue
+            results[benchmark.name] = result
+            print("{:<32} {:>10} ± {}".format(benchmark.name, format_seconds(result['median']),
+                                              format_seconds(result['stdev'])), file=sys.stderr)
+    return {'environment': _environment(), 'benchmarks': results}
+
+
+def _selected(benchmarks, patterns):
+    if not patterns:
+        return benchmarks
+    return [benchmark for benchmark in benchmarks if any(fnmatch.fnmatchcase(benchmark.name, pattern)
+                                                         for pattern in patterns)]
+
+
+def _environment() -> dict:
+    return {'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count()}
+
+
+def compare_results(baseline: dict, results: dict, threshold: float) -> bool:
+    """
+    Prints how the median time of each benchmark in the results has changed since the baseline.
+    :param baseline: The baseline's results.
+    :param results: The results to compare with the baseline.
+    :param threshold: How much slower than the baseline a benchmark may be, as a fraction.
+    :return: True if any benchmark is slower than the threshold allows.
+    """
+    regressed = False
+    before, after = baseline['benchmarks'], results['benchmarks']
+    print("{:<32} {:>10} {:>10} {:>8}".format("Benchmark", "Baseline", "Current", "Change"))
+    for name, new in after.items():
+        old = before.get(name, {})
+        if 'median' not in old or 'median' not in new:
+            status = 'new' if name not in before else 'skipped'
+            print("{:<32} {:>10} {:>10} {:>8}".format(name, _format_result(old), _format_result(new), status))
+            continue
+        change = new['median'] / old['median'] - 1
+        status = ''
+        if change > threshold:
+            status = '  SLOWER'
+            regressed = True
+        elif change < -threshold:
+            status = '  faster'
+        print("{:<32} {:>10} {:>10} {:>+7.1%}{}".format(name, format_seconds(old['median']),
+                                                      format_seconds(new['median']), change, status))
+    return regressed
+
+
+def _format_result(result: dict) -> str:
+    return format_seconds(result['median']) if 'median' in result else '-'
+
+
+def format_seconds(seconds: float) -> str:
+    """
+    Formats a duration with a unit that suits it, e.g. 1.23 ms.
+    :param seconds: The duration in seconds.
+    :return: The formatted duration.
+    """
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return "{:.3g} {}".format(seconds / scale, unit)
+    return "{:.3g} ns".format(seconds / 1e-9)
+
+
+def main():
+    args = parser.parse_args()
+
+    if args.list:
+        with tempfile.TemporaryDirectory() as scratch:
+            for benchmark in _selected(all_benchmarks(Path(scratch)), args.filter):
+                print(benchmark.name)
+        return 0
+
+    if args.results is not None:
+        if args.compare is None:
+            parser.error('Saved results can only be compared, set --compare.')
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        results = run_benchmarks(args.filter, args.repeats)
+        if args.output is not None:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare_results(baseline, results, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
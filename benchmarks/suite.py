@@ -0,0 +1,206 @@
+import os
+import shlex
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, List, NamedTuple
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.synthetic import SIZES, synthetic_fingerprint, synthetic_minutiae
+from pyminutiaeviewer.image_pyramid import ImagePyramid
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.minutiae_drawing import draw_minutiae, colour_image
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat, MINUTIAE_FILE_EXTENSIONS
+from pyminutiaeviewer.viewport import View, fit_view, render_view, visible_box
+
+# The size of the canvas that fitting and redrawing are benchmarked on, a typical main window.
+CANVAS_SIZE = (800, 600)
+# The formats that can only hold 255 minutiae per finger view.
+_TEMPLATE_FORMATS = (MinutiaeFileFormat.ISO_19794_2, MinutiaeFileFormat.ANSI_378)
+
+# A benchmark's setup is called once, before timing, and returns the function that is timed. It raises
+# BenchmarkSkipped if the benchmark can't run here.
+Benchmark = NamedTuple('Benchmark', [('name', str),
+                                     ('setup', Callable[[], Callable[[], Any]])])
+
+
+class BenchmarkSkipped(Exception):
+    pass
+
+
+def all_benchmarks(scratch: Path) -> List[Benchmark]:
+    """
+    Lists every benchmark. Nothing is generated until a benchmark is set up, so that filtered runs are quick.
+    :param scratch: A directory the benchmarks can write files to.
+    :return: The benchmarks, in the order they run.
+    """
+    benchmarks = []
+    for extension, file_format in MINUTIAE_FILE_EXTENSIONS.items():
+        for size_name, (image_size, count) in SIZES.items():
+            if file_format in _TEMPLATE_FORMATS and count > 255:
+                continue
+            name = '{}.{}'.format(file_format.value.lower(), size_name)
+            path = scratch / '{}.{}{}'.format(file_format.value.lower(), size_name, extension)
+            benchmarks.append(Benchmark('read.' + name, _read_setup(file_format, path, image_size, count)))
+            benchmarks.append(Benchmark('write.' + name, _write_setup(file_format, path, image_size, count)))
+
+    for size_name, (image_size, count) in SIZES.items():
+        benchmarks.append(Benchmark('draw.' + size_name, _draw_setup(image_size, count)))
+    for size_name, (image_size, _) in SIZES.items():
+        benchmarks.append(Benchmark('scale.' + size_name, _scale_setup(image_size)))
+    for size_name, (image_size, count) in SIZES.items():
+        benchmarks.append(Benchmark('redraw.load.' + size_name, _redraw_load_setup(image_size, count)))
+        benchmarks.append(Benchmark('redraw.pan.' + size_name, _redraw_pan_setup(image_size, count)))
+
+    benchmarks.append(Benchmark('mindtct.stub_process', _stub_process_setup(scratch)))
+    for size_name, (image_size, count) in SIZES.items():
+        benchmarks.append(Benchmark('mindtct.wrapper.' + size_name, _mindtct_setup(scratch, image_size, count)))
+    return benchmarks
+
+
+def _read_setup(file_format: MinutiaeFileFormat, path: Path, image_size: int, count: int):
+    def setup():
+        MinutiaeEncoder(file_format).write(str(path), synthetic_minutiae(count, image_size),
+                                           Image.new('L', (image_size, image_size)))
+        reader = MinutiaeReader(file_format)
+        return lambda: reader.read(str(path))
+    return setup
+
+
+def _write_setup(file_format: MinutiaeFileFormat, path: Path, image_size: int, count: int):
+    def setup():
+        encoder = MinutiaeEncoder(file_format)
+        minutiae = synthetic_minutiae(count, image_size)
+        image = Image.new('L', (image_size, image_size))
+        return lambda: encoder.write(str(path), minutiae, image)
+    return setup
+
+
+def _draw_setup(image_size: int, count: int):
+    def setup():
+        image = synthetic_fingerprint(image_size).convert('RGBA')
+        minutiae = synthetic_minutiae(count, image_size)
+        return lambda: draw_minutiae(image, minutiae)
+    return setup
+
+
+def _scale_setup(image_size: int):
+    def setup():
+        from pyminutiaeviewer.gui_common import scale_image_to_fit_minutiae_canvas
+        image = synthetic_fingerprint(image_size).convert('RGBA')
+        canvas = _CanvasSize(*CANVAS_SIZE)
+        return lambda: scale_image_to_fit_minutiae_canvas(canvas, image)
+    return setup
+
+
+def _redraw_load_setup(image_size: int, count: int):
+    """
+    Times the first redraw after an image is loaded, when none of its pyramid's tiles have been built.
+    """
+    def setup():
+        image = synthetic_fingerprint(image_size)
+        minutiae = synthetic_minutiae(count, image_size)
+        view = fit_view(image.size, CANVAS_SIZE)
+        return lambda: _redraw(ImagePyramid(image), minutiae, view)
+    return setup
+
+
+def _redraw_pan_setup(image_size: int, count: int):
+    """
+    Times redraws while panning around the image at twice the fitted zoom, once the tiles it crosses are cached.
+    """
+    def setup():
+        image = synthetic_fingerprint(image_size)
+        pyramid = ImagePyramid(image)
+        minutiae = synthetic_minutiae(count, image_size)
+        fit = fit_view(image.size, CANVAS_SIZE)
+        zoom = fit.zoom * 2
+        views = [View(zoom, image_size * x, image_size * y, *CANVAS_SIZE) for x, y in ((0, 0), (0.25, 0.1),
+                                                                                         (0.5, 0.5), (0.1, 0.4))]
+        position = [0]
+
+        def pan():
+            position[0] = (position[0] + 1) % len(views)
+            return _redraw(pyramid, minutiae, views[position[0]])
+        return pan
+    return setup
+
+
+def _redraw(pyramid: ImagePyramid, minutiae: MinutiaSet, view: View) -> Image.Image:
+    """
+    Does the work of Root.redraw without a display: renders the view from the grayscale pyramid, adjusts it as
+    MindtctFrame does with its default settings, which leave it as it is, and draws the minutiae that pass filtering
+    and are in view. The GUI draws minutiae as canvas items, here they are drawn on to a colour copy of the rendered
+    image to stand in for them.
+    """
+    region, position = render_view(pyramid, view)
+    image = colour_image(region)
+
+    box = visible_box(view, pyramid.image.size)
+    if box is None:
+        return image
+    shown = minutiae[minutiae.quality_mask(0.0) & minutiae.region_mask(*box)]
+    # Move the minutiae from image co-ordinates to the co-ordinates of the rendered image:
+    return draw_minutiae(image, MinutiaSet(np.round((shown.x - view.x) * view.zoom - position[0]),
+                                           np.round((shown.y - view.y) * view.zoom - position[1]),
+                                           shown.angle, shown.minutia_type, shown.quality))
+
+
+def _stub_process_setup(scratch: Path):
+    """
+    Times starting the stub MINDTCT binary on its own, to be subtracted from the wrapper benchmarks.
+    """
+    def setup():
+        minutiae_path = scratch / 'stub.min'
+        minutiae_path.touch()
+        stub = _write_stub(scratch, minutiae_path)
+        output = str(scratch / 'stub_out')
+        return lambda: subprocess.run([str(stub), 'image.png', output], check=True)
+    return setup
+
+
+def _mindtct_setup(scratch: Path, image_size: int, count: int):
+    """
+    Times the mindtct() wrapper with a stub binary that only copies a prepared minutiae file, so what is timed is the
+    wrapper's own work: saving the image, starting the process and reading the minutiae.
+    """
+    def setup():
+        from pyminutiaeviewer.mindtct import mindtct, MINDTCT_PATH_VARIABLE
+
+        image = synthetic_fingerprint(image_size).convert('RGBA')
+        minutiae_path = scratch / 'stub_{}.min'.format(image_size)
+        MinutiaeEncoder(MinutiaeFileFormat.NBIST).write(str(minutiae_path), synthetic_minutiae(count, image_size),
+                                                        image)
+        os.environ[MINDTCT_PATH_VARIABLE] = str(_write_stub(scratch, minutiae_path))
+        return lambda: mindtct(image)
+    return setup
+
+
+def _write_stub(scratch: Path, minutiae_path: Path) -> Path:
+    """
+    Writes a shell script that stands in for MINDTCT, copying a minutiae file to where MINDTCT would write its output.
+    """
+    if os.name != 'posix':
+        raise BenchmarkSkipped("The stub MINDTCT binary is a shell script, which needs a POSIX system.")
+    stub = scratch / 'mindtct_stub_{}.sh'.format(minutiae_path.stem)
+    # MINDTCT's last argument is the root of its output file names:
+    stub.write_text('#!/bin/sh\nfor root; do :; done\ncp {} "$root.min"\n'.format(shlex.quote(str(minutiae_path))))
+    stub.chmod(0o755)
+    return stub
+
+
+class _CanvasSize(object):
+    """
+    Stands in for a Tk canvas, where only its size is needed.
+    """
+    def __init__(self, width: int, height: int):
+        self._width = width
+        self._height = height
+
+    def winfo_width(self) -> int:
+        return self._width
+
+    def winfo_height(self) -> int:
+        return self._height
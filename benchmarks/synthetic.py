@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from pyminutiaeviewer.minutia_set import MinutiaSet, MINUTIA_TYPES
+
+# The sizes benchmarks are run at, as the width and height of the fingerprint image and the number of minutiae. Small
+# is a thumbnail, medium a typical 500 dpi capture and large a scanned ten-print card or a latent with noisy extraction.
+SIZES = OrderedDict([('small', (256, 40)),
+                     ('medium', (512, 150)),
+                     ('large', (2048, 2500))])
+
+
+def synthetic_fingerprint(size: int, seed: int = 0) -> Image.Image:
+    """
+    Generates a grayscale image that looks enough like a fingerprint for benchmarking: a whorl of ridges with some
+    noise, surrounded by white background. The same size and seed always give the same image.
+    :param size: The width and height of the image.
+    :param seed: The seed of the noise.
+    :return: The image.
+    """
+    rng = np.random.RandomState(seed)
+    ys, xs = np.mgrid[0:size, 0:size].astype(np.float32)
+    dx, dy = xs - size / 2.0, (ys - size / 2.0) * 1.25
+    radius = np.hypot(dx, dy)
+    # Ridges about 9 pixels apart at 512 pixels, as at 500 dpi, warped so that they aren't perfect circles:
+    period = 9.0 * size / 512.0
+    ridges = np.sin(2 * np.pi * radius / period + 1.5 * np.sin(3 * np.arctan2(dy, dx)))
+    pixels = 128.0 - 100.0 * ridges + rng.normal(0, 12, ridges.shape)
+    pixels[radius > 0.45 * size] = 255
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'L')
+
+
+def synthetic_minutiae(count: int, image_size: int, seed: int = 0) -> MinutiaSet:
+    """
+    Generates minutiae spread over a fingerprint image. The same arguments always give the same minutiae.
+    :param count: The number of minutiae.
+    :param image_size: The width and height of the image the minutiae are on.
+    :param seed: The seed of the random positions, angles, types and qualities.
+    :return: The minutiae.
+    """
+    rng = np.random.RandomState(seed)
+    margin = image_size // 10
+    return MinutiaSet(rng.randint(margin, image_size - margin, count),
+                      rng.randint(margin, image_size - margin, count),
+                      rng.randint(0, 360, count).astype(np.float64),
+                      rng.randint(0, len(MINUTIA_TYPES), count),
+                      np.round(rng.uniform(0.05, 0.99, count), 2),
+                      image_size=(image_size, image_size))
@@ -1,22 +1,293 @@
 import argparse
+import sys
+from pathlib import Path
 
-from pyminutiaeviewer import gui
+# The formats minutiae files can be converted between, named by their file extensions.
+FORMAT_NAMES = ('min', 'sim', 'xyt', 'mnb', 'ist', 'ansi')
 
 parser = argparse.ArgumentParser(description='Py Minutiae Viewer')
 parser.add_argument('-d', '--draw-minutiae', nargs='+', dest='draw_minutiae',
-                    metavar=('FINGERPRINT_IMAGE', 'MINUTIAE_FILE'),
-                    help='Draws minutiae on to the FINGERPRINT_IMAGE, needs the output-image flag to be set. '
-                         'If no MINUTIAE_FILE is set then a .min file with the same names as the FINGERPRINT_IMAGE '
-                         'is assumed.')
-parser.add_argument('-o', '--output-image', nargs=1, dest='output_image',
-                    metavar='OUTPUT_IMAGE',
-                    help='The location to save the output image.')
-
-args = parser.parse_args()
-
-if args.draw_minutiae is not None:
-    if args.output_image is None:
+                    metavar='FINGERPRINT_IMAGE',
+                    help='Draws minutiae on to the FINGERPRINT_IMAGEs, needs the output-image flag to be set. '
+                         'Each FINGERPRINT_IMAGE can be an image, a directory or a glob pattern. The minutiae are read '
+                         'from a .min, .sim, .xyt or .mnb file with the same name as the image. A single image can '
+                         'instead be followed by the MINUTIAE_FILE to draw.')
+parser.add_argument('-e', '--extract-minutiae', nargs='+', dest='extract_minutiae',
+                    metavar='FINGERPRINT_IMAGE',
+                    help='Extracts minutiae from the FINGERPRINT_IMAGEs with MINDTCT, needs the output flag to be set. '
+                         'Each FINGERPRINT_IMAGE can be an image, a directory or a glob pattern.')
+parser.add_argument('--match', nargs='+', dest='match',
+                    metavar='PROBE_FILE',
+                    help='Matches the minutiae in each PROBE_FILE against the gallery, needs the gallery flag to be '
+                         'set. Each PROBE_FILE can be a minutiae file, a directory or a glob pattern.')
+parser.add_argument('--gallery', nargs='+', dest='gallery',
+                    metavar='GALLERY_FILE',
+                    help='The minutiae files to match probes against. Each GALLERY_FILE can be a minutiae file, a '
+                         'directory or a glob pattern.')
+parser.add_argument('--top', type=int, dest='top', default=5,
+                    metavar='N',
+                    help='The number of best matching gallery files to list for each probe.')
+parser.add_argument('-c', '--convert-minutiae', nargs='+', dest='convert_minutiae',
+                    metavar='MINUTIAE_FILE',
+                    help='Converts the MINUTIAE_FILEs to another format, needs the to and output flags to be set. Each '
+                         'MINUTIAE_FILE can be a minutiae file, a directory or a glob pattern, the layout of '
+                         'directories is kept in the output directory.')
+parser.add_argument('--to', choices=FORMAT_NAMES, dest='to_format',
+                    metavar='FORMAT',
+                    help='The format minutiae files are converted to, named by its extension: {}.'
+                         .format(', '.join(FORMAT_NAMES)))
+parser.add_argument('--from', choices=FORMAT_NAMES, dest='from_format',
+                    metavar='FORMAT',
+                    help='The format of every minutiae file that is converted. If unset each file\'s format is '
+                         'detected from its contents.')
+parser.add_argument('--image-size', type=int, nargs=2, dest='image_size',
+                    metavar=('WIDTH', 'HEIGHT'),
+                    help='The size of the images of converted minutiae files that don\'t store it, e.g. .xyt, .sim and '
+                         'some templates. Converting to .min needs it.')
+parser.add_argument('--scan-corpus', nargs='+', dest='scan_corpus',
+                    metavar='MINUTIAE_FILE',
+                    help='Checks every MINUTIAE_FILE can be read and summarises the counts, types, qualities and '
+                         'angles of their minutiae. Each MINUTIAE_FILE can be a minutiae file, a directory or a glob '
+                         'pattern. Minutiae are checked against the size of the image with the same name, if there is '
+                         'one. Set output to a .json or .csv file for a report of each file.')
+parser.add_argument('--image-dir', dest='image_dir',
+                    metavar='IMAGE_DIR',
+                    help='The directory to look for images in when scanning, instead of next to each minutiae file.')
+parser.add_argument('-o', '--output', '--output-image', dest='output',
+                    metavar='OUTPUT',
+                    help='The location to save the output image. If more than one image is drawn, or minutiae are '
+                         'extracted, this is a directory.')
+parser.add_argument('-m', '--minutiae-dir', dest='minutiae_dir',
+                    metavar='MINUTIAE_DIR',
+                    help='The directory to look for minutiae files in, instead of next to each image.')
+parser.add_argument('-s', '--minutiae-size', type=float, dest='minutiae_size',
+                    metavar='PIXELS',
+                    help='The size of the drawn minutiae in pixels. If unset it is scaled with the image.')
+parser.add_argument('-j', '--jobs', type=int, dest='jobs',
+                    metavar='N',
+                    help='The number of worker processes to use, defaults to the number of CPUs.')
+parser.add_argument('-t', '--timeout', type=float, dest='timeout', default=60.0,
+                    metavar='SECONDS',
+                    help='The number of seconds MINDTCT may run on a single image before it is killed.')
+parser.add_argument('--cache-dir', dest='cache_dir',
+                    metavar='CACHE_DIR',
+                    help='The directory extracted minutiae are cached in, defaults to the user\'s cache directory.')
+parser.add_argument('--no-cache', action='store_true', dest='no_cache',
+                    help='Always run MINDTCT instead of reusing the minutiae of images that were already extracted.')
+parser.add_argument('--trace', dest='trace',
+                    metavar='TRACE_FILE',
+                    help='Appends the time and peak memory of each stage of the work, e.g. decoding an image or '
+                         'running MINDTCT, to TRACE_FILE as JSON lines.')
+
+
+def draw_minutiae_command(args):
+    """
+    Draws minutiae on to fingerprint images without starting the GUI.
+    :param args: The parsed command line arguments.
+    """
+    from pyminutiaeviewer.batch import DrawJob, draw_minutiae_batch, find_images, find_minutiae_file, \
+        IMAGE_FILE_EXTENSIONS
+    from pyminutiaeviewer.minutiae_reader import MINUTIAE_FILE_EXTENSIONS
+
+    if args.output is None:
         parser.error('Missing output image, set --output-image.')
-    pass
-else:
-    gui.Root().mainloop()
+    output = Path(args.output)
+    minutiae_dir = None if args.minutiae_dir is None else Path(args.minutiae_dir)
+
+    def draw_jobs():
+        inputs = args.draw_minutiae
+        if len(inputs) == 2 and Path(inputs[1]).suffix.lower() in MINUTIAE_FILE_EXTENSIONS:
+            yield DrawJob(Path(inputs[0]), Path(inputs[1]), output, args.minutiae_size)
+            return
+
+        single_output = output.suffix.lower() in IMAGE_FILE_EXTENSIONS
+        for image_path, relative_path in find_images(inputs):
+            minutiae_path = find_minutiae_file(image_path, minutiae_dir)
+            if minutiae_path is None:
+                print("No minutiae file found for '{}'.".format(image_path), file=sys.stderr)
+                continue
+            output_path = output if single_output else (output / relative_path).with_suffix('.png')
+            yield DrawJob(image_path, minutiae_path, output_path, args.minutiae_size)
+
+    # The jobs are listed before any are drawn, so that no two of them are drawn to the same file at once:
+    jobs, output_images, failed = [], {}, 0
+    for job in draw_jobs():
+        if job.output_path in output_images:
+            if job.output_path == output:
+                parser.error('More than one image was found, so the output must be a directory rather than an image '
+                             'file.')
+            failed += 1
+            print("Failed to draw '{}': '{}' is also drawn to '{}'."
+                  .format(job.image_path, output_images[job.output_path], job.output_path), file=sys.stderr)
+            continue
+        output_images[job.output_path] = job.image_path
+        jobs.append(job)
+
+    drawn = 0
+    for result in draw_minutiae_batch(jobs, args.jobs):
+        if result.error is None:
+            drawn += 1
+        else:
+            failed += 1
+            print("Failed to draw '{}': {}".format(result.image_path, result.error), file=sys.stderr)
+    print("Drew {} image(s), {} failed.".format(drawn, failed))
+    return 1 if failed else 0
+
+
+def extract_minutiae_command(args):
+    """
+    Extracts minutiae from fingerprint images with a pool of MINDTCT processes, writing a .min file for each image.
+    :param args: The parsed command line arguments.
+    """
+    from pyminutiaeviewer.batch import find_images
+    from pyminutiaeviewer.mindtct import ExtractionJob, mindtct_batch
+    from pyminutiaeviewer.mindtct.cache import ExtractionCache
+
+    if args.output is None:
+        parser.error('Missing output directory, set --output.')
+    output = Path(args.output)
+    cache = None if args.no_cache else ExtractionCache(args.cache_dir)
+
+    jobs = (ExtractionJob(image_path, (output / relative_path).with_suffix('.min'))
+            for image_path, relative_path in find_images(args.extract_minutiae))
+
+    extracted, failed = 0, 0
+    for result in mindtct_batch(jobs, args.jobs, timeout=args.timeout, cache=cache):
+        if result.error is None:
+            extracted += 1
+        else:
+            failed += 1
+            print("Failed to extract '{}': {}".format(result.image_path, result.error), file=sys.stderr)
+    print("Extracted minutiae from {} image(s), {} failed.".format(extracted, failed))
+    if cache is not None:
+        print("Cache: {} hit(s), {} miss(es).".format(cache.hits, cache.misses))
+    return 1 if failed else 0
+
+
+def match_command(args):
+    """
+    Matches probe minutiae files against a gallery of minutiae files, listing the best matches of each probe.
+    :param args: The parsed command line arguments.
+    """
+    from pyminutiaeviewer.batch import find_files
+    from pyminutiaeviewer.matcher import Gallery, read_template
+    from pyminutiaeviewer.minutiae_reader import MINUTIAE_FILE_EXTENSIONS
+
+    if args.gallery is None:
+        parser.error('Missing gallery, set --gallery.')
+    gallery_paths = [path for path, _ in find_files(args.gallery, MINUTIAE_FILE_EXTENSIONS)]
+    if not gallery_paths:
+        parser.error('No minutiae files were found in the gallery.')
+
+    failed = 0
+    with Gallery.from_files(gallery_paths, args.jobs) as gallery:
+        for probe_path, _ in find_files(args.match, MINUTIAE_FILE_EXTENSIONS):
+            try:
+                matches = gallery.search(read_template(probe_path), args.top)
+            except Exception as e:
+                failed += 1
+                print("Failed to match '{}': {}".format(probe_path, e), file=sys.stderr)
+                continue
+            for match in matches:
+                print("{}\t{}\t{}".format(probe_path, gallery_paths[match.index], match.score))
+    return 1 if failed else 0
+
+
+def convert_minutiae_command(args):
+    """
+    Converts minutiae files to another format with a pool of worker processes.
+    :param args: The parsed command line arguments.
+    """
+    from pyminutiaeviewer.batch import ConvertJob, convert_minutiae_batch, converted_path, find_files
+    from pyminutiaeviewer.minutiae_reader import MINUTIAE_FILE_EXTENSIONS
+
+    if args.to_format is None:
+        parser.error('Missing output format, set --to.')
+    if args.output is None:
+        parser.error('Missing output directory, set --output.')
+    output = Path(args.output)
+    output_format = MINUTIAE_FILE_EXTENSIONS['.' + args.to_format]
+    input_format = None if args.from_format is None else MINUTIAE_FILE_EXTENSIONS['.' + args.from_format]
+
+    jobs = (ConvertJob(input_path, converted_path(relative_path, output, output_format))
+            for input_path, relative_path in find_files(args.convert_minutiae, MINUTIAE_FILE_EXTENSIONS))
+
+    converted, failed = 0, 0
+    for result in convert_minutiae_batch(jobs, output_format, input_format, args.jobs,
+                                         image_size=None if args.image_size is None else tuple(args.image_size)):
+        if result.error is None:
+            converted += 1
+        else:
+            failed += 1
+            print("Failed to convert '{}': {}".format(result.input_path, result.error), file=sys.stderr)
+    print("Converted {} minutiae file(s), {} failed.".format(converted, failed))
+    return 1 if failed else 0
+
+
+def scan_corpus_command(args):
+    """
+    Scans a corpus of minutiae files for files that can't be read and summarises their minutiae.
+    :param args: The parsed command line arguments.
+    """
+    import json
+    from pyminutiaeviewer.batch import find_files, find_image_file
+    from pyminutiaeviewer.corpus import ScanJob, scan_corpus, CorpusSummary, CsvReportWriter, file_row, \
+        write_json_report
+    from pyminutiaeviewer.minutiae_reader import MINUTIAE_FILE_EXTENSIONS
+
+    output = None if args.output is None else Path(args.output)
+    if output is not None and output.suffix.lower() not in ('.json', '.csv'):
+        parser.error('The report must be a .json or .csv file.')
+    image_dir = None if args.image_dir is None else Path(args.image_dir)
+
+    jobs = (ScanJob(minutiae_path, find_image_file(minutiae_path, image_dir))
+            for minutiae_path, _ in find_files(args.scan_corpus, MINUTIAE_FILE_EXTENSIONS))
+
+    summary = CorpusSummary()
+    rows = []
+    csv_writer = CsvReportWriter(output) if output is not None and output.suffix.lower() == '.csv' else None
+    try:
+        for statistics in scan_corpus(jobs, args.jobs):
+            summary.add(statistics)
+            if statistics.error is not None:
+                print("Failed to read '{}': {}".format(statistics.minutiae_path, statistics.error), file=sys.stderr)
+            if csv_writer is not None:
+                csv_writer(file_row(statistics))
+            elif output is not None:
+                rows.append(file_row(statistics))
+    finally:
+        if csv_writer is not None:
+            csv_writer.close()
+    if output is not None and csv_writer is None:
+        write_json_report(output, summary, rows)
+
+    print(json.dumps(summary.to_dict(), indent=2))
+    return 1 if summary.corrupt else 0
+
+
+def main():
+    args = parser.parse_args()
+
+    if args.trace is not None:
+        from pyminutiaeviewer.tracing import trace_to_file
+        trace_to_file(Path(args.trace))
+
+    if args.draw_minutiae is not None:
+        sys.exit(draw_minutiae_command(args))
+    elif args.extract_minutiae is not None:
+        sys.exit(extract_minutiae_command(args))
+    elif args.match is not None:
+        sys.exit(match_command(args))
+    elif args.convert_minutiae is not None:
+        sys.exit(convert_minutiae_command(args))
+    elif args.scan_corpus is not None:
+        sys.exit(scan_corpus_command(args))
+    else:
+        # The commands only use the headless API, tkinter and ttkthemes are only imported for the GUI:
+        from pyminutiaeviewer import gui
+
+        gui.Root().mainloop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+The headless API of Py Minutiae Viewer, for reading, writing, extracting, drawing and filtering minutiae without the
+GUI. Importing the package imports nothing else, each function imports only the modules it needs when it is first
+called, and none of them import tkinter, PIL.ImageTk or ttkthemes, so the API works on servers without a display and
+keeps the start up of short lived worker processes quick. The core types can be imported from here too, and are also
+loaded when they are first used.
+"""
+import importlib
+from pathlib import Path
+from typing import Iterable, Sequence, Tuple, Union
+
+# The types that can be imported from the package, and the modules they are loaded from.
+_LAZY_NAMES = {
+    'Minutia': 'pyminutiaeviewer.minutia',
+    'MinutiaType': 'pyminutiaeviewer.minutia',
+    'MinutiaSet': 'pyminutiaeviewer.minutia_set',
+    'MinutiaeFileFormat': 'pyminutiaeviewer.minutiae_reader',
+    'MINUTIAE_FILE_EXTENSIONS': 'pyminutiaeviewer.minutiae_reader',
+    'MinutiaeReader': 'pyminutiaeviewer.minutiae_reader',
+    'detect_format': 'pyminutiaeviewer.minutiae_reader',
+    'MinutiaeEncoder': 'pyminutiaeviewer.minutiae_encoder',
+    'ExtractionCache': 'pyminutiaeviewer.mindtct.cache',
+}
+
+__all__ = ['read_minutiae', 'write_minutiae', 'extract_minutiae', 'draw_minutiae', 'filter_minutiae'] + \
+          sorted(_LAZY_NAMES)
+
+
+def __getattr__(name: str):
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def read_minutiae(path: Union[str, Path], file_format=None):
+    """
+    Reads minutiae from a file.
+    :param path: The path of the minutiae file.
+    :param file_format: The MinutiaeFileFormat of the file, if None it is chosen by the file's extension, or detected
+    from its contents if the extension isn't a minutiae file extension.
+    :return: The minutiae, as a MinutiaSet.
+    """
+    from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MINUTIAE_FILE_EXTENSIONS, detect_format
+
+    if file_format is None:
+        file_format = MINUTIAE_FILE_EXTENSIONS.get(Path(path).suffix.lower())
+    if file_format is None:
+        file_format = detect_format(str(path))
+    return MinutiaeReader(file_format).read(str(path))
+
+
+def write_minutiae(path: Union[str, Path], minutiae, image=None, file_format=None):
+    """
+    Writes minutiae to a file, replacing it in a single step so that it is never left half written.
+    :param path: The path of the minutiae file.
+    :param minutiae: The minutiae, either a MinutiaSet or Minutia objects.
+    :param image: The PIL image the minutiae are from, which some formats take the size of. If None the image size
+    stored with the minutiae is used.
+    :param file_format: The MinutiaeFileFormat to write, if None it is chosen by the file's extension.
+    """
+    from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+
+    MinutiaeEncoder(_file_format(path, file_format)).write(str(path), minutiae, image, atomic=True)
+
+
+def extract_minutiae(image, invert: bool = False, m1_direction: bool = False, flags: Sequence[str] = None,
+                     timeout: float = None, cache=None):
+    """
+    Extracts minutiae from a fingerprint with MINDTCT, the same way the GUI does.
+    :param image: The fingerprint, as a PIL image or the path of an image file.
+    :param invert: True if the fingerprint's ridges are white, its colours are inverted before extraction.
+    :param m1_direction: True to turn the minutiae's directions to the ANSI INCITS 378 (M1) convention.
+    :param flags: The command line flags MINDTCT is run with, if None the default flags.
+    :param timeout: The number of seconds MINDTCT may run for before it is killed, if None the default timeout.
+    :param cache: An ExtractionCache to reuse minutiae that were already extracted from the image, shared with the GUI
+    and the command line, or None to always run MINDTCT.
+    :return: The minutiae, as a MinutiaSet.
+    """
+    from PIL import ImageOps
+    from pyminutiaeviewer.mindtct import mindtct, DEFAULT_FLAGS, DEFAULT_TIMEOUT
+    from pyminutiaeviewer.mindtct.cache import extraction_settings
+
+    flags = DEFAULT_FLAGS if flags is None else tuple(flags)
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    image = _open_image(image).convert('L')
+
+    key = None
+    if cache is not None:
+        key = cache.key(image, extraction_settings(invert, m1_direction, flags))
+        minutiae = cache.get(key)
+        if minutiae is not None:
+            return minutiae
+
+    minutiae = mindtct(ImageOps.invert(image) if invert else image, flags, timeout)
+    if m1_direction:
+        minutiae.angle = (minutiae.angle + 180) % 360
+    if cache is not None:
+        cache.put(key, minutiae, image)
+    return minutiae
+
+
+def draw_minutiae(image, minutiae, size: float = None):
+    """
+    Draws minutiae on to a copy of a fingerprint, see minutiae_drawing.draw_minutiae.
+    :param image: The fingerprint, as a PIL image or the path of an image file. Images that aren't RGB or RGBA are
+    converted to RGB, or to RGBA if they are transparent.
+    :param minutiae: The minutiae, either a MinutiaSet, Minutia objects or the path of a minutiae file.
+    :param size: The size of the drawn minutiae in pixels, if None it is scaled with the image.
+    :return: The annotated PIL image.
+    """
+    from pyminutiaeviewer.minutiae_drawing import draw_minutiae as draw, colour_image
+
+    image = colour_image(_open_image(image))
+    if isinstance(minutiae, (str, Path)):
+        minutiae = read_minutiae(minutiae)
+    return draw(image, minutiae, size)
+
+
+def filter_minutiae(minutiae, min_quality: float = None, minutia_types: Iterable = None,
+                    region: Tuple[float, float, float, float] = None):
+    """
+    Keeps the minutiae that pass the same filters the GUI shows minutiae by.
+    :param minutiae: The minutiae, either a MinutiaSet or Minutia objects.
+    :param min_quality: Only minutiae with a quality above this are kept, minutiae with exactly this quality are not.
+    If None minutiae of any quality are kept.
+    :param minutia_types: The MinutiaTypes to keep, if None every type is kept.
+    :param region: The left, top, right and bottom of the region to keep minutiae in, if None minutiae anywhere are
+    kept.
+    :return: The minutiae that pass, as a MinutiaSet.
+    """
+    import numpy as np
+    from pyminutiaeviewer.minutia_set import as_minutia_set
+
+    minutiae = as_minutia_set(minutiae)
+    mask = np.ones(len(minutiae), dtype=bool) if min_quality is None else minutiae.quality_mask(min_quality)
+    if minutia_types is not None:
+        mask &= minutiae.type_mask(minutia_types)
+    if region is not None:
+        mask &= minutiae.region_mask(*region)
+    return minutiae[mask]
+
+
+def _file_format(path: Union[str, Path], file_format):
+    """
+    Chooses the format of a minutiae file by its extension, unless it was given.
+    """
+    if file_format is not None:
+        return file_format
+    from pyminutiaeviewer.minutiae_reader import MINUTIAE_FILE_EXTENSIONS
+
+    suffix = Path(path).suffix
+    try:
+        return MINUTIAE_FILE_EXTENSIONS[suffix.lower()]
+    except KeyError:
+        raise AttributeError("'{}' is not a supported minutiae file extension.".format(suffix))
+
+
+def _open_image(image):
+    """
+    Opens an image file, or returns an image that is already open.
+    """
+    if not isinstance(image, (str, Path)):
+        return image
+    from PIL import Image
+
+    # The copy is kept once the file is closed:
+    with Image.open(str(image)) as opened:
+        return opened.copy()
@@ -0,0 +1,224 @@
+import functools
+import glob
+import io
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from pyminutiaeviewer import read_minutiae, tracing
+from pyminutiaeviewer.minutiae_drawing import draw_minutiae, colour_image
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat, MINUTIAE_FILE_EXTENSIONS, \
+    FORMAT_FILE_EXTENSIONS, detect_format
+
+# The image file extensions that are picked up when expanding directories and glob patterns.
+IMAGE_FILE_EXTENSIONS = ('.bmp', '.jpeg', '.jpg', '.png')
+# The formats that can hold more than one finger view.
+_TEMPLATE_FORMATS = (MinutiaeFileFormat.ISO_19794_2, MinutiaeFileFormat.ANSI_378)
+# The formats that can't be written without the size of the image.
+_SIZED_FORMATS = (MinutiaeFileFormat.NBIST, MinutiaeFileFormat.MINDTCT)
+
+
+DrawJob = NamedTuple('DrawJob', [('image_path', Path),
+                                  ('minutiae_path', Path),
+                                  ('output_path', Path),
+                                  ('size', Optional[float])])
+
+DrawResult = NamedTuple('DrawResult', [('image_path', Path),
+                                       ('output_path', Optional[Path]),
+                                       ('error', Optional[str])])
+
+ConvertJob = NamedTuple('ConvertJob', [('input_path', Path),
+                                        ('output_path', Path)])
+
+ConvertResult = NamedTuple('ConvertResult', [('input_path', Path),
+                                             ('output_path', Optional[Path]),
+                                             ('error', Optional[str])])
+
+
+def find_images(inputs: Iterable[str]) -> Iterator[Tuple[Path, Path]]:
+    """
+    Expands a list of image files, directories and glob patterns in to image files.
+    Directories are searched recursively.
+    :param inputs: The image files, directories or glob patterns to expand.
+    :return: Tuples of the image's path and its path relative to the input it was found through.
+    """
+    return find_files(inputs, IMAGE_FILE_EXTENSIONS)
+
+
+def find_files(inputs: Iterable[str], extensions: Iterable[str]) -> Iterator[Tuple[Path, Path]]:
+    """
+    Expands a list of files, directories and glob patterns in to the files with some extensions.
+    Directories are searched recursively, files that are listed explicitly are always included.
+    :param inputs: The files, directories or glob patterns to expand.
+    :param extensions: The lower case extensions of the files to find, including the dot.
+    :return: Tuples of the file's path and its path relative to the input it was found through.
+    """
+    extensions = tuple(extensions)
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            for file_path in sorted(path.rglob('*')):
+                if file_path.suffix.lower() in extensions:
+                    yield file_path, file_path.relative_to(path)
+        elif path.is_file():
+            yield path, Path(path.name)
+        else:
+            for match in sorted(glob.glob(item, recursive=True)):
+                file_path = Path(match)
+                if file_path.is_file() and file_path.suffix.lower() in extensions:
+                    yield file_path, Path(file_path.name)
+
+
+def find_minutiae_file(image_path: Path, minutiae_dir: Path = None) -> Optional[Path]:
+    """
+    Finds the minutiae file that shares its name with an image.
+    :param image_path: The path of the fingerprint image.
+    :param minutiae_dir: The directory to search in, if None the image's directory is searched.
+    :return: The path of the minutiae file, or None if there is no matching file.
+    """
+    directory = image_path.parent if minutiae_dir is None else minutiae_dir
+    for extension in MINUTIAE_FILE_EXTENSIONS:
+        minutiae_path = directory / (image_path.stem + extension)
+        if minutiae_path.is_file():
+            return minutiae_path
+    return None
+
+
+def find_image_file(minutiae_path: Path, image_dir: Path = None) -> Optional[Path]:
+    """
+    Finds the fingerprint image that shares its name with a minutiae file.
+    :param minutiae_path: The path of the minutiae file.
+    :param image_dir: The directory to search in, if None the minutiae file's directory is searched.
+    :return: The path of the image, or None if there is no matching image.
+    """
+    directory = minutiae_path.parent if image_dir is None else image_dir
+    for extension in IMAGE_FILE_EXTENSIONS:
+        image_path = directory / (minutiae_path.stem + extension)
+        if image_path.is_file():
+            return image_path
+    return None
+
+
+def draw_minutiae_batch(jobs: Iterable[DrawJob], processes: int = None, chunksize: int = 4) -> Iterator[DrawResult]:
+    """
+    Draws the minutiae of each job on to its image and saves the result, spreading the jobs over a pool of worker
+    processes. Each worker writes its output image as soon as it is drawn, so only the job descriptions and results
+    are passed between processes.
+    :param jobs: The images to draw.
+    :param processes: The number of worker processes, defaults to the number of CPUs. If 1 the jobs are drawn in this
+    process.
+    :param chunksize: The number of jobs sent to a worker at a time.
+    :return: The result of each job, in the order that they complete.
+    """
+    if processes == 1:
+        yield from map(_draw_job, jobs)
+        return
+
+    # Workers trace to the same file as this process, if it is tracing:
+    with Pool(processes, **tracing.pool_arguments()) as pool:
+        yield from pool.imap_unordered(_draw_job, jobs, chunksize)
+
+
+def _draw_job(job: DrawJob) -> DrawResult:
+    """
+    Draws and saves a single job, any error is caught and reported in the result so one bad file can't stop a batch.
+    :param job: The job to draw.
+    :return: The result of drawing the job.
+    """
+    try:
+        with tracing.span('minutiae.read', path=str(job.minutiae_path)):
+            minutiae = read_minutiae(job.minutiae_path)
+
+        with Image.open(str(job.image_path)) as image:
+            with tracing.span('image.decode', path=str(job.image_path)):
+                image = colour_image(image)
+            image = draw_minutiae(image, minutiae, job.size)
+
+        if job.output_path.suffix.lower() in ('.bmp', '.jpeg', '.jpg'):
+            image = image.convert('RGB')
+        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+        with tracing.span('image.save', path=str(job.output_path)):
+            image.save(str(job.output_path))
+    except Exception as e:
+        return DrawResult(job.image_path, None, "{}: {}".format(type(e).__name__, e))
+    return DrawResult(job.image_path, job.output_path, None)
+
+
+def converted_path(relative_path: Path, output_dir: Path, file_format: MinutiaeFileFormat) -> Path:
+    """
+    Finds where a converted minutiae file is written, keeping the layout of the directory it was found in.
+    :param relative_path: The minutiae file's path relative to the input it was found through, see find_files.
+    :param output_dir: The directory converted files are written to.
+    :param file_format: The format the file is converted to.
+    :return: The path of the converted file, with the format's extension.
+    """
+    return (output_dir / relative_path).with_suffix(FORMAT_FILE_EXTENSIONS[file_format])
+
+
+def convert_minutiae_batch(jobs: Iterable[ConvertJob], output_format: MinutiaeFileFormat,
+                           input_format: MinutiaeFileFormat = None, processes: int = None,
+                           chunksize: int = 64, image_size: Tuple[int, int] = None) -> Iterator[ConvertResult]:
+    """
+    Converts minutiae files from one format to another, spreading the jobs over a pool of worker processes. The jobs
+    are consumed lazily, so a directory tree can be streamed through without listing it first.
+    :param jobs: The files to convert.
+    :param output_format: The format the files are converted to.
+    :param input_format: The format of every input file, if None each file's format is detected from its contents.
+    :param processes: The number of worker processes, defaults to the number of CPUs. If 1 the jobs are converted in
+    this process.
+    :param chunksize: The number of jobs sent to a worker at a time. Converting a file is quick, so large chunks keep
+    the cost of passing jobs between processes down.
+    :param image_size: The width and height of the images of files that don't store it, e.g. xyt files, or None.
+    Files converted to NBIST need it.
+    :return: The result of each job, in the order that they complete.
+    """
+    convert = functools.partial(_convert_job, output_format=output_format, input_format=input_format,
+                                image_size=image_size)
+    if processes == 1:
+        yield from map(convert, jobs)
+        return
+
+    # Workers trace to the same file as this process, if it is tracing:
+    with Pool(processes, **tracing.pool_arguments()) as pool:
+        yield from pool.imap_unordered(convert, jobs, chunksize)
+
+
+def _convert_job(job: ConvertJob, output_format: MinutiaeFileFormat, input_format: Optional[MinutiaeFileFormat],
+                 image_size: Optional[Tuple[int, int]] = None) -> ConvertResult:
+    """
+    Converts a single file, any error is caught and reported in the result so one bad file can't stop a batch. Every
+    finger view of a template is kept when converting to another template format.
+    :param job: The job to convert.
+    :param output_format: The format the file is converted to.
+    :param input_format: The format of the input file, or None to detect it.
+    :param image_size: The width and height of the image if the file doesn't store it, or None.
+    :return: The result of converting the job.
+    """
+    try:
+        with tracing.span('minutiae.read', path=str(job.input_path)):
+            # The file is read once, for both detecting its format and parsing it:
+            data = io.BytesIO(job.input_path.read_bytes())
+            file_format = input_format
+            if file_format is None:
+                file_format = detect_format(data, MINUTIAE_FILE_EXTENSIONS.get(job.input_path.suffix.lower()))
+            finger_views = MinutiaeReader(file_format).read_finger_views(data)
+        if output_format not in _TEMPLATE_FORMATS:
+            # Other formats hold a single finger view, and reading takes the first, as MinutiaeReader.read does:
+            finger_views = finger_views[:1]
+        for view in finger_views:
+            if view.minutiae.image_size is None:
+                view.minutiae.image_size = image_size
+        if output_format in _SIZED_FORMATS and any(view.minutiae.image_size is None for view in finger_views):
+            return ConvertResult(job.input_path, None, "The file doesn't store the size of its image, which {} files "
+                                                       "need, and no image size was given."
+                                 .format(output_format.value))
+
+        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+        with tracing.span('minutiae.write', path=str(job.output_path)):
+            MinutiaeEncoder(output_format).write_finger_views(str(job.output_path), finger_views, None, atomic=True)
+    except Exception as e:
+        return ConvertResult(job.input_path, None, "{}: {}".format(type(e).__name__, e))
+    return ConvertResult(job.input_path, job.output_path, None)
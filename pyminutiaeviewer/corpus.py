@@ -0,0 +1,244 @@
+import array
+import csv
+import io
+import json
+from collections import Counter
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from pyminutiaeviewer import tracing
+from pyminutiaeviewer.minutia_set import MinutiaSet, MINUTIA_TYPES
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MINUTIAE_FILE_EXTENSIONS, detect_format
+
+# The number of equal width bins qualities from 0 to 1 are counted in.
+QUALITY_BINS = 10
+# The width of the bins angles are counted in, in degrees.
+ANGLE_BIN_DEGREES = 10
+_ANGLE_BINS = 360 // ANGLE_BIN_DEGREES
+
+# The columns of a per file CSV report, see file_row.
+CSV_COLUMNS = ('minutiae_path', 'image_path', 'format', 'count') + \
+              tuple(minutia_type.name.lower() for minutia_type in MINUTIA_TYPES) + \
+              ('mean_quality', 'quality_out_of_range', 'width', 'height', 'out_of_bounds', 'size_mismatch', 'error')
+
+ScanJob = NamedTuple('ScanJob', [('minutiae_path', Path),
+                                 ('image_path', Optional[Path])])
+
+# The statistics of a single minutiae file. The histograms are NumPy arrays so that they can be summed over a corpus.
+# The image size is the paired image's, or the size stored in the minutiae file if there is no image, and minutiae
+# are only checked against it if it is known. If the file couldn't be read the error is set and the counts are zero.
+FileStatistics = NamedTuple('FileStatistics', [('minutiae_path', Path),
+                                               ('image_path', Optional[Path]),
+                                               ('file_format', Optional[str]),
+                                               ('count', int),
+                                               ('type_counts', np.ndarray),
+                                               ('quality_histogram', np.ndarray),
+                                               ('quality_out_of_range', int),
+                                               ('mean_quality', Optional[float]),
+                                               ('angle_histogram', np.ndarray),
+                                               ('image_size', Optional[Tuple[int, int]]),
+                                               ('out_of_bounds', Optional[int]),
+                                               ('size_mismatch', bool),
+                                               ('error', Optional[str])])
+
+
+def minutiae_statistics(minutiae: MinutiaSet, image_size: Optional[Tuple[int, int]] = None) -> dict:
+    """
+    Computes the statistics of a set of minutiae, with a single pass over each of its arrays.
+    :param minutiae: The minutiae.
+    :param image_size: The width and height of the image the minutiae are on, if None the size stored with the
+    minutiae is used. Minutiae aren't checked for being out of bounds if neither is known.
+    :return: The count, type_counts, quality_histogram, quality_out_of_range, mean_quality, angle_histogram,
+    image_size, out_of_bounds and size_mismatch fields of a FileStatistics.
+    """
+    quality = minutiae.quality
+    in_range = (quality >= 0) & (quality <= 1)
+    # Qualities of exactly 1 are counted in the top bin:
+    quality_bins = np.minimum((quality[in_range] * QUALITY_BINS).astype(np.intp), QUALITY_BINS - 1)
+    angle_bins = (np.mod(minutiae.angle, 360) // ANGLE_BIN_DEGREES).astype(np.intp) % _ANGLE_BINS
+
+    size_mismatch = image_size is not None and minutiae.image_size is not None and \
+        tuple(image_size) != tuple(minutiae.image_size)
+    image_size = image_size if image_size is not None else minutiae.image_size
+    out_of_bounds = None
+    if image_size is not None:
+        width, height = image_size
+        out_of_bounds = int(np.count_nonzero((minutiae.x < 0) | (minutiae.y < 0) |
+                                             (minutiae.x >= width) | (minutiae.y >= height)))
+
+    finite = quality[~np.isnan(quality)]
+    return {'count': len(minutiae),
+            'type_counts': np.bincount(minutiae.minutia_type, minlength=len(MINUTIA_TYPES))[:len(MINUTIA_TYPES)],
+            'quality_histogram': np.bincount(quality_bins, minlength=QUALITY_BINS),
+            'quality_out_of_range': int(len(quality) - np.count_nonzero(in_range)),
+            'mean_quality': float(finite.mean()) if len(finite) else None,
+            'angle_histogram': np.bincount(angle_bins, minlength=_ANGLE_BINS),
+            'image_size': None if image_size is None else tuple(image_size),
+            'out_of_bounds': out_of_bounds,
+            'size_mismatch': size_mismatch}
+
+
+def scan_corpus(jobs: Iterable[ScanJob], processes: int = None, chunksize: int = 64) -> Iterator[FileStatistics]:
+    """
+    Reads minutiae files and computes their statistics, spreading the jobs over a pool of worker processes. Files that
+    can't be read are reported in their results rather than stopping the scan.
+    :param jobs: The files to scan.
+    :param processes: The number of worker processes, defaults to the number of CPUs. If 1 the jobs are scanned in
+    this process.
+    :param chunksize: The number of jobs sent to a worker at a time.
+    :return: The statistics of each file, in the order that they complete.
+    """
+    if processes == 1:
+        yield from map(_scan_job, jobs)
+        return
+
+    # Workers trace to the same file as this process, if it is tracing:
+    with Pool(processes, **tracing.pool_arguments()) as pool:
+        yield from pool.imap_unordered(_scan_job, jobs, chunksize)
+
+
+def _scan_job(job: ScanJob) -> FileStatistics:
+    """
+    Scans a single file. Every finger view of a template is counted, and only the header of the image is read, for
+    its size.
+    :param job: The job to scan.
+    :return: The statistics of the file.
+    """
+    file_format = None
+    try:
+        with tracing.span('minutiae.read', path=str(job.minutiae_path)):
+            data = io.BytesIO(job.minutiae_path.read_bytes())
+            file_format = detect_format(data, MINUTIAE_FILE_EXTENSIONS.get(job.minutiae_path.suffix.lower()))
+            finger_views = MinutiaeReader(file_format).read_finger_views(data)
+        minutiae = finger_views[0].minutiae
+        for view in finger_views[1:]:
+            minutiae.extend(view.minutiae)
+
+        image_size = None
+        if job.image_path is not None:
+            with Image.open(str(job.image_path)) as image:
+                image_size = image.size
+        statistics = minutiae_statistics(minutiae, image_size)
+    except Exception as e:
+        return FileStatistics(job.minutiae_path, job.image_path, None if file_format is None else file_format.value,
+                              0, np.zeros(len(MINUTIA_TYPES), np.intp), np.zeros(QUALITY_BINS, np.intp), 0, None,
+                              np.zeros(_ANGLE_BINS, np.intp), None, None, False, "{}: {}".format(type(e).__name__, e))
+    return FileStatistics(job.minutiae_path, job.image_path, file_format.value, error=None, **statistics)
+
+
+def file_row(statistics: FileStatistics) -> dict:
+    """
+    Flattens the statistics of a file in to a row of a report, with the columns in CSV_COLUMNS.
+    :param statistics: The statistics of the file.
+    :return: The row.
+    """
+    width, height = statistics.image_size if statistics.image_size is not None else (None, None)
+    row = {'minutiae_path': str(statistics.minutiae_path),
+           'image_path': None if statistics.image_path is None else str(statistics.image_path),
+           'format': statistics.file_format,
+           'count': statistics.count}
+    for minutia_type, count in zip(MINUTIA_TYPES, statistics.type_counts.tolist()):
+        row[minutia_type.name.lower()] = count
+    row.update({'mean_quality': statistics.mean_quality,
+                'quality_out_of_range': statistics.quality_out_of_range,
+                'width': width,
+                'height': height,
+                'out_of_bounds': statistics.out_of_bounds,
+                'size_mismatch': statistics.size_mismatch,
+                'error': statistics.error})
+    return row
+
+
+class CorpusSummary(object):
+    def __init__(self):
+        """
+        Sums the statistics of the files of a corpus as they are scanned. Only the totals and the count of each file
+        are kept, so corpora of any size can be summarised.
+        """
+        self.files = 0
+        self.corrupt = 0
+        self.formats = Counter()
+        self.type_counts = np.zeros(len(MINUTIA_TYPES), np.int64)
+        self.quality_histogram = np.zeros(QUALITY_BINS, np.int64)
+        self.quality_out_of_range = 0
+        self.angle_histogram = np.zeros(_ANGLE_BINS, np.int64)
+        self.out_of_bounds = 0
+        self.files_out_of_bounds = 0
+        self.unknown_image_size = 0
+        self.size_mismatches = 0
+        self._counts = array.array('q')
+
+    def add(self, statistics: FileStatistics):
+        self.files += 1
+        if statistics.error is not None:
+            self.corrupt += 1
+            return
+        self.formats[statistics.file_format] += 1
+        self._counts.append(statistics.count)
+        self.type_counts += statistics.type_counts
+        self.quality_histogram += statistics.quality_histogram
+        self.quality_out_of_range += statistics.quality_out_of_range
+        self.angle_histogram += statistics.angle_histogram
+        if statistics.out_of_bounds is None:
+            self.unknown_image_size += 1
+        elif statistics.out_of_bounds:
+            self.out_of_bounds += statistics.out_of_bounds
+            self.files_out_of_bounds += 1
+        self.size_mismatches += statistics.size_mismatch
+
+    def to_dict(self) -> dict:
+        """
+        :return: The summary, as JSON serialisable types.
+        """
+        counts = np.frombuffer(self._counts, np.int64) if self._counts else np.zeros(1, np.int64)
+        total = int(self.type_counts.sum())
+        return {'files': self.files,
+                'corrupt': self.corrupt,
+                'formats': dict(self.formats),
+                'minutiae': total,
+                'count_per_file': {'min': int(counts.min()),
+                                   'max': int(counts.max()),
+                                   'mean': float(counts.mean()),
+                                   'median': float(np.median(counts))},
+                'types': {minutia_type.name.lower(): {'count': int(count), 'ratio': count / total if total else None}
+                          for minutia_type, count in zip(MINUTIA_TYPES, self.type_counts)},
+                'quality_histogram': {'bins': np.linspace(0, 1, QUALITY_BINS + 1).round(6).tolist(),
+                                      'counts': self.quality_histogram.tolist()},
+                'quality_out_of_range': self.quality_out_of_range,
+                'angle_histogram': {'bins': list(range(0, 361, ANGLE_BIN_DEGREES)),
+                                    'counts': self.angle_histogram.tolist()},
+                'out_of_bounds': {'minutiae': self.out_of_bounds, 'files': self.files_out_of_bounds},
+                'unknown_image_size': self.unknown_image_size,
+                'size_mismatches': self.size_mismatches}
+
+
+def write_json_report(path: Path, summary: CorpusSummary, rows: Iterable[dict]):
+    """
+    Writes a report of a scan as JSON, with the summary and a row per file.
+    :param path: The path of the report.
+    :param summary: The summary of the corpus.
+    :param rows: The rows of the files, see file_row.
+    """
+    with Path(path).open('w', encoding='utf-8') as f:
+        json.dump({'summary': summary.to_dict(), 'files': list(rows)}, f, indent=2)
+
+
+class CsvReportWriter(object):
+    def __init__(self, path: Path):
+        """
+        Writes a report of a scan as CSV, a row per file, as each file is scanned.
+        :param path: The path of the report.
+        """
+        self._file = Path(path).open('w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, CSV_COLUMNS)
+        self._writer.writeheader()
+
+    def __call__(self, row: dict):
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,285 @@
+import json
+import os
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.minutia import Minutia
+from pyminutiaeviewer.minutia_set import MinutiaSet, MINUTIA_TYPES, MINUTIA_TYPE_CODES
+
+# Inserts minutiae so that they end up at the indices, which are in ascending order.
+InsertMinutiae = NamedTuple('InsertMinutiae', [('indices', Tuple[int, ...]),
+                                               ('minutiae', Tuple[Minutia, ...])])
+
+# Removes the minutiae at the indices, which are in ascending order. The minutiae are kept so that it can be undone.
+RemoveMinutiae = NamedTuple('RemoveMinutiae', [('indices', Tuple[int, ...]),
+                                               ('minutiae', Tuple[Minutia, ...])])
+
+# Replaces the minutia at an index.
+MoveMinutia = NamedTuple('MoveMinutia', [('index', int),
+                                         ('old', Minutia),
+                                         ('new', Minutia)])
+
+Command = Union[InsertMinutiae, RemoveMinutiae, MoveMinutia]
+
+
+def inverse(command: Command) -> Command:
+    """
+    Finds the command that undoes a command.
+    :param command: The command.
+    :return: The inverse command.
+    """
+    if isinstance(command, InsertMinutiae):
+        return RemoveMinutiae(command.indices, command.minutiae)
+    elif isinstance(command, RemoveMinutiae):
+        return InsertMinutiae(command.indices, command.minutiae)
+    elif isinstance(command, MoveMinutia):
+        return MoveMinutia(command.index, command.new, command.old)
+    else:
+        raise AttributeError("Unknown command: {}".format(command))
+
+
+def apply_command(minutiae: Union[MinutiaSet, List[Minutia]], command: Command):
+    """
+    Applies a command to minutiae in place.
+    :param minutiae: A MinutiaSet, or a list of Minutia objects.
+    :param command: The command.
+    """
+    if isinstance(command, InsertMinutiae):
+        for index, minutia in zip(command.indices, command.minutiae):
+            minutiae.insert(index, minutia)
+    elif isinstance(command, RemoveMinutiae):
+        if isinstance(minutiae, MinutiaSet):
+            del minutiae[list(command.indices)]
+        else:
+            for index in reversed(command.indices):
+                del minutiae[index]
+    elif isinstance(command, MoveMinutia):
+        minutiae[command.index] = command.new
+    else:
+        raise AttributeError("Unknown command: {}".format(command))
+
+
+class EditLog(object):
+    def __init__(self, journal_path: Path = None):
+        """
+        A log of the edits made to minutiae, so they can be undone and redone. Each edit is stored as a command that
+        only holds the minutiae it changed, rather than a copy of every minutia. If there is a journal path, every edit
+        is also appended to a journal file as it is made, from which the edits can be recovered after a crash. If the
+        journal can't be written the edits are still made, but the journal is stopped and the error is kept in
+        journal_error.
+        :param journal_path: The path of the journal, or None to not keep a journal.
+        """
+        self.journal_path = journal_path
+        self.journal_error = None  # type: Optional[OSError]
+        self._undo = []  # type: List[Command]
+        self._redo = []  # type: List[Command]
+        self._journal = None
+
+    def reset(self):
+        """
+        Forgets every edit, e.g. because the minutiae were replaced. The journal is started again by the next edit.
+        """
+        self._undo = []
+        self._redo = []
+        self._close_journal()
+
+    def do(self, minutiae: MinutiaSet, command: Command):
+        """
+        Applies a command to minutiae, and logs it.
+        :param minutiae: The minutiae.
+        :param command: The command.
+        """
+        if self._journal is None and self.journal_path is not None and self.journal_error is None:
+            self._start_journal(minutiae)
+        apply_command(minutiae, command)
+        self._undo.append(command)
+        self._redo = []
+        self._write({'do': _encode_command(command)})
+
+    def undo(self, minutiae: MinutiaSet) -> Optional[Command]:
+        """
+        Undoes the latest edit.
+        :param minutiae: The minutiae.
+        :return: The command that was applied to undo the edit, or None if there was nothing to undo.
+        """
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        self._redo.append(command)
+        apply_command(minutiae, inverse(command))
+        self._write({'undo': True})
+        return inverse(command)
+
+    def redo(self, minutiae: MinutiaSet) -> Optional[Command]:
+        """
+        Redoes the latest undone edit.
+        :param minutiae: The minutiae.
+        :return: The command that was applied, or None if there was nothing to redo.
+        """
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        self._undo.append(command)
+        apply_command(minutiae, command)
+        self._write({'redo': True})
+        return command
+
+    def can_undo(self) -> bool:
+        return len(self._undo) > 0
+
+    def can_redo(self) -> bool:
+        return len(self._redo) > 0
+
+    def saved(self):
+        """
+        Deletes the journal once the minutiae have been saved, the edits can still be undone.
+        """
+        self._close_journal()
+        if self.journal_path is not None and self.journal_path.exists():
+            self.journal_path.unlink()
+
+    def recover(self) -> MinutiaSet:
+        """
+        Replays the journal, the edits that were undone can be redone and those that weren't can be undone.
+        :return: The minutiae as they were after the last edit in the journal.
+        """
+        self.reset()
+        base = None
+        with self.journal_path.open('r', encoding='utf-8') as journal:
+            for line_number, line in enumerate(journal, 1):
+                try:
+                    record = json.loads(line)
+                    if 'base' in record:
+                        base = [_decode_minutia(row) for row in record['base']]
+                        self._undo, self._redo = [], []
+                    elif 'do' in record:
+                        self._undo.append(_decode_command(record['do']))
+                        self._redo = []
+                    elif 'undo' in record:
+                        self._redo.append(self._undo.pop())
+                    elif 'redo' in record:
+                        self._undo.append(self._redo.pop())
+                    else:
+                        raise ValueError("unknown record")
+                except (ValueError, KeyError, TypeError, IndexError) as e:
+                    if line.endswith('\n'):
+                        raise CorruptFileError("Line {} of the journal '{}' is corrupt: {}"
+                                               .format(line_number, self.journal_path, e))
+                    # Only the last record can be incomplete, it was being written when the application stopped.
+                    break
+        if base is None:
+            raise CorruptFileError("The journal '{}' has no minutiae to replay edits on.".format(self.journal_path))
+
+        # Replaying on a list is faster than on a MinutiaSet, as its arrays would be copied by every insert.
+        for command in self._undo:
+            apply_command(base, command)
+        minutiae = MinutiaSet.from_minutiae(base)
+        self._start_journal(minutiae)
+        return minutiae
+
+    def close(self):
+        self._close_journal()
+
+    def _start_journal(self, minutiae: MinutiaSet):
+        """
+        Starts a journal with the minutiae before any edits, and the edits that can be undone and redone. If it can't
+        be written, e.g. because the image's directory is read only, no journal is kept.
+        :param minutiae: The minutiae as they are now, with every edit that can be undone applied.
+        """
+        self._close_journal()
+        # The base is the minutiae before the edits that can be undone, as they are replayed on it:
+        base = list(minutiae)
+        for command in reversed(self._undo):
+            apply_command(base, inverse(command))
+
+        # The new journal replaces the old one in a single step, so a crash while writing it can't lose either:
+        temporary_path = self.journal_path.with_name(self.journal_path.name + '.tmp')
+        try:
+            self._journal = temporary_path.open('w', encoding='utf-8')
+            self._append({'base': [_encode_minutia(minutia) for minutia in base]})
+            for command in self._undo:
+                self._append({'do': _encode_command(command)})
+            for command in reversed(self._redo):
+                self._append({'do': _encode_command(command)})
+            for _ in self._redo:
+                self._append({'undo': True})
+            os.replace(str(temporary_path), str(self.journal_path))
+        except OSError as e:
+            self._stop_journal(e)
+            try:
+                temporary_path.unlink()
+            except OSError:
+                pass
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _write(self, record: dict):
+        """
+        Appends a record to the journal, and waits for it to reach the disk. The journal is stopped if it can't be.
+        """
+        if self._journal is None:
+            return
+        try:
+            self._append(record)
+        except OSError as e:
+            self._stop_journal(e)
+
+    def _append(self, record: dict):
+        self._journal.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _stop_journal(self, error: OSError):
+        """
+        Stops keeping a journal for the rest of the session, as it couldn't be written.
+        :param error: The error in writing the journal.
+        """
+        self.journal_error = error
+        try:
+            self._close_journal()
+        except OSError:
+            self._journal = None
+
+
+def journal_path_for(image_path: Path) -> Path:
+    """
+    Finds where the journal of edits to an image's minutiae is kept.
+    :param image_path: The path of the image.
+    :return: The path of the journal, next to the image.
+    """
+    return image_path.with_name(image_path.name + '.journal')
+
+
+def _encode_minutia(minutia: Minutia) -> list:
+    return [minutia.x, minutia.y, minutia.angle, MINUTIA_TYPE_CODES[minutia.minutia_type], minutia.quality]
+
+
+def _decode_minutia(row: Sequence) -> Minutia:
+    x, y, angle, code, quality = row
+    return Minutia(int(x), int(y), float(angle), MINUTIA_TYPES[code], float(quality))
+
+
+def _encode_command(command: Command) -> dict:
+    if isinstance(command, InsertMinutiae):
+        return {'insert': list(command.indices), 'minutiae': [_encode_minutia(m) for m in command.minutiae]}
+    elif isinstance(command, RemoveMinutiae):
+        return {'remove': list(command.indices), 'minutiae': [_encode_minutia(m) for m in command.minutiae]}
+    elif isinstance(command, MoveMinutia):
+        return {'move': command.index, 'old': _encode_minutia(command.old), 'new': _encode_minutia(command.new)}
+    else:
+        raise AttributeError("Unknown command: {}".format(command))
+
+
+def _decode_command(record: dict) -> Command:
+    if 'insert' in record:
+        return InsertMinutiae(tuple(record['insert']), tuple(_decode_minutia(row) for row in record['minutiae']))
+    elif 'remove' in record:
+        return RemoveMinutiae(tuple(record['remove']), tuple(_decode_minutia(row) for row in record['minutiae']))
+    elif 'move' in record:
+        return MoveMinutia(record['move'], _decode_minutia(record['old']), _decode_minutia(record['new']))
+    else:
+        raise ValueError("unknown command")
@@ -3,3 +3,17 @@ class CorruptFileError(Exception):
     The minutiae file was of the incorrect format and could not be parsed.
     """
     pass
+
+
+class MindtctError(Exception):
+    """
+    MINDTCT failed, timed out or did not produce a minutiae file.
+    """
+    pass
+
+
+class MindtctCancelledError(MindtctError):
+    """
+    MINDTCT was killed because its extraction was cancelled.
+    """
+    pass
@@ -0,0 +1,173 @@
+import struct
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.minutia import MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet, MINUTIA_TYPE_CODES
+
+# Finger minutiae records of ISO/IEC 19794-2:2005 and ANSI/INCITS 378-2004 are a header followed by finger views, which
+# each hold a block of six byte minutiae.
+FORMAT_IDENTIFIER = b'FMR\x00'
+VERSION = b' 20\x00'
+# The default resolution of the images, in pixels per centimetre (500 ppi).
+DEFAULT_RESOLUTION = 197
+
+# ISO: format identifier, version, record length, capture equipment, width, height, x/y resolution, views, reserved.
+ISO_HEADER = struct.Struct('>4s4sIHHHHHBB')
+# ANSI: as ISO, but with a two byte record length and a CBEFF product identifier.
+ANSI_HEADER = struct.Struct('>4s4sHIHHHHHBB')
+# ANSI records longer than 0xFFFF bytes set the two byte length to zero and follow it with a four byte length.
+ANSI_LONG_HEADER = struct.Struct('>4s4sHIIHHHHHBB')
+# Finger position, view number and impression type, finger quality, number of minutiae.
+FINGER_VIEW_HEADER = struct.Struct('>BBBB')
+MINUTIA = np.dtype([('type_x', '>u2'), ('y', '>u2'), ('angle', 'u1'), ('quality', 'u1')])
+
+# The degrees of one unit of a stored minutia angle.
+ISO_ANGLE_UNIT = 360 / 256
+ANSI_ANGLE_UNIT = 2.0
+
+# The two bit minutia types of the standards.
+_OTHER, _RIDGE_ENDING, _BIFURCATION = 0, 1, 2
+
+FingerView = NamedTuple('FingerView', [('minutiae', MinutiaSet),
+                                       ('finger_position', int),
+                                       ('view_number', int),
+                                       ('impression_type', int),
+                                       ('finger_quality', int)])
+
+
+def parse_template(buffer, ansi: bool) -> List[FingerView]:
+    """
+    Reads the finger views of a template record.
+    :param buffer: The contents of the record.
+    :param ansi: True for an ANSI/INCITS 378 record, False for an ISO/IEC 19794-2 record.
+    :return: The finger views, in the order they are stored.
+    """
+    buffer = memoryview(buffer).cast('B')
+    try:
+        if not ansi:
+            header = ISO_HEADER.unpack_from(buffer)
+            offset = ISO_HEADER.size
+            _, _, length, _, width, height, _, _, views, _ = header
+        elif struct.unpack_from('>H', buffer, 8)[0] != 0:
+            header = ANSI_HEADER.unpack_from(buffer)
+            offset = ANSI_HEADER.size
+            _, _, length, _, _, width, height, _, _, views, _ = header
+        else:
+            header = ANSI_LONG_HEADER.unpack_from(buffer)
+            offset = ANSI_LONG_HEADER.size
+            _, _, _, length, _, _, width, height, _, _, views, _ = header
+    except struct.error:
+        raise CorruptFileError("The file is too short to be a minutiae template.")
+
+    if header[0] != FORMAT_IDENTIFIER or header[1] != VERSION:
+        raise CorruptFileError("The file is not a version 2.0 finger minutiae record.")
+    if length > len(buffer):
+        raise CorruptFileError("The record declared it is {} bytes long, but the file is {} bytes long."
+                               .format(length, len(buffer)))
+
+    image_size = (width, height) if width and height else None
+    angle_unit = ANSI_ANGLE_UNIT if ansi else ISO_ANGLE_UNIT
+    finger_views = []
+    for _ in range(views):
+        try:
+            position, view_impression, finger_quality, count = FINGER_VIEW_HEADER.unpack_from(buffer, offset)
+            offset += FINGER_VIEW_HEADER.size
+            block = np.frombuffer(buffer, MINUTIA, count=count, offset=offset)
+            offset += count * MINUTIA.itemsize
+            extended_length, = struct.unpack_from('>H', buffer, offset)
+            offset += 2 + extended_length
+        except (struct.error, ValueError):
+            raise CorruptFileError("The record ended part way through a finger view.")
+
+        finger_views.append(FingerView(_decode_minutiae(block, angle_unit, image_size), position,
+                                       view_impression >> 4, view_impression & 0x0F, finger_quality))
+    return finger_views
+
+
+def encode_template(finger_views: List[FingerView], image_size: Optional[Tuple[int, int]], ansi: bool,
+                    resolution: int = DEFAULT_RESOLUTION) -> bytes:
+    """
+    Encodes finger views to a template record.
+    :param finger_views: The finger views.
+    :param image_size: The width and height of the image the minutiae are from, or None if it isn't known.
+    :param ansi: True for an ANSI/INCITS 378 record, False for an ISO/IEC 19794-2 record.
+    :param resolution: The resolution of the image in pixels per centimetre.
+    :return: The record.
+    """
+    angle_unit = ANSI_ANGLE_UNIT if ansi else ISO_ANGLE_UNIT
+    width, height = image_size or (0, 0)
+
+    body = []
+    for view in finger_views:
+        minutiae = view.minutiae
+        if len(minutiae) > 255:
+            raise ValueError("A finger view can't hold more than 255 minutiae, there are {}.".format(len(minutiae)))
+        body.append(FINGER_VIEW_HEADER.pack(view.finger_position, (view.view_number << 4) | view.impression_type,
+                                            view.finger_quality, len(minutiae)))
+        body.append(_encode_minutiae(minutiae, angle_unit).tobytes())
+        # No extended data:
+        body.append(struct.pack('>H', 0))
+    body = b''.join(body)
+
+    if not ansi:
+        length = ISO_HEADER.size + len(body)
+        header = ISO_HEADER.pack(FORMAT_IDENTIFIER, VERSION, length, 0, width, height, resolution, resolution,
+                                 len(finger_views), 0)
+    elif ANSI_HEADER.size + len(body) <= 0xFFFF:
+        length = ANSI_HEADER.size + len(body)
+        header = ANSI_HEADER.pack(FORMAT_IDENTIFIER, VERSION, length, 0, 0, width, height, resolution, resolution,
+                                  len(finger_views), 0)
+    else:
+        length = ANSI_LONG_HEADER.size + len(body)
+        header = ANSI_LONG_HEADER.pack(FORMAT_IDENTIFIER, VERSION, 0, length, 0, 0, width, height, resolution,
+                                       resolution, len(finger_views), 0)
+    return header + body
+
+
+def _decode_minutiae(block: np.ndarray, angle_unit: float, image_size: Optional[Tuple[int, int]]) -> MinutiaSet:
+    """
+    Decodes a block of minutiae. The standards measure angles anticlockwise from the x axis, while this application
+    measures them clockwise from the y axis, like MINDTCT. Minutiae of the 'other' type are read as ridge endings.
+    :param block: The minutiae records.
+    :param angle_unit: The degrees of one unit of a stored angle.
+    :param image_size: The width and height of the image the minutiae are from.
+    :return: The minutiae.
+    """
+    standard_types = block['type_x'] >> 14
+    if np.any(standard_types == 3):
+        raise CorruptFileError("Minutiae of reserved type '3'")
+
+    minutia_type = np.where(standard_types == _BIFURCATION, MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION],
+                            MINUTIA_TYPE_CODES[MinutiaType.RIDGE_ENDING])
+    return MinutiaSet(x=block['type_x'] & 0x3FFF,
+                      y=block['y'] & 0x3FFF,
+                      angle=(90 - block['angle'] * angle_unit) % 360,
+                      minutia_type=minutia_type,
+                      quality=block['quality'] / 100,
+                      image_size=image_size)
+
+
+def _encode_minutiae(minutiae: MinutiaSet, angle_unit: float) -> np.ndarray:
+    """
+    Encodes minutiae to a block of minutiae records.
+    :param minutiae: The minutiae.
+    :param angle_unit: The degrees of one unit of a stored angle.
+    :return: The minutiae records.
+    """
+    if len(minutiae) and (np.any((minutiae.x < 0) | (minutiae.x > 0x3FFF)) or
+                          np.any((minutiae.y < 0) | (minutiae.y > 0x3FFF))):
+        raise ValueError("Minutiae co-ordinates must be between 0 and {}.".format(0x3FFF))
+
+    units = round(360 / angle_unit)
+    standard_types = np.where(minutiae.minutia_type == MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION],
+                              _BIFURCATION, _RIDGE_ENDING)
+
+    block = np.empty(len(minutiae), dtype=MINUTIA)
+    block['type_x'] = (standard_types << 14) | minutiae.x
+    block['y'] = minutiae.y
+    block['angle'] = np.rint(((90 - minutiae.angle) % 360) / angle_unit).astype(np.int64) % units
+    block['quality'] = np.clip(np.rint(minutiae.quality * 100), 0, 100)
+    return block
@@ -1,21 +1,37 @@
 import platform
 import traceback
 from pathlib import Path
-from tkinter import NSEW, Canvas, N, W
+from typing import Optional, Tuple
+
+import numpy as np
+from tkinter import NSEW, Canvas, N, W, EW, BooleanVar, StringVar
 from tkinter.filedialog import askopenfilename, asksaveasfilename
-from tkinter.messagebox import showerror
-from tkinter.ttk import Notebook
+from tkinter.messagebox import showerror, askyesno
+from tkinter.ttk import Notebook, Label
 
 from PIL import Image, ImageTk
 from ttkthemes import ThemedTk
 
-from pyminutiaeviewer.gui_common import scale_image_to_fit_minutiae_canvas, MenuBar
+from pyminutiaeviewer import tracing
+from pyminutiaeviewer.edit_log import EditLog, InsertMinutiae, RemoveMinutiae, MoveMinutia, Command, \
+    journal_path_for
+from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.gui_common import MenuBar
 from pyminutiaeviewer.gui_editor import MinutiaeEditorFrame
 from pyminutiaeviewer.gui_mindtct import MindtctFrame
+from pyminutiaeviewer.gui_overlay import MinutiaeOverlay
+from pyminutiaeviewer.image_pyramid import ImagePyramid
 from pyminutiaeviewer.minutia import Minutia
-from pyminutiaeviewer.minutiae_drawing import draw_minutiae
+from pyminutiaeviewer.minutia_set import MinutiaSet
 from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
-from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MINUTIAE_FILE_EXTENSIONS, detect_format
+from pyminutiaeviewer.render_pipeline import RenderStage, RedrawScheduler
+from pyminutiaeviewer.viewport import View, compact_image, fit_view, zoomed_view, panned_view, visible_box, render_view
+
+# The factor one step of the mouse wheel zooms by.
+ZOOM_STEP = 1.25
+# The number of milliseconds between updates of the timings in the status bar.
+TIMINGS_INTERVAL = 500
 
 
 class Root(ThemedTk):
@@ -30,24 +46,41 @@ class Root(ThemedTk):
         img = ImageTk.PhotoImage(file=Path(__file__).resolve().parent / 'images' / 'icon.png')
         self.iconphoto(True, img)
 
+        self.show_timings_var = BooleanVar(value=False)
         self.menu_bar = MenuBar(self)
         self.config(menu=self.menu_bar)
 
         self.rowconfigure(0, weight=1)
         self.columnconfigure(1, weight=1)
 
-        self.minutiae = []
+        # Edits to the minutiae, for undo and redo, journaled next to the image once one is opened:
+        self.edit_log = EditLog()
+        self.minutiae = MinutiaSet()
 
         self.file_path = Path()
 
-        self.image_raw = Image.new('RGBA', (512, 512), (255, 255, 255, 255))
+        # Fingerprints are kept in the most compact mode they can be, usually 'L', until they are displayed:
+        self.image_raw = Image.new('L', (512, 512), 255)
+        self.pyramid = ImagePyramid(self.image_raw)
         self.image_fingerprint = self.image_raw
-        self.image_minutiae = None
         self.image = ImageTk.PhotoImage(self.image_raw)
+        self.image_position = (0, 0)
+        # The zoom and the image co-ordinates of the canvas' top left corner, or None to fit the image to the canvas:
+        self.zoom_and_origin = None
+        self.pan_start = None
+
+        # The stages of rendering the canvas, each is only re-rendered when its inputs change:
+        self.view_stage = RenderStage(render_view)
+        self.adjust_stage = RenderStage(self._adjust_fingerprint)
+        self.photo_stage = RenderStage(self._photo_image)
+        self.overlay_stage = RenderStage(self._draw_minutiae_overlay)
+        # Bursts of resize and slider events are coalesced in to a single redraw:
+        self.redraw_scheduler = RedrawScheduler(self, self.redraw, self.draw_minutiae)
 
         self.image_canvas = Canvas(self, bd=0, highlightthickness=0)
         self.image_canvas.create_image(0, 0, image=self.image, anchor=N + W, tags="IMG")
         self.image_canvas.grid(row=0, column=1, sticky=NSEW)
+        self.minutiae_overlay = MinutiaeOverlay(self.image_canvas)
 
         self.notebook = Notebook(self)
         self.notebook.grid(row=0, column=0, sticky=NSEW)
@@ -58,12 +91,39 @@ class Root(ThemedTk):
         self.notebook.add(self.tabs[0], text="MINDTCT")
         self.notebook.add(self.tabs[1], text="Minutiae Editor")
 
+        # Where the time of the latest redraw and extraction went, shown when timings are turned on:
+        self.latest_spans = tracing.LatestSpans()
+        self.timings_var = StringVar()
+        self.status_bar = Label(self, textvariable=self.timings_var, anchor=W)
+
         self.image_canvas.bind("<Button-1>", self.on_canvas_mouse_left_click)
         self.image_canvas.bind("<Control-Button-1>", self.on_canvas_ctrl_mouse_left_click)
         self.image_canvas.bind("<B1-Motion>", self.on_canvas_mouse_left_drag)
         self.image_canvas.bind("<ButtonRelease-1>", self.on_canvas_mouse_left_release)
         self.image_canvas.bind("<Button-3>", self.on_canvas_mouse_right_click)
-        self.bind("<Configure>", self.redraw)
+        self.image_canvas.bind("<Shift-Button-3>", self.on_canvas_shift_mouse_right_click)
+        self.image_canvas.bind("<B3-Motion>", self.on_canvas_mouse_right_drag)
+        self.image_canvas.bind("<ButtonRelease-3>", self.on_canvas_mouse_right_release)
+        self.image_canvas.bind("<Motion>", self.on_canvas_mouse_move)
+        self.image_canvas.bind("<MouseWheel>", self.on_canvas_mouse_wheel)
+        self.image_canvas.bind("<Button-4>", self.on_canvas_mouse_wheel)
+        self.image_canvas.bind("<Button-5>", self.on_canvas_mouse_wheel)
+        self.image_canvas.bind("<Button-2>", self.on_canvas_mouse_middle_click)
+        self.image_canvas.bind("<B2-Motion>", self.on_canvas_mouse_middle_drag)
+        self.bind("<Control-z>", self.undo)
+        self.bind("<Control-y>", self.redo)
+        self.bind("<Control-Z>", self.redo)
+        self.bind("<Configure>", self.redraw_scheduler.request_redraw)
+
+    @property
+    def minutiae(self) -> MinutiaSet:
+        return self._minutiae
+
+    @minutiae.setter
+    def minutiae(self, minutiae: MinutiaSet):
+        # Edits to the previous minutiae can't be undone on new ones:
+        self._minutiae = minutiae
+        self.edit_log.reset()
 
     def set_title(self, title: str = None):
         """
@@ -75,18 +135,24 @@ class Root(ThemedTk):
         self.title(text + "Py Minutiae Viewer")
 
     def redraw(self, _=None):
-        im = self.image_raw.copy()
-
-        # Apply drawing from each active tab
-        for tab in self.tabs:
-            im = tab.fingerprint_drawing(im)
-
-        # Scale image to fit canvas
-        im, _ = scale_image_to_fit_minutiae_canvas(self.image_canvas, im)
-        self.image_fingerprint = im
-        self.image = ImageTk.PhotoImage(self.image_fingerprint)
-        self.image_canvas.delete("IMG")
-        self.image_canvas.create_image(0, 0, image=self.image, anchor=N + W, tags="IMG")
+        """
+        Renders the fingerprint and minutiae to the canvas. The visible part of the image is rendered from the tiles of
+        its pyramid and adjusted by each tab, then the minutiae in view are drawn over it as canvas items. Only the
+        stages whose inputs changed are re-rendered.
+        """
+        self.redraw_scheduler.discard(fingerprint=True)
+        region, position = self.view_stage(self.pyramid, self.view())
+        self.image_fingerprint = self.adjust_stage(region,
+                                                   key=tuple(tab.fingerprint_drawing_key() for tab in self.tabs))
+
+        image = self.photo_stage(self.image_fingerprint)
+        if image is not self.image or position != self.image_position:
+            self.image = image
+            self.image_position = position
+            self.image_canvas.delete("IMG")
+            self.image_canvas.create_image(*position, image=self.image, anchor=N + W, tags="IMG")
+            # Keep the minutiae, highlights and selections above the image:
+            self.image_canvas.tag_lower("IMG")
 
         # Draw minutiae
         self.draw_minutiae()
@@ -95,33 +161,61 @@ class Root(ThemedTk):
         file_path = askopenfilename(filetypes=(("Image files", ('*.bmp', '*.jpeg', '*.jpg', '*.png')),
                                                ("All files", "*.*")))
         if file_path:
-            self.image_raw = Image.open(file_path).convert("RGBA")
+            with tracing.span('image.decode', path=file_path):
+                self.image_raw = compact_image(Image.open(file_path))
+            self.pyramid = ImagePyramid(self.image_raw)
+            self.zoom_and_origin = None
             self.redraw()
             self.file_path = Path(file_path).resolve()
             self.set_title(self.file_path.name)
-            self.minutiae = []
+            self.edit_log.close()
+            self.edit_log = EditLog(journal_path_for(self.file_path))
+            self.minutiae = MinutiaSet()
             self.update_idletasks()
 
             self.tabs[self.notebook.index("current")].load_fingerprint_image(self.image_raw)
+            self._recover_edits()
+
+    def _recover_edits(self):
+        """
+        Offers to replay the journal of edits left from a previous session that wasn't saved.
+        """
+        if not self.edit_log.journal_path.exists():
+            return
+        if not askyesno("Recover Edits", "Minutiae edits to this image were not exported in a previous session.\n\n"
+                                         "Would you like to recover them?"):
+            return
+        try:
+            minutiae = self.edit_log.recover()
+        except Exception as e:
+            traceback.print_exc()
+            showerror("Recover Edits", "There was an error in recovering the edits.\n\n"
+                                       "The error message was:\n{}".format(e))
+            return
+        self._minutiae = minutiae
+        self.draw_minutiae()
+        for tab in self.tabs:
+            tab.minutiae_changed()
 
     def load_minutiae_file(self):
         file_path = askopenfilename(initialfile=self.file_path.stem,
-                                    filetypes=(("All minutiae files", ('*.min', '*.sim', '*.xyt')),
+                                    filetypes=(("All minutiae files", ('*.min', '*.sim', '*.xyt', '*.mnb', '*.ist',
+                                                                         '*.ansi')),
                                                ("Simple minutiae file", '*.sim'),
                                                ("NBIST minutiae file", '*.min'),
                                                ("x y theta file", '*.xyt'),
+                                               ("Binary minutiae file", '*.mnb'),
+                                               ("ISO 19794-2 template", '*.ist'),
+                                               ("ANSI 378 template", '*.ansi'),
                                                ("All files", "*.*")))
         if file_path:
-            # Select the correct file format
-            if Path(file_path).suffix == '.sim':
-                reader = MinutiaeReader(MinutiaeFileFormat.SIMPLE)
-            elif Path(file_path).suffix == '.min':
-                reader = MinutiaeReader(MinutiaeFileFormat.NBIST)
-            elif Path(file_path).suffix == '.xyt':
-                reader = MinutiaeReader(MinutiaeFileFormat.XYT)
-            else:
-                showerror("Read Minutiae File", "The chosen file had an extension of '{}', which can't be interpreted."
-                          .format(Path(file_path).suffix))
+            # The format is detected from the file's contents, so files with other extensions can be read too
+            try:
+                reader = MinutiaeReader(detect_format(file_path,
+                                                      MINUTIAE_FILE_EXTENSIONS.get(Path(file_path).suffix.lower())))
+            except (CorruptFileError, OSError) as e:
+                showerror("Read Minutiae File", "The format of the chosen file couldn't be detected.\n\n"
+                                                "The error message was:\n{}".format(e))
                 return
 
             try:
@@ -138,22 +232,22 @@ class Root(ThemedTk):
         file_path = asksaveasfilename(initialfile=self.file_path.stem,
                                       filetypes=(("Simple minutiae file", '*.sim'),
                                                  ("NBIST minutiae file", '*.min'),
-                                                 ("x y theta file", '*.xyt')))
+                                                 ("x y theta file", '*.xyt'),
+                                                 ("Binary minutiae file", '*.mnb'),
+                                                 ("ISO 19794-2 template", '*.ist'),
+                                                 ("ANSI 378 template", '*.ansi')))
         if file_path:
             # Select the correct file format
-            if Path(file_path).suffix == '.sim':
-                writer = MinutiaeEncoder(MinutiaeFileFormat.SIMPLE)
-            elif Path(file_path).suffix == '.min':
-                writer = MinutiaeEncoder(MinutiaeFileFormat.NBIST)
-            elif Path(file_path).suffix == '.xyt':
-                writer = MinutiaeEncoder(MinutiaeFileFormat.XYT)
-            else:
+            file_format = MINUTIAE_FILE_EXTENSIONS.get(Path(file_path).suffix)
+            if file_format is None:
                 showerror("Save Minutiae File", "The chosen file had an extension of '{}', which can't be interpreted."
                           .format(Path(file_path).suffix))
                 return
+            writer = MinutiaeEncoder(file_format)
 
             try:
-                writer.write(file_path, self.minutiae, self.image_raw)
+                writer.write(file_path, self.minutiae, self.image_raw, atomic=True)
+                self.edit_log.saved()
             except Exception as e:
                 traceback.print_exc()
                 showerror("Save Minutiae File", "There was an error in saving the minutiae file.\n\n"
@@ -163,38 +257,201 @@ class Root(ThemedTk):
         """
         Attempts to exit the application. 
         """
+        self.edit_log.close()
+        if self.show_timings_var.get():
+            tracing.tracer.disable()
         self.destroy()
 
+    def toggle_timings(self):
+        """
+        Shows or hides the status bar of timings, timing is only turned on while they are shown.
+        """
+        if self.show_timings_var.get():
+            self.latest_spans.clear()
+            tracing.tracer.add_listener(self.latest_spans)
+            tracing.tracer.enable()
+            self.status_bar.grid(row=1, column=0, columnspan=2, sticky=EW)
+            self._update_timings()
+        else:
+            tracing.tracer.disable()
+            tracing.tracer.remove_listener(self.latest_spans)
+            self.status_bar.grid_remove()
+
+    def _update_timings(self):
+        if not self.show_timings_var.get():
+            return
+        # Spans can finish on extraction threads, so they are collected and shown from the GUI thread:
+        spans = self.latest_spans.spans()
+        text = "   ".join("{} {:.1f} ms".format(span.name, span.duration * 1000) for span in spans)
+        peak_memory = max((span.peak_memory for span in spans if span.peak_memory is not None), default=None)
+        if peak_memory is not None:
+            text += "   |   peak {:.0f} MB".format(peak_memory / 2 ** 20)
+        peak_rss = tracing.peak_rss()
+        if peak_rss is not None:
+            text += ", peak RSS {:.0f} MB".format(peak_rss / 2 ** 20)
+        self.timings_var.set(text)
+        self.after(TIMINGS_INTERVAL, self._update_timings)
+
     def draw_minutiae(self):
+        """
+        Draws the minutiae over the fingerprint, the fingerprint is not re-rendered.
+        """
+        self.redraw_scheduler.discard(fingerprint=False)
+        self.overlay_stage(self.minutiae, self.view(), key=self._overlay_key())
+        self.update_idletasks()
 
-        # Apply filtering from each active module
-        minutiae = [m.copy() for m in self.minutiae]
-        for tab in self.tabs:
-            minutiae = tab.minutiae_filtering(minutiae)
+    def add_minutia(self, minutia: Minutia):
+        """
+        Adds a minutia as an edit that can be undone, only its own canvas items are drawn.
+        :param minutia: The minutia, in image co-ordinates.
+        """
+        self._edit(InsertMinutiae((len(self.minutiae),), (minutia,)))
 
-        # Scale minutiae
-        ratio = self.image_fingerprint.width / self.image_raw.width
-        minutiae = [Minutia(int(m.x * ratio), int(m.y * ratio), m.angle, m.minutia_type, m.quality) for m in minutiae]
+    def remove_minutiae(self, indices):
+        """
+        Removes minutiae as an edit that can be undone, only their own canvas items are deleted.
+        :param indices: The index, or an array of indices, of the minutiae to remove.
+        """
+        indices = tuple(np.unique(indices).tolist())
+        self._edit(RemoveMinutiae(indices, tuple(self.minutiae[index] for index in indices)))
 
-        im = Image.new('RGBA', self.image_fingerprint.size, (0, 0, 0, 0))
-        self.image_minutiae = draw_minutiae(im, minutiae)
+    def undo(self, _=None):
+        """
+        Undoes the latest edit to the minutiae.
+        """
+        self._edited(self.edit_log.undo(self.minutiae))
 
-        im = self.image_fingerprint.copy()
-        im.paste(self.image_minutiae, (0, 0), self.image_minutiae)
-        self.image = ImageTk.PhotoImage(im)
-        self.image_canvas.delete("IMG")
-        self.image_canvas.create_image(0, 0, image=self.image, anchor=N + W, tags="IMG")
-        self.update_idletasks()
+    def redo(self, _=None):
+        """
+        Redoes the latest undone edit to the minutiae.
+        """
+        self._edited(self.edit_log.redo(self.minutiae))
+
+    def _edit(self, command: Command):
+        journaling = self.edit_log.journal_error is None
+        self.edit_log.do(self.minutiae, command)
+        self._update_overlay(command)
+        if journaling and self.edit_log.journal_error is not None:
+            showerror("Journal Edits", "The journal of edits couldn't be written, so edits made from now on can't be "
+                                       "recovered if the application stops before they are exported.\n\n"
+                                       "The error message was:\n{}".format(self.edit_log.journal_error))
+
+    def _edited(self, command: Optional[Command]):
+        if command is None:
+            return
+        self._update_overlay(command)
+        for tab in self.tabs:
+            tab.minutiae_changed()
 
-    def draw_single_minutia(self, minutia: Minutia):
-        temp_image = draw_minutiae(self.image_minutiae, [minutia])
-        im = self.image_fingerprint.copy()
-        im.paste(temp_image, (0, 0), temp_image)
+    def _update_overlay(self, command: Command):
+        """
+        Updates the canvas items of the minutiae changed by a command that has been applied to the minutiae.
+        :param command: The command.
+        """
+        if isinstance(command, RemoveMinutiae):
+            self.minutiae_overlay.remove(command.indices)
+        else:
+            if isinstance(command, MoveMinutia):
+                self.minutiae_overlay.remove([command.index])
+                indices, added = (command.index,), (command.new,)
+            else:
+                indices, added = command.indices, command.minutiae
+            added_set = MinutiaSet.from_minutiae(added)
+            shown = self.minutiae_mask(added_set) & self._in_view(added_set, self.view())
+            for index, minutia, minutia_shown in zip(indices, added, shown.tolist()):
+                self.minutiae_overlay.insert(index, minutia, minutia_shown)
+        self._overlay_updated()
+
+    def preview_minutia(self, minutia: Optional[Minutia]):
+        """
+        Draws a minutia that is being placed, without adding it to the minutiae.
+        :param minutia: The minutia in image co-ordinates, or None to remove the preview.
+        """
+        self.minutiae_overlay.preview(minutia)
 
-        self.image = ImageTk.PhotoImage(im)
-        self.image_canvas.delete("IMG")
-        self.image_canvas.create_image(0, 0, image=self.image, anchor=N + W, tags="IMG")
-        self.update_idletasks()
+    def minutiae_mask(self, minutiae: MinutiaSet) -> np.ndarray:
+        """
+        Combines the filtering of each tab.
+        :param minutiae: The minutiae.
+        :return: A boolean mask of the minutiae to show.
+        """
+        mask = np.ones(len(minutiae), dtype=bool)
+        for tab in self.tabs:
+            mask &= tab.minutiae_mask(minutiae)
+        return mask
+
+    def _draw_minutiae_overlay(self, minutiae: MinutiaSet, view: View):
+        with tracing.span('minutiae.filter', minutiae=len(minutiae)):
+            shown = self.minutiae_mask(minutiae) & self._in_view(minutiae, view)
+        size = self._marker_size()
+        overlay = self.minutiae_overlay
+        with tracing.span('minutiae.overlay'):
+            if overlay.version == minutiae.version and overlay.view == view and overlay.size == size:
+                # Only the filtering changed, e.g. the quality slider moved:
+                overlay.show(minutiae, shown)
+            else:
+                overlay.draw(minutiae, shown, view, size)
+
+    def _in_view(self, minutiae: MinutiaSet, view: View) -> np.ndarray:
+        """
+        Finds the minutiae that are drawn within the canvas, so the ones out of view don't need canvas items.
+        :param minutiae: The minutiae.
+        :param view: The part of the image shown on the canvas.
+        :return: A boolean mask of the minutiae in view.
+        """
+        box = visible_box(view, self.image_raw.size)
+        if box is None:
+            return np.zeros(len(minutiae), dtype=bool)
+        # Include minutiae just outside the image whose markers reach in to view:
+        margin = 1.5 * self._marker_size() / view.zoom
+        return minutiae.region_mask(box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin)
+
+    def _marker_size(self) -> float:
+        # Markers are the same size on screen at every zoom, the size they are when the image fits the canvas
+        fit = self._fit_view()
+        return min(self.image_raw.size) * fit.zoom / 512.0 * 10.0
+
+    def _overlay_key(self) -> tuple:
+        return self.minutiae.version, tuple(tab.minutiae_mask_key() for tab in self.tabs)
+
+    def _overlay_updated(self):
+        # The overlay was updated in place, so it matches the minutiae's new version:
+        self.minutiae_overlay.version = self.minutiae.version
+        self.overlay_stage.mark_current(self.minutiae, self.view(), key=self._overlay_key())
+
+    def _adjust_fingerprint(self, image: Image.Image) -> Image.Image:
+        # Apply drawing from each active tab, which return new images rather than drawing on the cached region
+        with tracing.span('image.adjust', mode=image.mode):
+            for tab in self.tabs:
+                image = tab.fingerprint_drawing(image)
+        return image
+
+    @staticmethod
+    def _photo_image(image: Image.Image) -> ImageTk.PhotoImage:
+        with tracing.span('image.photo'):
+            return ImageTk.PhotoImage(image)
+
+    def highlight_minutia(self, index: Optional[int], radius: float = 8):
+        """
+        Outlines a minutia on the canvas, replacing the previous outline.
+        :param index: The index of the minutia, or None to remove the outline.
+        :param radius: The radius of the outline in canvas pixels.
+        """
+        self.image_canvas.delete("HIGHLIGHT")
+        if index is None:
+            return
+        x, y = self.image_to_canvas(self.minutiae.x[index], self.minutiae.y[index])
+        self.image_canvas.create_oval(x - radius, y - radius, x + radius, y + radius, outline='#00a0ff', width=2,
+                                      tags="HIGHLIGHT")
+
+    def draw_selection_box(self, box: Optional[Tuple[int, int, int, int]]):
+        """
+        Draws a selection rectangle on the canvas, replacing the previous one.
+        :param box: The canvas co-ordinates of two opposite corners, or None to remove the rectangle.
+        """
+        self.image_canvas.delete("SELECTION")
+        if box is not None:
+            self.image_canvas.create_rectangle(*box, outline='#00a0ff', dash=(4, 2), tags="SELECTION")
 
     def number_of_minutiae(self):
         """
@@ -210,7 +467,8 @@ class Root(ThemedTk):
         :param y: y co-ordinate of the point to test.
         :return: True if point is in the image, false otherwise.
         """
-        if x > self.image.width() or y > self.image.height():
+        x, y = self.canvas_to_image(x, y)
+        if x < 0 or y < 0 or x > self.image_raw.width or y > self.image_raw.height:
             return False
         else:
             return True
@@ -220,7 +478,83 @@ class Root(ThemedTk):
         Calculates the ratio between the canvas image's actual size and its displayed size.
         :return: The ratio.
         """
-        return self.image_raw.width / self.image.width()
+        return 1 / self.view().zoom
+
+    def canvas_to_image(self, x: float, y: float) -> Tuple[float, float]:
+        """
+        Converts a point on the canvas to image co-ordinates.
+        :param x: x co-ordinate of the point on the canvas.
+        :param y: y co-ordinate of the point on the canvas.
+        :return: The point in image co-ordinates.
+        """
+        view = self.view()
+        return view.x + x / view.zoom, view.y + y / view.zoom
+
+    def image_to_canvas(self, x: float, y: float) -> Tuple[float, float]:
+        """
+        Converts a point in image co-ordinates to a point on the canvas.
+        :param x: x co-ordinate of the point in the image.
+        :param y: y co-ordinate of the point in the image.
+        :return: The point on the canvas.
+        """
+        view = self.view()
+        return (x - view.x) * view.zoom, (y - view.y) * view.zoom
+
+    def view(self) -> View:
+        """
+        Returns the part of the image shown on the canvas.
+        :return: The view.
+        """
+        fit = self._fit_view()
+        if self.zoom_and_origin is None:
+            return fit
+        return View(*self.zoom_and_origin, width=fit.width, height=fit.height)
+
+    def zoom(self, factor: float, x: float = None, y: float = None):
+        """
+        Zooms the view about a point on the canvas.
+        :param factor: The factor to multiply the zoom by.
+        :param x: x co-ordinate of the point on the canvas, defaults to the centre of the canvas.
+        :param y: y co-ordinate of the point on the canvas, defaults to the centre of the canvas.
+        """
+        view = self.view()
+        x = view.width / 2 if x is None else x
+        y = view.height / 2 if y is None else y
+        self.zoom_and_origin = zoomed_view(view, factor, x, y, self._fit_view().zoom)[:3]
+        self.redraw_scheduler.request_redraw()
+
+    def zoom_in(self):
+        self.zoom(ZOOM_STEP)
+
+    def zoom_out(self):
+        self.zoom(1 / ZOOM_STEP)
+
+    def zoom_to_fit(self):
+        """
+        Shows the whole image, scaled to fit the canvas.
+        """
+        self.zoom_and_origin = None
+        self.redraw_scheduler.request_redraw()
+
+    def _fit_view(self) -> View:
+        canvas_size = (max(1, self.image_canvas.winfo_width()), max(1, self.image_canvas.winfo_height()))
+        return fit_view(self.image_raw.size, canvas_size)
+
+    def on_canvas_mouse_wheel(self, event):
+        # Windows and macOS report the wheel in event.delta, X11 as buttons 4 and 5
+        zoom_in = event.delta > 0 if event.num not in (4, 5) else event.num == 4
+        self.zoom(ZOOM_STEP if zoom_in else 1 / ZOOM_STEP, event.x, event.y)
+
+    def on_canvas_mouse_middle_click(self, event):
+        self.pan_start = (event.x, event.y)
+
+    def on_canvas_mouse_middle_drag(self, event):
+        if self.pan_start is None:
+            return
+        dx, dy = event.x - self.pan_start[0], event.y - self.pan_start[1]
+        self.pan_start = (event.x, event.y)
+        self.zoom_and_origin = panned_view(self.view(), dx, dy)[:3]
+        self.redraw_scheduler.request_redraw()
 
     def on_canvas_mouse_left_click(self, event):
         self.tabs[self.notebook.index('current')].on_canvas_mouse_left_click(event)
@@ -236,3 +570,15 @@ class Root(ThemedTk):
 
     def on_canvas_mouse_right_click(self, event):
         self.tabs[self.notebook.index('current')].on_canvas_mouse_right_click(event)
+
+    def on_canvas_shift_mouse_right_click(self, event):
+        self.tabs[self.notebook.index('current')].on_canvas_shift_mouse_right_click(event)
+
+    def on_canvas_mouse_right_drag(self, event):
+        self.tabs[self.notebook.index('current')].on_canvas_mouse_right_drag(event)
+
+    def on_canvas_mouse_right_release(self, event):
+        self.tabs[self.notebook.index('current')].on_canvas_mouse_right_release(event)
+
+    def on_canvas_mouse_move(self, event):
+        self.tabs[self.notebook.index('current')].on_canvas_mouse_move(event)
@@ -3,11 +3,12 @@ from tkinter.messagebox import showinfo
 from tkinter.scrolledtext import ScrolledText
 from tkinter.ttk import Frame, Button, Label, Widget
 from types import FunctionType
-from typing import Tuple, List
+from typing import Tuple
 
+import numpy as np
 from PIL import Image
 
-from pyminutiaeviewer.minutia import Minutia
+from pyminutiaeviewer.minutia_set import MinutiaSet
 
 
 class NotebookTabBase(Frame):
@@ -28,6 +29,12 @@ class NotebookTabBase(Frame):
         """
         pass
 
+    def minutiae_changed(self):
+        """
+        Called when the root's minutiae are changed by undoing or redoing an edit, or by recovering edits.
+        """
+        pass
+
     def on_canvas_mouse_left_click(self, event):
         """
         Called when the left mouse button is pressed while on the canvas.
@@ -58,20 +65,61 @@ class NotebookTabBase(Frame):
         """
         pass
 
+    def on_canvas_shift_mouse_right_click(self, event):
+        """
+        Called when the shift key and right mouse button are pressed while on the canvas.
+        """
+        pass
+
+    def on_canvas_mouse_right_drag(self, event):
+        """
+        Called when the right mouse button is held down and moved while on the canvas.
+        """
+        pass
+
+    def on_canvas_mouse_right_release(self, event):
+        """
+        Called when the right mouse button is released.
+        """
+        pass
+
+    def on_canvas_mouse_move(self, event):
+        """
+        Called when the mouse moves over the canvas.
+        """
+        pass
+
     def fingerprint_drawing(self, image: Image) -> Image:
         """
-        The function the root calls to draw on to.
+        The function the root calls to draw on to. The image is shared with the root's render cache, so it must not be
+        drawn on in place. It is in 'L' mode for grey fingerprints, and should only be converted to another mode when
+        necessary, as the conversion is repeated on every redraw.
         :param image: The image to draw on to.
-        :return: The edited image.
+        :return: The edited image, or the image itself if it is unchanged.
         """
         return image
 
-    def minutiae_filtering(self, minutiae: List[Minutia]) -> List[Minutia]:
+    def fingerprint_drawing_key(self) -> tuple:
+        """
+        The settings fingerprint_drawing depends on, the root only redraws the fingerprint when they change.
+        :return: The settings.
+        """
+        return ()
+
+    def minutiae_mask(self, minutiae: MinutiaSet) -> np.ndarray:
         """
         The function the root calls to allow modules to refine the minutiae to be shown.
-        :param minutiae: The image to draw on to.
+        :param minutiae: The minutiae to be shown. This may be the root's own set, so it must not be modified.
+        :return: A boolean mask of the minutiae to show.
         """
-        return minutiae
+        return np.ones(len(minutiae), dtype=bool)
+
+    def minutiae_mask_key(self) -> tuple:
+        """
+        The settings minutiae_mask depends on, the root only redraws the minutiae when they change.
+        :return: The settings.
+        """
+        return ()
 
 
 class MinutiaeFrameBase(Frame):
@@ -107,6 +155,20 @@ class MenuBar(Menu):
         file_menu.add_command(label="Exit", command=parent.exit_application)
         self.add_cascade(label="File", menu=file_menu)
 
+        edit_menu = Menu(self, tearoff=0)
+        edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=parent.undo)
+        edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=parent.redo)
+        self.add_cascade(label="Edit", menu=edit_menu)
+
+        view_menu = Menu(self, tearoff=0)
+        view_menu.add_command(label="Zoom In", command=parent.zoom_in)
+        view_menu.add_command(label="Zoom Out", command=parent.zoom_out)
+        view_menu.add_command(label="Zoom to Fit", command=parent.zoom_to_fit)
+        view_menu.add_separator()
+        view_menu.add_checkbutton(label="Show Timings", variable=parent.show_timings_var,
+                                  command=parent.toggle_timings)
+        self.add_cascade(label="View", menu=view_menu)
+
 
 def about_info_box():
     """
@@ -139,7 +201,7 @@ def scale_image_to_fit_minutiae_canvas(canvas: Canvas, im: Image.Image) -> Tuple
     canvas_size = (canvas.winfo_width(), canvas.winfo_height())
     ratio = aspect_ratio_for_scaling(canvas_size, im.size)
     new_size = (int(w * ratio), int(h * ratio))
-    return im.resize(new_size, Image.ANTIALIAS), ratio
+    return im.resize(new_size, Image.LANCZOS), ratio
 
 
 def validate_float(value_if_allowed: str, character: str) -> bool:
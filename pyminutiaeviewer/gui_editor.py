@@ -2,12 +2,16 @@ import math
 from pathlib import Path
 from tkinter import W, N, E, StringVar, PhotoImage
 from tkinter.ttk import Button, Label, LabelFrame
+from typing import Optional
 
 from overrides import overrides
 
 from pyminutiaeviewer.gui_common import NotebookTabBase
 from pyminutiaeviewer.minutia import Minutia, MinutiaType
 
+# How close, in canvas pixels, the mouse must be to a minutia to select it.
+SELECTION_DISTANCE = 10
+
 
 class MinutiaeEditorFrame(NotebookTabBase):
     # TODO: I'd like to remove the <minutiae> parameter
@@ -21,6 +25,8 @@ class MinutiaeEditorFrame(NotebookTabBase):
         self._update_minutiae_count()
 
         self.current_minutiae = None
+        self.hovered_minutia = None
+        self.selection_start = None
 
         self.load_minutiae_btn = Button(self, text="Load Minutiae", command=load_minutiae_func)
         self.load_minutiae_btn.grid(row=1, column=0, sticky=N + W + E)
@@ -33,10 +39,17 @@ class MinutiaeEditorFrame(NotebookTabBase):
 
     @overrides
     def load_fingerprint_image(self, image):
+        self._clear_highlight()
         self._update_minutiae_count()
 
     @overrides
     def load_minutiae_file(self):
+        self._clear_highlight()
+        self._update_minutiae_count()
+
+    @overrides
+    def minutiae_changed(self):
+        self._clear_highlight()
         self._update_minutiae_count()
 
     def _update_minutiae_count(self):
@@ -73,28 +86,78 @@ class MinutiaeEditorFrame(NotebookTabBase):
         if not self.root.is_point_in_canvas_image(x, y):
             return
 
-        scale_factor = self.root.canvas_image_scale_factor()
-        x, y = x * scale_factor, y * scale_factor
+        closest = self._minutia_at(x, y)
+        if closest is None:
+            return
+        else:
+            self.root.remove_minutiae(closest)
 
-        possible_minutiae = []
+        self._minutiae_removed()
 
-        for i in range(self.root.number_of_minutiae()):
-            m = self.root.minutiae[i]
-            dist = abs(m.x - x) + abs(m.y - y)
-            if dist < 10:
-                possible_minutiae.append((dist, i))
+    @overrides
+    def on_canvas_shift_mouse_right_click(self, event):
+        """
+        Starts a box selection of minutiae to remove.
+        """
+        self.selection_start = (event.x, event.y)
 
-        # Sort ascending, in-place.
-        possible_minutiae.sort(key=lambda tup: tup[0])
+    @overrides
+    def on_canvas_mouse_right_drag(self, event):
+        """
+        Resizes the box selection.
+        """
+        if self.selection_start is None:
+            return
+        self.root.draw_selection_box(self.selection_start + (event.x, event.y))
 
-        if len(possible_minutiae) == 0:
+    @overrides
+    def on_canvas_mouse_right_release(self, event):
+        """
+        Removes the minutiae in the box selection.
+        """
+        if self.selection_start is None:
             return
-        else:
-            del self.root.minutiae[possible_minutiae[0][1]]
+        sx, sy = self.selection_start
+        self.selection_start = None
+        self.root.draw_selection_box(None)
+
+        selected = self.root.minutiae.spatial_index().in_box(*self.root.canvas_to_image(sx, sy),
+                                                             *self.root.canvas_to_image(event.x, event.y))
+        if len(selected) == 0:
+            return
+        self.root.remove_minutiae(selected)
+
+        self._minutiae_removed()
+
+    @overrides
+    def on_canvas_mouse_move(self, event):
+        """
+        Highlights the minutia under the mouse, which a right click would remove.
+        """
+        hovered = self._minutia_at(event.x, event.y)
+        if hovered != self.hovered_minutia:
+            self.hovered_minutia = hovered
+            self.root.highlight_minutia(hovered)
 
-        self.root.draw_minutiae()
+    def _minutia_at(self, x: int, y: int) -> Optional[int]:
+        """
+        Finds the minutia closest to a point on the canvas.
+        :param x: x co-ordinate of the point.
+        :param y: y co-ordinate of the point.
+        :return: The index of the minutia, or None if there isn't one within the selection distance.
+        """
+        x, y = self.root.canvas_to_image(x, y)
+        distance = SELECTION_DISTANCE * self.root.canvas_image_scale_factor()
+        return self.root.minutiae.spatial_index().nearest(x, y, distance)
+
+    def _minutiae_removed(self):
+        self._clear_highlight()
         self._update_minutiae_count()
 
+    def _clear_highlight(self):
+        self.hovered_minutia = None
+        self.root.highlight_minutia(None)
+
     @overrides
     def on_canvas_mouse_left_drag(self, event):
         """
@@ -105,9 +168,10 @@ class MinutiaeEditorFrame(NotebookTabBase):
         ((sx, sy), minutiae_type) = self.current_minutiae
         angle = math.degrees(math.atan2(y - sy, x - sx)) + 90
 
+        sx, sy = self.root.canvas_to_image(sx, sy)
         minutia = Minutia(round(sx), round(sy), angle, minutiae_type, 1.0)
 
-        self.root.draw_single_minutia(minutia)
+        self.root.preview_minutia(minutia)
 
     @overrides
     def on_canvas_mouse_left_release(self, event):
@@ -116,15 +180,14 @@ class MinutiaeEditorFrame(NotebookTabBase):
         """
         x, y = event.x, event.y
 
-        scale_factor = self.root.canvas_image_scale_factor()
-
         ((px, py), minutiae_type) = self.current_minutiae
         angle = math.degrees(math.atan2(y - py, x - px)) + 90
 
-        self.root.minutiae.append(Minutia(round(px * scale_factor), round(py * scale_factor), angle, minutiae_type, 1.0))
+        self.root.preview_minutia(None)
+        px, py = self.root.canvas_to_image(px, py)
+        self.root.add_minutia(Minutia(round(px), round(py), angle, minutiae_type, 1.0))
         self.current_minutiae = None
 
-        self.root.draw_minutiae()
         self._update_minutiae_count()
 
 
@@ -148,3 +211,9 @@ class InfoFrame(LabelFrame):
         self.ridge_ending_image = PhotoImage(file=Path(__file__).resolve().parent / 'images' / 'ridge_ending.png')
         self.ridge_ending_image_label = Label(self, image=self.ridge_ending_image)
         self.ridge_ending_image_label.grid(row=4, column=0, sticky=W)
+
+        self.remove_label = Label(self, text="Remove (RMB)")
+        self.remove_label.grid(row=5, column=0, sticky=W)
+
+        self.box_remove_label = Label(self, text="Remove in box (SHIFT + RMB drag)")
+        self.box_remove_label.grid(row=6, column=0, sticky=W)
@@ -1,24 +1,45 @@
-from tkinter import N, W, E, DoubleVar, IntVar
-from tkinter.ttk import LabelFrame, Label, Entry, Scale, Radiobutton, Button
+from tkinter import N, W, E, BooleanVar, DoubleVar, IntVar, StringVar
+from tkinter.messagebox import showerror
+from tkinter.ttk import LabelFrame, Label, Entry, Scale, Radiobutton, Button, Progressbar, Checkbutton
+from concurrent.futures import CancelledError
 from types import LambdaType, FunctionType
-from typing import Union
+from typing import NamedTuple, Union
 
 from PIL import ImageEnhance, ImageOps
+from PIL.Image import Image
 from overrides import overrides
 
+from pyminutiaeviewer.errors import MindtctCancelledError
 from pyminutiaeviewer.gui_common import NotebookTabBase, validation_command, validate_float_between_0_and_1, \
     validate_int_between_0_and_100, validate_int_between_neg_100_and_100
-from pyminutiaeviewer.mindtct import mindtct
+from pyminutiaeviewer.mindtct import mindtct_async, DEFAULT_FLAGS, ExtractionFuture
+from pyminutiaeviewer.mindtct.cache import ExtractionCache, extraction_settings
+from pyminutiaeviewer.minutia import MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet
+
+# The number of milliseconds between checks of a running extraction.
+EXTRACTION_POLL_INTERVAL = 50
+
+# An extraction running in the background, with what is needed to apply its result.
+RunningExtraction = NamedTuple('RunningExtraction', [('future', ExtractionFuture),
+                                                     ('key', str),
+                                                     ('image_raw', Image),
+                                                     ('m1_direction', bool)])
 
 
 class MindtctFrame(NotebookTabBase):
     def __init__(self, parent, load_fingerprint_func):
         super(self.__class__, self).__init__(parent, load_fingerprint_func)
         self.root = parent
+        self.cache = ExtractionCache()
+        self.extraction = None  # type: RunningExtraction
+        self.extraction_status = ""
 
         self.min_quality_var = DoubleVar()
         self.fp_opacity_var = IntVar()
         self.min_opacity_var = IntVar()
+        self.show_ridge_endings_var = BooleanVar()
+        self.show_bifurcations_var = BooleanVar()
         self.fp_brightness_var = IntVar()
         self.fp_contrast_var = IntVar()
         self.min_direction_convention_var = IntVar()
@@ -26,6 +47,7 @@ class MindtctFrame(NotebookTabBase):
         self.image_width_var = IntVar()
         self.image_height_var = IntVar()
         self.minutiae_count_var = IntVar()
+        self.extraction_status_var = StringVar()
         self.restore_default_values()
 
         self.display_settings_frame = InfoFrame(self, self.image_width_var, self.image_height_var,
@@ -33,7 +55,8 @@ class MindtctFrame(NotebookTabBase):
         self.display_settings_frame.grid(row=1, column=0, padx=4, sticky=N + W + E)
 
         self.display_settings_frame = DisplaySettingsFrame(self, self.min_quality_var, self.fp_opacity_var,
-                                                           self.min_opacity_var)
+                                                           self.min_opacity_var, self.show_ridge_endings_var,
+                                                           self.show_bifurcations_var)
         self.display_settings_frame.grid(row=2, column=0, padx=4, sticky=N + W + E)
 
         self.image_settings_frame = ImageSettingsFrame(self, self.fp_brightness_var, self.fp_contrast_var)
@@ -43,7 +66,8 @@ class MindtctFrame(NotebookTabBase):
                                                                      self.min_colour_convention_var)
         self.conventions_selection_frame.grid(row=4, column=0, padx=4, sticky=N + W + E)
 
-        self.buttons_frame = ButtonsFrame(self, self.reset, self.extract_minutiae)
+        self.buttons_frame = ButtonsFrame(self, self.reset, self.extract_minutiae, self.cancel_extraction,
+                                          self.extraction_status_var)
         self.buttons_frame.grid(row=5, column=0, padx=4, sticky=N + W + E)
 
     def restore_default_values(self):
@@ -55,6 +79,8 @@ class MindtctFrame(NotebookTabBase):
         self.min_quality_var.set(0.0)
         self.fp_opacity_var.set(100)
         self.min_opacity_var.set(0)
+        self.show_ridge_endings_var.set(True)
+        self.show_bifurcations_var.set(True)
         self.fp_brightness_var.set(0)
         self.fp_contrast_var.set(0)
         self.min_direction_convention_var.set(0)
@@ -67,23 +93,94 @@ class MindtctFrame(NotebookTabBase):
         """
         self.restore_default_values()
 
-        self.root.minutiae = []
+        self.root.minutiae = MinutiaSet()
 
         # Redraw the image
         self.root.redraw()
 
     def extract_minutiae(self):
+        """
+        Extracts the minutiae of the fingerprint. MINDTCT runs on a worker thread, so the window stays responsive, and
+        the minutiae are shown once it finishes if the same fingerprint is still loaded.
+        """
         # TODO: Get the real image
-        im = self.root.image_raw.convert('L')
-        if self.min_colour_convention_var.get() == 1:
-            im = ImageOps.invert(im)
-        minutiae = mindtct(im)
+        image_raw = self.root.image_raw
+        im = image_raw if image_raw.mode == 'L' else image_raw.convert('L')
+        invert = self.min_colour_convention_var.get() == 1
+        m1_direction = self.min_direction_convention_var.get() == 1
+
+        key = self.cache.key(im, extraction_settings(invert, m1_direction, DEFAULT_FLAGS))
+        if self.extraction is not None:
+            if self.extraction.key == key:
+                return
+            self.extraction.future.cancel()
+
+        minutiae = self.cache.get(key)
+        if minutiae is not None:
+            self.extraction = None
+            self.buttons_frame.set_extracting(False)
+            self.extraction_status_var.set("Loaded from cache")
+            self._show_minutiae(minutiae)
+            return
+
+        future = mindtct_async(ImageOps.invert(im) if invert else im, progress=self._set_extraction_status)
+        self.extraction = RunningExtraction(future, key, image_raw, m1_direction)
+        self.extraction_status = "Starting"
+        self.extraction_status_var.set(self.extraction_status)
+        self.buttons_frame.set_extracting(True)
+        self.after(EXTRACTION_POLL_INTERVAL, self._poll_extraction, future)
+
+    def cancel_extraction(self):
+        """
+        Cancels the running extraction, killing MINDTCT.
+        """
+        if self.extraction is not None:
+            self.extraction.future.cancel()
 
-        # Set minutiae direction format:
-        if self.min_direction_convention_var.get() == 1:
-            for m in minutiae:
-                m.angle = (m.angle + 180) % 360
+    def _set_extraction_status(self, status: str):
+        # Called on the worker thread, so only stores the status for the main loop to show.
+        self.extraction_status = status
 
+    def _poll_extraction(self, future):
+        """
+        Shows the progress of an extraction, and applies its result on the main loop once it finishes.
+        :param future: The extraction's future.
+        """
+        if self.extraction is None or self.extraction.future is not future:
+            # The extraction was replaced by another one, which has its own poll.
+            return
+        if not future.done():
+            self.extraction_status_var.set(self.extraction_status)
+            self.after(EXTRACTION_POLL_INTERVAL, self._poll_extraction, future)
+            return
+
+        extraction = self.extraction
+        self.extraction = None
+        self.buttons_frame.set_extracting(False)
+        try:
+            minutiae = future.result()
+        except (CancelledError, MindtctCancelledError):
+            self.extraction_status_var.set("Cancelled")
+            return
+        except Exception as e:
+            self.extraction_status_var.set("Failed")
+            showerror("Extract Minutiae", "There was an error in extracting the minutiae.\n\n"
+                                          "The error message was:\n{}".format(e))
+            return
+
+        # Set minutiae direction format:
+        if extraction.m1_direction:
+            minutiae.angle = (minutiae.angle + 180) % 360
+        self.cache.put(extraction.key, minutiae, extraction.image_raw)
+
+        if extraction.image_raw is not self.root.image_raw:
+            # Another fingerprint was loaded while extracting, the minutiae are kept in the cache for when it returns.
+            self.extraction_status_var.set("")
+            return
+        self.extraction_status_var.set("Done")
+        self._show_minutiae(minutiae)
+
+    def _show_minutiae(self, minutiae: MinutiaSet):
         self.root.minutiae = minutiae
         self.minutiae_count_var.set(len(minutiae))
 
@@ -98,22 +195,44 @@ class MindtctFrame(NotebookTabBase):
 
     @overrides
     def fingerprint_drawing(self, image):
-        # Apply opacity settings
-        image.putalpha(int(self.fp_opacity_var.get() * 2.55))
-
-        # Apply brightness settings
-        enhancer = ImageEnhance.Brightness(image)
-        image = enhancer.enhance(2.0 * (self.fp_brightness_var.get() + 100.0) / 200.0)
+        # Apply brightness settings, the enhancers make a new image even if it is unchanged
+        brightness = 2.0 * (self.fp_brightness_var.get() + 100.0) / 200.0
+        if brightness != 1.0:
+            image = ImageEnhance.Brightness(image).enhance(brightness)
 
         # Apply contrast setting
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0 * (self.fp_contrast_var.get() + 100.0) / 200.0)
+        contrast = 2.0 * (self.fp_contrast_var.get() + 100.0) / 200.0
+        if contrast != 1.0:
+            image = ImageEnhance.Contrast(image).enhance(contrast)
+
+        # Apply opacity settings last, as an alpha channel is only needed for a translucent fingerprint
+        opacity = round(self.fp_opacity_var.get() * 2.55)
+        if opacity < 255:
+            image = image.convert('RGBA')
+            image.putalpha(opacity)
 
         return image
 
     @overrides
-    def minutiae_filtering(self, minutiae):
-        return list(filter(lambda m: m.quality > self.min_quality_var.get(), minutiae))
+    def fingerprint_drawing_key(self):
+        return self.fp_opacity_var.get(), self.fp_brightness_var.get(), self.fp_contrast_var.get()
+
+    @overrides
+    def minutiae_mask(self, minutiae):
+        return minutiae.quality_mask(self.min_quality_var.get()) & minutiae.type_mask(self.shown_minutia_types())
+
+    @overrides
+    def minutiae_mask_key(self):
+        return self.min_quality_var.get(), self.shown_minutia_types()
+
+    def shown_minutia_types(self) -> tuple:
+        """
+        Returns the minutia types that are selected to be shown.
+        :return: The types.
+        """
+        shown = ((MinutiaType.RIDGE_ENDING, self.show_ridge_endings_var),
+                 (MinutiaType.BIFURCATION, self.show_bifurcations_var))
+        return tuple(minutia_type for minutia_type, variable in shown if variable.get())
 
 
 class InfoFrame(LabelFrame):
@@ -140,8 +259,9 @@ class InfoFrame(LabelFrame):
 
 
 class DisplaySettingsFrame(LabelFrame):
-    def __init__(self, parent, quality_var, fp_opacity_var, min_opacity_var):
+    def __init__(self, parent, quality_var, fp_opacity_var, min_opacity_var, ridge_endings_var, bifurcations_var):
         super(self.__class__, self).__init__(parent, text="Display Settings")
+        scheduler = parent.root.redraw_scheduler
 
         self.min_quality_label = Label(self, text="Minutiae Quality > ", padding=(5, 5))
         self.min_quality_label.grid(row=0, column=0, sticky=W)
@@ -151,7 +271,8 @@ class DisplaySettingsFrame(LabelFrame):
         self.min_quality_entry.grid(row=0, column=1, sticky=E)
 
         self.min_quality_scale = Scale(self, to=1.0,
-                                       command=_functions(_make_two_float(quality_var), parent.root.draw_minutiae),
+                                       command=_functions(_make_two_float(quality_var),
+                                                          scheduler.request_minutiae_redraw),
                                        variable=quality_var)
         self.min_quality_scale.grid(row=1, column=0, columnspan=2, sticky=W + E)
 
@@ -162,7 +283,8 @@ class DisplaySettingsFrame(LabelFrame):
         self.fp_opacity_entry = Entry(self, textvariable=fp_opacity_var, width=5, **validation)
         self.fp_opacity_entry.grid(row=2, column=1, sticky=E)
 
-        self.fp_opacity_scale = Scale(self, to=100, command=_functions(_make_whole(fp_opacity_var), parent.root.redraw),
+        self.fp_opacity_scale = Scale(self, to=100,
+                                      command=_functions(_make_whole(fp_opacity_var), scheduler.request_redraw),
                                       variable=fp_opacity_var)
         self.fp_opacity_scale.grid(row=3, column=0, columnspan=2, sticky=W + E)
 
@@ -175,10 +297,18 @@ class DisplaySettingsFrame(LabelFrame):
         self.min_opacity_scale = Scale(self, to=100, command=_make_whole(min_opacity_var), variable=min_opacity_var)
         self.min_opacity_scale.grid(row=5, column=0, columnspan=2, sticky=W + E, pady=(0, 4))
 
+        self.ridge_endings_check = Checkbutton(self, text="Ridge Endings", variable=ridge_endings_var,
+                                               command=scheduler.request_minutiae_redraw)
+        self.ridge_endings_check.grid(row=6, column=0, sticky=W)
+        self.bifurcations_check = Checkbutton(self, text="Bifurcations", variable=bifurcations_var,
+                                              command=scheduler.request_minutiae_redraw)
+        self.bifurcations_check.grid(row=6, column=1, sticky=W, pady=(0, 4))
+
 
 class ImageSettingsFrame(LabelFrame):
     def __init__(self, parent, fp_brightness_var, fp_contrast_var):
         super(self.__class__, self).__init__(parent, text="Image Settings")
+        scheduler = parent.root.redraw_scheduler
 
         self.fp_brightness_label = Label(self, text="FP Brightness (%)", padding=(5, 5))
         self.fp_brightness_label.grid(row=0, column=0, sticky=W)
@@ -188,7 +318,7 @@ class ImageSettingsFrame(LabelFrame):
         self.fp_brightness_entry.grid(row=0, column=1, sticky=E)
 
         self.fp_brightness_scale = Scale(self, from_=-100, to=100,
-                                         command=_functions(_make_whole(fp_brightness_var), parent.root.redraw),
+                                         command=_functions(_make_whole(fp_brightness_var), scheduler.request_redraw),
                                          variable=fp_brightness_var)
         self.fp_brightness_scale.grid(row=1, column=0, columnspan=2, sticky=W + E)
 
@@ -199,7 +329,7 @@ class ImageSettingsFrame(LabelFrame):
         self.fp_contrast_entry.grid(row=2, column=1, sticky=E)
 
         self.fp_contrast_scale = Scale(self, from_=-100, to=100,
-                                       command=_functions(_make_whole(fp_contrast_var), parent.root.redraw),
+                                       command=_functions(_make_whole(fp_contrast_var), scheduler.request_redraw),
                                        variable=fp_contrast_var)
         self.fp_contrast_scale.grid(row=3, column=0, columnspan=2, sticky=W + E, pady=(0, 4))
 
@@ -229,7 +359,7 @@ class ConventionsSelectionFrame(LabelFrame):
 
 
 class ButtonsFrame(LabelFrame):
-    def __init__(self, parent, reset_func, minutiae_extraction_func):
+    def __init__(self, parent, reset_func, minutiae_extraction_func, cancel_extraction_func, status_var: StringVar):
         super(self.__class__, self).__init__(parent)
 
         self.columnconfigure(0, weight=1)
@@ -239,14 +369,34 @@ class ButtonsFrame(LabelFrame):
         self.min_detect_button = Button(self, text="Min. Detect", command=minutiae_extraction_func)
         self.min_detect_button.grid(row=0, column=0, pady=(0, 4))
 
+        self.cancel_button = Button(self, text="Cancel", command=cancel_extraction_func, state='disabled')
+        self.cancel_button.grid(row=1, column=0)
+
+        self.extraction_progress = Progressbar(self, mode='indeterminate')
+        self.extraction_progress.grid(row=2, column=0, padx=4, pady=(4, 0), sticky=W + E)
+
+        self.extraction_status_label = Label(self, textvariable=status_var)
+        self.extraction_status_label.grid(row=3, column=0, pady=(0, 4))
+
         self.nfiq_score_button = Button(self, text="NFIQ Score", command=None)
-        self.nfiq_score_button.grid(row=1, column=0)
+        self.nfiq_score_button.grid(row=4, column=0)
 
         self.nfiq_entry = Entry(self, textvariable=self.nfiq_var, justify='center', state='disabled', width=5)
-        self.nfiq_entry.grid(row=2, column=0, pady=4)
+        self.nfiq_entry.grid(row=5, column=0, pady=4)
 
         self.reset_button = Button(self, text="reset", command=reset_func)
-        self.reset_button.grid(row=3, column=0, pady=(0, 4))
+        self.reset_button.grid(row=6, column=0, pady=(0, 4))
+
+    def set_extracting(self, extracting: bool):
+        """
+        Shows whether an extraction is running.
+        :param extracting: True if an extraction is running.
+        """
+        self.cancel_button.configure(state='normal' if extracting else 'disabled')
+        if extracting:
+            self.extraction_progress.start()
+        else:
+            self.extraction_progress.stop()
 
 
 def _make_whole(variable: IntVar):
@@ -0,0 +1,143 @@
+from tkinter import Canvas
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet, MINUTIA_TYPE_CODES
+from pyminutiaeviewer.viewport import View
+
+# The colours of the minutiae types, matching minutiae_drawing.draw_minutiae.
+BIFURCATION_COLOUR = '#ff0000'
+RIDGE_ENDING_COLOUR = '#00ff00'
+
+
+class MinutiaeOverlay(object):
+    def __init__(self, canvas: Canvas, tag: str = "MINUTIAE"):
+        """
+        Draws minutiae as canvas items over the fingerprint image, so that changing one minutia only changes its own
+        items rather than re-rendering an image. Each minutia is drawn as a marker and a line showing its angle, in the
+        same style as minutiae_drawing.draw_minutiae.
+        :param canvas: The canvas to draw on.
+        :param tag: The tag given to every item drawn by the overlay.
+        """
+        self.canvas = canvas
+        self.tag = tag
+        self.preview_tag = tag + "_PREVIEW"
+        self.view = View(1.0, 0.0, 0.0, 0, 0)
+        self.size = 10.0
+        # The version of the minutiae the items were drawn from, see MinutiaSet.version.
+        self.version = None
+        # The canvas items of each minutia, in the order of the minutiae, or None for a minutia that isn't shown.
+        self._items = []  # type: List[Optional[Tuple[int, int]]]
+        self._shown = np.zeros(0, dtype=bool)
+
+    def draw(self, minutiae: MinutiaSet, shown: np.ndarray, view: View, size: float):
+        """
+        Replaces every minutia on the canvas.
+        :param minutiae: The minutiae, in image co-ordinates.
+        :param shown: A boolean mask of the minutiae to show, e.g. those that pass filtering and are in view.
+        :param view: The part of the image shown on the canvas.
+        :param size: The size of the markers in canvas pixels.
+        """
+        self.canvas.delete(self.tag)
+        self.view = view
+        self.size = size
+        self.version = minutiae.version
+
+        self._items = [None] * len(minutiae)
+        self._shown = np.zeros(len(minutiae), dtype=bool)
+        self.show(minutiae, shown)
+
+    def show(self, minutiae: MinutiaSet, shown: np.ndarray):
+        """
+        Changes which minutiae are shown, only the items of minutiae that are shown or hidden are created or deleted.
+        :param minutiae: The minutiae the overlay was drawn from.
+        :param shown: A boolean mask of the minutiae to show.
+        """
+        for i in np.flatnonzero(self._shown & ~shown).tolist():
+            self.canvas.delete(*self._items[i])
+            self._items[i] = None
+        for i in np.flatnonzero(shown & ~self._shown).tolist():
+            self._items[i] = self._create(minutiae.x[i], minutiae.y[i], minutiae.angle[i],
+                                          minutiae.minutia_type[i], (self.tag,))
+        self._shown = np.array(shown, dtype=bool)
+
+    def insert(self, index: int, minutia: Minutia, shown: bool):
+        """
+        Draws a minutia that was inserted in to the minutiae.
+        :param index: The index the minutia was inserted at.
+        :param minutia: The minutia.
+        :param shown: False if the minutia is filtered out, so isn't drawn.
+        """
+        items = None
+        if shown:
+            items = self._create(minutia.x, minutia.y, minutia.angle, MINUTIA_TYPE_CODES[minutia.minutia_type],
+                                 (self.tag,))
+        self._items.insert(index, items)
+        self._shown = np.insert(self._shown, index, shown)
+
+    def remove(self, indices):
+        """
+        Removes minutiae that were removed from the minutiae.
+        :param indices: The indices the minutiae had.
+        """
+        indices = set(np.asarray(indices).ravel().tolist())
+        for i in indices:
+            if self._items[i] is not None:
+                self.canvas.delete(*self._items[i])
+        self._items = [items for i, items in enumerate(self._items) if i not in indices]
+        self._shown = np.delete(self._shown, list(indices))
+
+    def preview(self, minutia: Optional[Minutia]):
+        """
+        Draws a minutia that is being placed, replacing the previous preview.
+        :param minutia: The minutia in image co-ordinates, or None to remove the preview.
+        """
+        preview = self.canvas.find_withtag(self.preview_tag)
+        if minutia is None or len(preview) != 2 or \
+                self.canvas.type(preview[0]) != _marker_type(MINUTIA_TYPE_CODES[minutia.minutia_type]):
+            self.canvas.delete(self.preview_tag)
+            if minutia is not None:
+                self._create(minutia.x, minutia.y, minutia.angle, MINUTIA_TYPE_CODES[minutia.minutia_type],
+                             (self.tag, self.preview_tag))
+            return
+
+        # Move the existing preview items rather than recreating them:
+        marker, line = preview
+        bounding_box, line_coords = self._geometry(minutia.x, minutia.y, minutia.angle)
+        self.canvas.coords(marker, *bounding_box)
+        self.canvas.coords(line, *line_coords)
+
+    def _create(self, x, y, angle, minutia_type: int, tags: tuple) -> Tuple[int, int]:
+        """
+        Creates the canvas items of a minutia.
+        :return: The ids of the marker and line items.
+        """
+        bounding_box, line_coords = self._geometry(x, y, angle)
+        if minutia_type == MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION]:
+            colour = BIFURCATION_COLOUR
+            marker = self.canvas.create_oval(*bounding_box, outline=colour, tags=tags)
+        elif minutia_type == MINUTIA_TYPE_CODES[MinutiaType.RIDGE_ENDING]:
+            colour = RIDGE_ENDING_COLOUR
+            marker = self.canvas.create_rectangle(*bounding_box, outline=colour, tags=tags)
+        else:
+            raise AttributeError("Unknown minutiae type code: {}".format(minutia_type))
+        line = self.canvas.create_line(*line_coords, fill=colour, tags=tags)
+        return marker, line
+
+    def _geometry(self, x, y, angle) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+        """
+        Calculates where a minutia is drawn on the canvas.
+        :return: The bounding box of the marker, and the end points of the angle line.
+        """
+        x, y = (float(x) - self.view.x) * self.view.zoom, (float(y) - self.view.y) * self.view.zoom
+        half = self.size / 2.0
+        radians = np.radians((float(angle) - 90) % 360)
+        x2 = x + np.cos(radians) * self.size * 1.5
+        y2 = y + np.sin(radians) * self.size * 1.5
+        return (x - half, y - half, x + half, y + half), (x, y, float(x2), float(y2))
+
+
+def _marker_type(minutia_type: int) -> str:
+    return 'oval' if minutia_type == MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION] else 'rectangle'
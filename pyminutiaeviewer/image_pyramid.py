@@ -0,0 +1,123 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+from PIL import Image
+
+# The width and height of a tile in pixels.
+DEFAULT_TILE_SIZE = 256
+# The maximum number of tiles kept in memory, 256 tiles of 256x256 pixels is 16 MiB for a grayscale image.
+DEFAULT_CACHE_TILES = 256
+
+
+class ImagePyramid(object):
+    def __init__(self, image: Image.Image, tile_size: int = DEFAULT_TILE_SIZE, cache_tiles: int = DEFAULT_CACHE_TILES):
+        """
+        A multi-resolution pyramid of an image, divided in to tiles. Level 0 is the image itself and each level above
+        it is half the width and height of the one below. Tiles are built lazily from the four tiles below them when
+        they are first needed, and the least recently used tiles are dropped once the cache is full. Only the tiles
+        that are asked for are cached, not the tiles below them that they were built from.
+        :param image: The image.
+        :param tile_size: The width and height of a tile in pixels.
+        :param cache_tiles: The maximum number of tiles to keep in memory.
+        """
+        self.image = image
+        self.tile_size = tile_size
+        self.cache_tiles = cache_tiles
+        self.levels = max(1, math.ceil(math.log2(max(image.width, image.height) / tile_size)) + 1)
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        """
+        Returns the size of a level of the pyramid.
+        :param level: The level.
+        :return: The width and height of the level.
+        """
+        scale = 1 << level
+        return -(-self.image.width // scale), -(-self.image.height // scale)
+
+    def level_for_zoom(self, zoom: float) -> int:
+        """
+        Chooses the smallest level with at least one pixel per displayed pixel.
+        :param zoom: The number of displayed pixels per image pixel.
+        :return: The level.
+        """
+        if zoom >= 1:
+            return 0
+        return min(int(math.floor(math.log2(1 / zoom))), self.levels - 1)
+
+    def tile(self, level: int, column: int, row: int, cache: bool = True) -> Image.Image:
+        """
+        Returns a tile of the pyramid.
+        :param level: The level of the tile.
+        :param column: The column of the tile in its level.
+        :param row: The row of the tile in its level.
+        :param cache: If False a tile that isn't cached is built without being added to the cache.
+        :return: The tile, tiles on the right and bottom edges of a level may be smaller than the tile size.
+        """
+        key = (level, column, row)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                if cache:
+                    self._tiles.move_to_end(key)
+                return tile
+
+        tile = self._build_tile(level, column, row)
+        if not cache:
+            return tile
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.cache_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def render(self, box: Tuple[int, int, int, int], level: int, cache: bool = True) -> Image.Image:
+        """
+        Renders a region of a level from the tiles that overlap it.
+        :param box: The left, top, right and bottom of the region in level pixels.
+        :param level: The level.
+        :param cache: If False tiles that aren't cached are built without being added to the cache.
+        :return: The region.
+        """
+        x0, y0, x1, y1 = box
+        size = self.tile_size
+        region = Image.new(self.image.mode, (x1 - x0, y1 - y0))
+        for row in range(y0 // size, -(-y1 // size)):
+            for column in range(x0 // size, -(-x1 // size)):
+                region.paste(self.tile(level, column, row, cache), (column * size - x0, row * size - y0))
+        return region
+
+    def _build_tile(self, level: int, column: int, row: int) -> Image.Image:
+        size = self.tile_size
+        width, height = self.level_size(level)
+        box = (column * size, row * size, min((column + 1) * size, width), min((row + 1) * size, height))
+        if level == 0:
+            return self.image.crop(box)
+
+        # Halve the (up to) four tiles of the level below that cover this tile:
+        below_width, below_height = self.level_size(level - 1)
+        x0, y0 = 2 * column * size, 2 * row * size
+        x1, y1 = min(x0 + 2 * size, below_width), min(y0 + 2 * size, below_height)
+        below = self.render((x0, y0, x1, y1), level - 1, cache=False)
+        return _pad_to_even(below).resize((box[2] - box[0], box[3] - box[1]), Image.BOX)
+
+
+def _pad_to_even(image: Image.Image) -> Image.Image:
+    """
+    Repeats the last column and row of an image with an odd width or height, so it can be halved exactly.
+    :param image: The image.
+    :return: The image with an even width and height.
+    """
+    width, height = image.size
+    if width % 2 == 0 and height % 2 == 0:
+        return image
+    padded = Image.new(image.mode, (width + width % 2, height + height % 2))
+    padded.paste(image, (0, 0))
+    if width % 2:
+        padded.paste(image.crop((width - 1, 0, width, height)), (width, 0))
+    if height % 2:
+        padded.paste(padded.crop((0, height - 1, padded.width, height)), (0, height))
+    return padded
@@ -0,0 +1,244 @@
+import os
+from multiprocessing import Pool
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from pyminutiaeviewer import read_minutiae
+from pyminutiaeviewer.minutia_set import MinutiaSet
+
+# Only the highest quality minutiae of a template are matched.
+MAX_MINUTIAE = 150
+# Pairs of minutiae further apart than this, in pixels, are not compared as skin distortion makes them unreliable.
+MAX_PAIR_DISTANCE = 125.0
+# How much the lengths of two pairs may differ by for them to be compatible, as a fraction of the length.
+DISTANCE_TOLERANCE = 0.05
+# The least the lengths of two pairs may differ by, in pixels, so short pairs aren't held to sub-pixel accuracy.
+MIN_DISTANCE_TOLERANCE = 2.0
+# How many degrees the angles of two compatible pairs may differ by.
+ANGLE_TOLERANCE = 11.0
+# The number of compatible pairs that must agree on two minutiae corresponding for them to be counted as matching.
+MIN_VOTES = 2
+
+# The pairs of a template's minutiae, sorted by length. The angles are in degrees, beta1 and beta2 are the directions
+# of the first and second minutiae relative to the direction of the pair, so they don't change when the finger is
+# rotated or moved.
+PairTable = NamedTuple('PairTable', [('distance', np.ndarray),
+                                     ('beta1', np.ndarray),
+                                     ('beta2', np.ndarray),
+                                     ('direction', np.ndarray),
+                                     ('first', np.ndarray),
+                                     ('second', np.ndarray),
+                                     ('size', int)])
+
+MatchResult = NamedTuple('MatchResult', [('index', int),
+                                         ('score', int)])
+
+
+def read_template(path: Union[str, Path]) -> MinutiaSet:
+    """
+    Reads minutiae to match from a file, in any of the formats a MinutiaeReader can read.
+    :param path: The path of the minutiae file, its format is chosen by its extension.
+    :return: The minutiae.
+    """
+    return read_minutiae(path)
+
+
+def pair_table(minutiae: MinutiaSet, both_orders: bool = False) -> PairTable:
+    """
+    Builds the table of a template's minutiae pairs that are close enough to compare.
+    :param minutiae: The minutiae.
+    :param both_orders: If True each pair is included in both orders, otherwise only with its lower index first.
+    :return: The pair table.
+    """
+    if len(minutiae) > MAX_MINUTIAE:
+        minutiae = minutiae[np.sort(np.argsort(-minutiae.quality, kind='stable')[:MAX_MINUTIAE])]
+    x, y = minutiae.x.astype(np.float64), minutiae.y.astype(np.float64)
+    dx, dy = x[np.newaxis, :] - x[:, np.newaxis], y[np.newaxis, :] - y[:, np.newaxis]
+    distance = np.hypot(dx, dy)
+    close = (distance <= MAX_PAIR_DISTANCE) & (distance > 0)
+    if not both_orders:
+        close = np.triu(close)
+    first, second = np.nonzero(close)
+
+    # Directions are measured clockwise from north, as minutia angles are:
+    direction = np.degrees(np.arctan2(dx[first, second], -dy[first, second])) % 360
+    beta1 = (minutiae.angle[first] - direction) % 360
+    beta2 = (minutiae.angle[second] - direction) % 360
+    distance = distance[first, second]
+
+    order = np.argsort(distance, kind='stable')
+    return PairTable(distance[order].astype(np.float32), beta1[order].astype(np.float32),
+                     beta2[order].astype(np.float32), direction[order].astype(np.float32),
+                     first[order].astype(np.int16), second[order].astype(np.int16), len(minutiae))
+
+
+def match_score(probe: Union[MinutiaSet, PairTable], gallery: Union[MinutiaSet, PairTable]) -> int:
+    """
+    Scores how well two templates match, in the style of Bozorth. Pairs of minutiae in the probe are compared with
+    pairs in the gallery template, every comparison is done at once with NumPy. Compatible pairs, those with the same
+    length and the same minutia directions relative to the pair, vote for the rotation between the templates, and
+    those that agree with the most common rotation vote for which minutiae correspond.
+    :param probe: The probe's minutiae, or its pair table with each pair in one order.
+    :param gallery: The gallery template's minutiae, or its pair table with each pair in both orders.
+    :return: The number of minutiae that correspond, 0 for templates that don't match.
+    """
+    if isinstance(probe, MinutiaSet):
+        probe = pair_table(probe)
+    if isinstance(gallery, MinutiaSet):
+        gallery = pair_table(gallery, both_orders=True)
+    probe_pairs, gallery_pairs = _compatible_pairs(probe, gallery)
+    if len(probe_pairs) == 0:
+        return 0
+
+    # Keep the compatible pairs that agree with the most common rotation, allowing for it falling across two bins:
+    rotation = (probe.direction[probe_pairs] - gallery.direction[gallery_pairs]) % 360
+    bins = (rotation // ANGLE_TOLERANCE).astype(np.int64)
+    bin_count = int(np.ceil(360 / ANGLE_TOLERANCE))
+    histogram = np.bincount(bins, minlength=bin_count)
+    histogram = histogram + np.roll(histogram, -1)
+    best = int(np.argmax(histogram))
+    agreeing = (bins == best) | (bins == (best + 1) % bin_count)
+    probe_pairs, gallery_pairs = probe_pairs[agreeing], gallery_pairs[agreeing]
+
+    # Each compatible pair votes for both of its minutiae corresponding:
+    columns = gallery.size
+    votes = np.bincount(np.concatenate((probe.first[probe_pairs].astype(np.int64) * columns +
+                                        gallery.first[gallery_pairs],
+                                        probe.second[probe_pairs].astype(np.int64) * columns +
+                                        gallery.second[gallery_pairs])),
+                        minlength=probe.size * columns).reshape(probe.size, columns)
+
+    # Minutiae correspond if they are each other's best supported match:
+    best_gallery = np.argmax(votes, axis=1)
+    best_probe = np.argmax(votes, axis=0)
+    probe_indices = np.arange(probe.size)
+    mutual = best_probe[best_gallery] == probe_indices
+    return int(np.count_nonzero(mutual & (votes[probe_indices, best_gallery] >= MIN_VOTES)))
+
+
+def _compatible_pairs(probe: PairTable, gallery: PairTable):
+    """
+    Finds every probe pair and gallery pair that have similar lengths and relative minutia directions.
+    :return: The indices in to the probe table and gallery table of each compatible pair.
+    """
+    tolerance = np.maximum(probe.distance * DISTANCE_TOLERANCE, MIN_DISTANCE_TOLERANCE)
+    starts = np.searchsorted(gallery.distance, probe.distance - tolerance, side='left')
+    ends = np.searchsorted(gallery.distance, probe.distance + tolerance, side='right')
+    counts = ends - starts
+
+    # Expand each probe pair's range of gallery pairs with similar lengths:
+    probe_pairs = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(probe_pairs)) - np.repeat(np.cumsum(counts) - counts, counts)
+    gallery_pairs = np.repeat(starts, counts) + offsets
+
+    compatible = ((_angle_difference(probe.beta1[probe_pairs], gallery.beta1[gallery_pairs]) <= ANGLE_TOLERANCE) &
+                  (_angle_difference(probe.beta2[probe_pairs], gallery.beta2[gallery_pairs]) <= ANGLE_TOLERANCE))
+    return probe_pairs[compatible], gallery_pairs[compatible]
+
+
+def _angle_difference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    difference = np.abs(a - b) % 360
+    return np.minimum(difference, 360 - difference)
+
+
+class Gallery(object):
+    def __init__(self, templates: Sequence[MinutiaSet], processes: int = None):
+        """
+        A gallery of templates that probes are searched against. With more than one process the gallery is split in
+        to a shard per process, and the shards are searched in parallel by worker processes that each hold only their
+        shard's pair tables, built once when the worker starts, so only the probe and the scores are passed between
+        processes per search.
+        :param templates: The gallery's templates.
+        :param processes: The number of worker processes, defaults to the number of CPUs. If 1 the gallery is searched
+        in this process.
+        """
+        self.templates = list(templates)
+        self.processes = processes
+        self._pools = None
+        self._tables = None
+
+    @classmethod
+    def from_files(cls, paths: Sequence[Union[str, Path]], processes: int = None) -> 'Gallery':
+        """
+        Creates a gallery from minutiae files.
+        :param paths: The paths of the minutiae files, in any format a MinutiaeReader can read.
+        :param processes: The number of worker processes.
+        :return: The gallery.
+        """
+        return cls([read_template(path) for path in paths], processes)
+
+    def scores(self, probe: MinutiaSet) -> np.ndarray:
+        """
+        Scores a probe against every template in the gallery.
+        :param probe: The probe's minutiae.
+        :return: The score of each template, in the order of the templates.
+        """
+        probe_table = pair_table(probe)
+        if self.processes == 1:
+            if self._tables is None:
+                self._tables = [pair_table(template, both_orders=True) for template in self.templates]
+            return np.array([match_score(probe_table, table) for table in self._tables], dtype=np.int64)
+
+        if self._pools is None:
+            # A pool per shard, so that each shard is always scored by the worker that holds its tables:
+            shard_count = self.processes or os.cpu_count() or 1
+            bounds = np.linspace(0, len(self.templates), shard_count + 1).astype(int)
+            self._pools = [Pool(1, initializer=_initialise_worker, initargs=(self.templates[start:end],))
+                           for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+        shard_scores = [pool.apply_async(_score_shard, (probe_table,)) for pool in self._pools]
+        return np.concatenate([np.zeros(0, dtype=np.int64)] + [scores.get() for scores in shard_scores])
+
+    def search(self, probe: MinutiaSet, top: Optional[int] = None) -> List[MatchResult]:
+        """
+        Finds the templates in the gallery that best match a probe.
+        :param probe: The probe's minutiae.
+        :param top: The number of matches to return, or None for every template.
+        :return: The matches, best first.
+        """
+        scores = self.scores(probe)
+        order = np.argsort(-scores, kind='stable')[:top]
+        return [MatchResult(int(index), int(scores[index])) for index in order]
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        if self._pools is not None:
+            for pool in self._pools:
+                pool.close()
+            for pool in self._pools:
+                pool.join()
+            self._pools = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+
+# The pair tables of the shard of the gallery held by a worker process.
+_worker_tables = None  # type: Optional[List[PairTable]]
+
+
+def _initialise_worker(templates: List[MinutiaSet]):
+    """
+    Builds the pair tables of a worker's shard of the gallery, once for every probe it scores.
+    :param templates: The shard's templates.
+    """
+    global _worker_tables
+    _worker_tables = [pair_table(template, both_orders=True) for template in templates]
+
+
+def _score_shard(probe_table: PairTable) -> np.ndarray:
+    """
+    Scores a probe against the worker's shard of the gallery.
+    :param probe_table: The probe's pair table.
+    :return: The scores of the shard's templates.
+    """
+    return np.array([match_score(probe_table, table) for table in _worker_tables], dtype=np.int64)
@@ -1,43 +1,371 @@
 import os
 import platform
+import queue
+import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import ExitStack
 from pathlib import Path
 
 import shutil
-from typing import List
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Sequence
 
+from PIL import Image as PILImage
 from PIL.Image import Image
 
-from pyminutiaeviewer.minutia import Minutia
+from pyminutiaeviewer import tracing
+from pyminutiaeviewer.errors import MindtctError, MindtctCancelledError
+from pyminutiaeviewer.mindtct.cache import extraction_settings
+from pyminutiaeviewer.mindtct.files import MindtctOutput, read_output, write_ihead
+from pyminutiaeviewer.minutia_set import MinutiaSet
 from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
 
+# The default flags MINDTCT is run with.
+DEFAULT_FLAGS = ('-m1',)
+# The default number of seconds MINDTCT may run on a single image before it is killed.
+DEFAULT_TIMEOUT = 60.0
+# The number of seconds between checks for cancellation while MINDTCT runs.
+POLL_INTERVAL = 0.05
+# The environment variable that overrides the MINDTCT binary, e.g. to run a stub in benchmarks.
+MINDTCT_PATH_VARIABLE = 'PYMINUTIAEVIEWER_MINDTCT'
+# The environment variable that overrides the directory MINDTCT's scratch directories are made in.
+SCRATCH_DIR_VARIABLE = 'PYMINUTIAEVIEWER_SCRATCH'
+# A directory kept in RAM, where MINDTCT's input and output files never reach the disk, if the platform has one.
+RAM_SCRATCH_DIR = Path('/dev/shm')
+# The bytes of scratch space needed for MINDTCT's files on top of the two bytes per pixel of its input and binarised
+# images, for its maps and minutiae.
+SCRATCH_MARGIN = 1 << 20
 
-def mindtct(image: Image) -> List[Minutia]:
+ExtractionJob = NamedTuple('ExtractionJob', [('image_path', Path),
+                                             ('output_path', Optional[Path])])
+
+ExtractionResult = NamedTuple('ExtractionResult', [('image_path', Path),
+                                                   ('minutiae', Optional[MinutiaSet]),
+                                                   ('error', Optional[Exception])])
+
+
+def mindtct_path() -> Path:
+    """
+    Finds the MINDTCT binary for this platform, unless another binary is set by the MINDTCT_PATH_VARIABLE environment
+    variable.
+    :return: The path to the MINDTCT binary.
+    """
+    override = os.environ.get(MINDTCT_PATH_VARIABLE)
+    if override:
+        return Path(override)
     platform_name = platform.system()
     if platform_name == 'Windows':
-        mindtct_path = Path(__file__).resolve().parent / 'mindtct.exe'
+        return Path(__file__).resolve().parent / 'mindtct.exe'
     elif platform_name == 'Linux':
-        mindtct_path = Path(__file__).resolve().parent / 'mindtct'
+        return Path(__file__).resolve().parent / 'mindtct'
     else:
         raise EnvironmentError(platform_name + " is a platform that is currently unsupported")
 
+
+def scratch_root(size: int = 0) -> Optional[str]:
+    """
+    Chooses where MINDTCT's scratch directories are made: the directory set by the SCRATCH_DIR_VARIABLE environment
+    variable, or else a directory kept in RAM if there is one that can be written to with room for the files.
+    :param size: The bytes of scratch space needed, see scratch_size.
+    :return: The directory, or None for the system's temporary directory.
+    """
+    override = os.environ.get(SCRATCH_DIR_VARIABLE)
+    if override:
+        return override
+    if RAM_SCRATCH_DIR.is_dir() and os.access(str(RAM_SCRATCH_DIR), os.W_OK | os.X_OK) and \
+            _has_room(RAM_SCRATCH_DIR, size):
+        return str(RAM_SCRATCH_DIR)
+    return None
+
+
+def scratch_size(image_size) -> int:
+    """
+    :param image_size: The width and height of an image.
+    :return: The bytes of scratch space MINDTCT's files for the image take.
+    """
+    width, height = image_size
+    return 2 * width * height + SCRATCH_MARGIN
+
+
+def _has_room(directory: Path, size: int) -> bool:
+    try:
+        return shutil.disk_usage(str(directory)).free >= size
+    except OSError:
+        return False
+
+
+class ExtractionFuture(Future):
+    def __init__(self):
+        """
+        The pending result of mindtct_async. Unlike other futures, an extraction that is running can be cancelled, which
+        kills MINDTCT, and the future then finishes with a MindtctCancelledError.
+        """
+        super().__init__()
+        self.cancel_event = threading.Event()
+
+    def cancel(self) -> bool:
+        """
+        Cancels the extraction, killing MINDTCT if it is running.
+        :return: False if the extraction had already finished.
+        """
+        self.cancel_event.set()
+        return super().cancel() or not self.done()
+
+
+def mindtct(image: Image, flags: Sequence[str] = DEFAULT_FLAGS, timeout: float = DEFAULT_TIMEOUT,
+            cancel: threading.Event = None, progress: Callable[[str], None] = None) -> MinutiaSet:
+    """
+    Extracts minutiae from an image with MINDTCT.
+    :param image: The fingerprint image.
+    :param flags: The command line flags MINDTCT is run with.
+    :param timeout: The number of seconds MINDTCT may run for before it is killed.
+    :param cancel: An event that kills MINDTCT when it is set, or None.
+    :param progress: Called with a description of each step of the extraction as it starts, or None.
+    :return: The minutiae.
+    """
+    return _mindtct(image, flags, timeout, cancel, progress, False).minutiae
+
+
+def mindtct_output(image: Image, flags: Sequence[str] = DEFAULT_FLAGS, timeout: float = DEFAULT_TIMEOUT,
+                   cancel: threading.Event = None, progress: Callable[[str], None] = None) -> MindtctOutput:
+    """
+    Extracts minutiae from an image with MINDTCT, along with the maps and binarised image it makes on the way.
+    :param image: The fingerprint image.
+    :param flags: The command line flags MINDTCT is run with.
+    :param timeout: The number of seconds MINDTCT may run for before it is killed.
+    :param cancel: An event that kills MINDTCT when it is set, or None.
+    :param progress: Called with a description of each step of the extraction as it starts, or None.
+    :return: Everything MINDTCT wrote.
+    """
+    return _mindtct(image, flags, timeout, cancel, progress, True)
+
+
+def _mindtct(image: Image, flags: Sequence[str], timeout: float, cancel: Optional[threading.Event],
+             progress: Optional[Callable[[str], None]], everything: bool) -> MindtctOutput:
+    if progress is None:
+        progress = _ignore_progress
+
     # Create folder:
-    folder = tempfile.mkdtemp(prefix='pyminview_')
+    folder = tempfile.mkdtemp(prefix='pyminview_', dir=scratch_root(scratch_size(image.size)))
     folder = Path(folder).resolve()
 
-    # Save image
-    image_path = folder / 'image.png'
-    image.convert('L').save(str(image_path))
+    try:
+        # Save the image uncompressed, so neither this nor MINDTCT spend time on compression
+        progress("Saving image")
+        image_path = folder / 'image.ihead'
+        with tracing.span('mindtct.save_image'), image_path.open('wb') as f:
+            write_ihead(image if image.mode == 'L' else image.convert('L'), f)
+
+        return _run_mindtct(image_path, folder / 'out', flags, timeout, cancel, progress, everything)
+    finally:
+        # Clean up
+        shutil.rmtree(str(folder))
+
+
+def mindtct_async(image: Image, flags: Sequence[str] = DEFAULT_FLAGS, timeout: float = DEFAULT_TIMEOUT,
+                  progress: Callable[[str], None] = None) -> ExtractionFuture:
+    """
+    Extracts minutiae from an image with MINDTCT on a worker thread.
+    :param image: The fingerprint image, it must not be changed until the extraction finishes.
+    :param flags: The command line flags MINDTCT is run with.
+    :param timeout: The number of seconds MINDTCT may run for before it is killed.
+    :param progress: Called on the worker thread with a description of each step of the extraction, or None.
+    :return: A future of the minutiae.
+    """
+    future = ExtractionFuture()
+
+    def work():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(mindtct(image, flags, timeout, future.cancel_event, progress))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=work, daemon=True).start()
+    return future
+
+
+def mindtct_batch(jobs: Iterable[ExtractionJob], workers: int = None, flags: Sequence[str] = DEFAULT_FLAGS,
+                  timeout: float = DEFAULT_TIMEOUT, cache=None) -> Iterator[ExtractionResult]:
+    """
+    Extracts minutiae from many images, keeping a MINDTCT process running for each worker. Every worker has its own
+    scratch directory that it reuses for all of its images. A failed or timed out image is reported in its result and
+    does not stop the batch.
+    :param jobs: The images to extract minutiae from. If a job has an output path the MINDTCT .min file is moved there.
+    :param workers: The number of MINDTCT processes to run at once, defaults to the number of CPUs.
+    :param flags: The command line flags MINDTCT is run with.
+    :param timeout: The number of seconds MINDTCT may run on a single image before it is killed.
+    :param cache: An ExtractionCache to reuse the minutiae of images that have already been extracted, or None.
+    :return: The result of each job, in the order that they complete.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pending = queue.Queue(maxsize=workers * 2)
+    results = queue.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def put(job):
+        # Gives up if the batch is stopped while the queue is full.
+        while not stop.is_set():
+            try:
+                pending.put(job, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def feed():
+        try:
+            for job in jobs:
+                if stop.is_set():
+                    break
+                put(job)
+        finally:
+            for _ in range(workers):
+                put(None)
+
+    def work():
+        scratch = Path(tempfile.mkdtemp(prefix='pyminview_', dir=scratch_root())).resolve()
+        try:
+            while not stop.is_set():
+                try:
+                    job = pending.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if job is None:
+                    break
+                try:
+                    minutiae = _extract_file(job, scratch, flags, timeout, cache, workers)
+                    results.put(ExtractionResult(job.image_path, minutiae, None))
+                except Exception as e:
+                    results.put(ExtractionResult(job.image_path, None, e))
+        finally:
+            shutil.rmtree(str(scratch), ignore_errors=True)
+            results.put(finished)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        running = workers
+        while running:
+            result = results.get()
+            if result is finished:
+                running -= 1
+            else:
+                yield result
+    finally:
+        # Stops the feeder and workers if the caller stopped early, the workers finish their current image.
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def _extract_file(job: ExtractionJob, scratch: Path, flags: Sequence[str], timeout: float, cache,
+                  workers: int = 1) -> MinutiaSet:
+    """
+    Extracts the minutiae of a single image file in a worker's scratch directory.
+    :param job: The image to extract minutiae from.
+    :param scratch: The worker's scratch directory.
+    :param flags: The command line flags MINDTCT is run with.
+    :param timeout: The number of seconds MINDTCT may run for before it is killed.
+    :param cache: An ExtractionCache, or None.
+    :param workers: The number of workers sharing the scratch space.
+    :return: The minutiae.
+    """
+    image_path = job.image_path
+    with ExitStack() as stack:
+        with PILImage.open(str(image_path)) as image:
+            key = None
+            if cache is not None:
+                key = cache.key(image, extraction_settings(False, False, flags))
+                cached_path = cache.get_file(key)
+                if cached_path is not None:
+                    if job.output_path is not None:
+                        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+                        shutil.copyfile(str(cached_path), str(job.output_path))
+                    return MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(cached_path))
+
+            # Every worker may be extracting an image this size at once. If the scratch space, e.g. RAM, hasn't room
+            # for them all, this image is extracted in the system's temporary directory instead:
+            if not _has_room(scratch, scratch_size(image.size) * workers):
+                scratch = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='pyminview_'))).resolve()
+
+            # MINDTCT can read grayscale PNGs and JPEGs itself, anything else is converted first.
+            if image.format not in ('PNG', 'JPEG') or image.mode != 'L':
+                image_path = scratch / 'image.ihead'
+                with tracing.span('mindtct.save_image'), image_path.open('wb') as f:
+                    write_ihead(image if image.mode == 'L' else image.convert('L'), f)
+
+        output_path = scratch / 'out'
+        minutiae_path = str(output_path) + '.min'
+        minutiae = _run_mindtct(image_path, output_path, flags, timeout).minutiae
+        if cache is not None:
+            cache.put_file(key, minutiae_path)
+        if job.output_path is not None:
+            job.output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(minutiae_path, str(job.output_path))
+        return minutiae
+
+
+def _run_mindtct(image_path: Path, output_path: Path, flags: Sequence[str], timeout: float,
+                 cancel: threading.Event = None, progress: Callable[[str], None] = None,
+                 everything: bool = False) -> MindtctOutput:
+    """
+    Runs MINDTCT on an image file and reads the minutiae it detected.
+    :param image_path: The image file.
+    :param output_path: The root path MINDTCT writes its output files to.
+    :param flags: The command line flags MINDTCT is run with.
+    :param timeout: The number of seconds MINDTCT may run for before it is killed.
+    :param cancel: An event that kills MINDTCT when it is set, or None.
+    :param progress: Called with a description of each step as it starts, or None.
+    :param everything: If True the maps and binarised image MINDTCT wrote are read too.
+    :return: The output, with only the minutiae unless everything is True.
+    """
+    if progress is None:
+        progress = _ignore_progress
+
+    minutiae_path = Path(str(output_path) + '.min')
+    # Output may be left over from a previous image in a reused folder:
+    if minutiae_path.exists():
+        minutiae_path.unlink()
+
+    if cancel is not None and cancel.is_set():
+        raise MindtctCancelledError("MINDTCT was cancelled before it ran on '{}'.".format(image_path))
+    progress("Running MINDTCT")
+    command = [str(mindtct_path())] + list(flags) + [str(image_path), str(output_path)]
+    with tracing.span('mindtct.run', image=str(image_path)), \
+            subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE) as process:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                # Returns as soon as MINDTCT exits, the interval only limits how long a cancellation waits:
+                _, stderr = process.communicate(timeout=POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel is not None and cancel.is_set():
+                    process.kill()
+                    process.communicate()
+                    raise MindtctCancelledError("MINDTCT was cancelled on '{}'.".format(image_path))
+                if time.monotonic() >= deadline:
+                    process.kill()
+                    process.communicate()
+                    raise MindtctError("MINDTCT timed out after {} seconds on '{}'.".format(timeout, image_path))
 
-    # Execute mindtct
-    output_path = folder / 'out'
-    command = ' '.join([str(mindtct_path), '-m1', str(image_path), str(output_path)])
-    os.system(command)
+    if process.returncode != 0:
+        raise MindtctError("MINDTCT exited with code {} on '{}': {}"
+                           .format(process.returncode, image_path, stderr.decode(errors='replace').strip()))
 
-    reader = MinutiaeReader(MinutiaeFileFormat.NBIST)
-    minutiae = reader.read(str(output_path) + '.min')
+    progress("Reading minutiae")
+    with tracing.span('mindtct.parse'):
+        return read_output(output_path, everything)
 
-    # Clean up
-    shutil.rmtree(str(folder))
 
-    return minutiae
+def _ignore_progress(_: str):
+    pass
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Union
+
+from PIL.Image import Image
+
+from pyminutiaeviewer.minutia import Minutia
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
+
+# The default maximum size of the cache in bytes.
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+
+def default_cache_directory() -> Path:
+    """
+    Finds the directory extraction results are cached in by default, following the platform's conventions.
+    :return: The cache directory.
+    """
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA', str(Path.home() / 'AppData' / 'Local'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME', str(Path.home() / '.cache'))
+    return Path(base) / 'pyminutiaeviewer' / 'mindtct'
+
+
+def extraction_settings(invert: bool, m1_direction: bool, flags: Sequence[str]) -> tuple:
+    """
+    Collects the settings that change the minutiae extracted from an image, for use in a cache key.
+    :param invert: True if the image's colours are inverted before extraction.
+    :param m1_direction: True if the minutiae directions are converted to the M1 convention.
+    :param flags: The command line flags MINDTCT is run with.
+    :return: The settings.
+    """
+    return bool(invert), bool(m1_direction), tuple(flags)
+
+
+class ExtractionCache(object):
+    def __init__(self, directory: Path = None, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        A content addressed on-disk cache of extracted minutiae. Entries are keyed by the grayscale pixels of the image
+        and the settings used to extract them, and the least recently used entries are evicted once the cache grows
+        past its maximum size. The cache can be shared between threads and processes.
+        :param directory: The directory to store the cache in, if None the default cache directory is used.
+        :param max_size: The maximum size of the cache in bytes.
+        """
+        self.directory = default_cache_directory() if directory is None else Path(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(image: Image, settings: Sequence) -> str:
+        """
+        Calculates the cache key of an image.
+        :param image: The image the minutiae are extracted from.
+        :param settings: Every setting that changes the extracted minutiae, e.g. the ridge colour and MINDTCT flags.
+        :return: The key.
+        """
+        if image.mode != 'L':
+            image = image.convert('L')
+        digest = hashlib.sha256(repr((image.size, tuple(settings))).encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[MinutiaSet]:
+        """
+        Reads the minutiae stored under a key.
+        :param key: The key.
+        :return: The minutiae, or None if they aren't in the cache.
+        """
+        path = self.get_file(key)
+        if path is None:
+            return None
+        return MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(path))
+
+    def get_file(self, key: str) -> Optional[Path]:
+        """
+        Finds the minutiae file stored under a key, and marks it as recently used.
+        :param key: The key.
+        :return: The path of the NBIST minutiae file, or None if it isn't in the cache.
+        """
+        path = self._path(key)
+        try:
+            os.utime(str(path))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key: str, minutiae: Union[MinutiaSet, Iterable[Minutia]], image: Image):
+        """
+        Stores minutiae under a key.
+        :param key: The key.
+        :param minutiae: The minutiae to store.
+        :param image: The image the minutiae are from.
+        """
+        self._store(key, lambda path: MinutiaeEncoder(MinutiaeFileFormat.NBIST).write(path, minutiae, image))
+
+    def put_file(self, key: str, minutiae_path: Path):
+        """
+        Stores a copy of a NBIST minutiae file under a key.
+        :param key: The key.
+        :param minutiae_path: The minutiae file to store.
+        """
+        self._store(key, lambda path: shutil.copyfile(str(minutiae_path), path))
+
+    def size(self) -> int:
+        """
+        Returns the size of the cache.
+        :return: The total size of the cached files in bytes.
+        """
+        with self._lock:
+            return self._current_size()
+
+    def clear(self):
+        """
+        Deletes every entry in the cache.
+        """
+        with self._lock:
+            shutil.rmtree(str(self.directory), ignore_errors=True)
+            self._size = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + '.min')
+
+    def _store(self, key: str, write):
+        """
+        Writes an entry to a temporary file and moves it in to place, so a reader never sees a partial file.
+        :param key: The key.
+        :param write: A function that writes the entry to the path it is given.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+        os.close(handle)
+        try:
+            write(temp_path)
+            size = os.path.getsize(temp_path)
+            with self._lock:
+                self._current_size()
+                # An entry being replaced no longer counts towards the size:
+                try:
+                    self._size -= os.path.getsize(str(path))
+                except FileNotFoundError:
+                    pass
+                os.replace(temp_path, str(path))
+                self._size += size
+                if self._size > self.max_size:
+                    self._evict()
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _current_size(self) -> int:
+        # The size is only measured once, after that it is tracked as entries are added and evicted.
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in self.directory.glob('*/*.min'))
+        return self._size
+
+    def _evict(self):
+        """
+        Deletes the least recently used entries until the cache is within its maximum size.
+        """
+        entries = []
+        for entry in self.directory.glob('*/*.min'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda e: e[0])
+
+        self._size = sum(e[1] for e in entries)
+        for _, size, entry in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            self._size -= size
@@ -0,0 +1,106 @@
+import io
+import os
+from pathlib import Path
+from typing import BinaryIO, Dict, NamedTuple, Optional
+
+import numpy as np
+from PIL import Image as PILImage
+from PIL.Image import Image
+
+from pyminutiaeviewer.errors import MindtctError
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
+
+# The NBIS IHead format is a fixed size header of ASCII fields followed by the uncompressed pixels, so MINDTCT reads it
+# without decoding and it is written without encoding. The header is preceded by its own length, as a field.
+IHEAD_SIZE = 288
+# The width of the header's numeric fields, which are NUL padded decimal strings.
+IHEAD_FIELD_SIZE = 8
+# The resolution the images given to MINDTCT are described as having, in pixels per inch.
+IHEAD_DENSITY = 500
+
+# The width and height in pixels of the blocks MINDTCT's maps have a value for.
+MAP_BLOCK_SIZE = 8
+# The extensions of the maps MINDTCT writes, and the MindtctOutput fields they are read in to.
+MAP_EXTENSIONS = {'.dm': 'direction_map',
+                  '.lcm': 'low_contrast_map',
+                  '.lfm': 'low_flow_map',
+                  '.hcm': 'high_curve_map',
+                  '.qm': 'quality_map'}
+
+# Everything MINDTCT writes for an image other than its .xyt file, which holds a subset of the minutiae. The maps have
+# a value per MAP_BLOCK_SIZE block of the image: the direction map the ridge direction, in 11.25 degree steps or -1
+# where there is none, the low contrast, low flow and high curvature maps 1 where the block is, and the quality map
+# the quality from 0 to 4. The binarised image has black ridges on white. Each is None if it wasn't read.
+MindtctOutput = NamedTuple('MindtctOutput', [('minutiae', MinutiaSet),
+                                             ('binarised_image', Optional[Image]),
+                                             ('direction_map', Optional[np.ndarray]),
+                                             ('low_contrast_map', Optional[np.ndarray]),
+                                             ('low_flow_map', Optional[np.ndarray]),
+                                             ('high_curve_map', Optional[np.ndarray]),
+                                             ('quality_map', Optional[np.ndarray])])
+
+
+def write_ihead(image: Image, file: BinaryIO):
+    """
+    Writes a grayscale image in the uncompressed NBIS IHead format.
+    :param image: The image, in 'L' mode.
+    :param file: A binary file to write it to.
+    """
+    if image.mode != 'L':
+        raise AttributeError("Only 'L' images can be written as IHead, not '{}' images.".format(image.mode))
+    width, height = image.size
+    # Fields in order: comment, creation date, width, height, depth, density, compression (none), compressed length,
+    # scanline alignment and unit size in bits, significant bit and byte order, pixel offset, white pixel value,
+    # signedness, row major, top to bottom and left to right orders, parent image and offset within it.
+    header = b''.join([_field('', 80), _field('', 26), _field(width), _field(height), _field(8),
+                       _field(IHEAD_DENSITY), _field(0), _field(0), _field(8), _field(8), b'00', _field(0),
+                       _field(255), b'0000', _field('', 80), _field(0), _field(0)])
+    file.write(_field(IHEAD_SIZE) + header)
+    file.write(image.tobytes())
+
+
+def _field(value, size: int = IHEAD_FIELD_SIZE) -> bytes:
+    text = str(value).encode('ascii')
+    return text + b'\0' * (size - len(text))
+
+
+def read_output(output_path: Path, everything: bool = True) -> MindtctOutput:
+    """
+    Reads what MINDTCT wrote for an image, in a single pass over its output directory.
+    :param output_path: The root path MINDTCT wrote its output files to.
+    :param everything: If False only the minutiae are read, and the rest of the output is None.
+    :return: The output.
+    """
+    contents = {}  # type: Dict[str, bytes]
+    prefix = output_path.name + '.'
+    with os.scandir(str(output_path.parent)) as entries:
+        for entry in entries:
+            if not entry.name.startswith(prefix):
+                continue
+            extension = entry.name[len(output_path.name):]
+            if extension == '.min' or (everything and (extension in MAP_EXTENSIONS or extension == '.brw')):
+                with open(entry.path, 'rb') as f:
+                    contents[extension] = f.read()
+
+    if '.min' not in contents:
+        raise MindtctError("MINDTCT did not write a minutiae file to '{}.min'.".format(output_path))
+    minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(io.BytesIO(contents['.min']))
+    if not everything:
+        return MindtctOutput(minutiae, None, None, None, None, None, None)
+
+    maps = {field: _parse_map(contents[extension]) if extension in contents else None
+            for extension, field in MAP_EXTENSIONS.items()}
+    binarised_image = None
+    if '.brw' in contents and minutiae.image_size is not None:
+        binarised_image = PILImage.frombytes('L', minutiae.image_size, contents['.brw'])
+    return MindtctOutput(minutiae, binarised_image, **maps)
+
+
+def _parse_map(data: bytes) -> np.ndarray:
+    """
+    Parses a map MINDTCT wrote, a line of space separated values per row of blocks.
+    """
+    values = np.array(data.split(), dtype=np.int8)
+    rows = data.count(b'\n')
+    return values.reshape(rows, -1) if rows else values.reshape(0, 0)
@@ -0,0 +1,233 @@
+import itertools
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.spatial_index import SpatialIndex
+
+# The minutia type of each type code, a type code is its index in this tuple.
+MINUTIA_TYPES = (MinutiaType.RIDGE_ENDING, MinutiaType.BIFURCATION)
+# The type code of each minutia type.
+MINUTIA_TYPE_CODES = {minutia_type: code for code, minutia_type in enumerate(MINUTIA_TYPES)}
+
+# Shared by every set, so that no two sets or states of a set have the same version.
+_versions = itertools.count()
+
+
+class MinutiaSet(object):
+    def __init__(self, x=(), y=(), angle=(), minutia_type=(), quality=(),
+                 image_size: Optional[Tuple[int, int]] = None):
+        """
+        A compact collection of minutiae, stored as parallel NumPy arrays rather than a Minutia object per feature.
+        Indexing with an int returns a Minutia, while indexing with a slice, mask or array of indices returns a new
+        MinutiaSet. The new set copies the minutiae, so changing it can't change this set behind its version's back. The
+        arrays should only be changed through the set's methods, so that its version and spatial index stay up to date.
+        :param x: The x co-ordinates.
+        :param y: The y co-ordinates.
+        :param angle: The angles of the minutiae.
+        :param minutia_type: The type codes of the minutiae, see MINUTIA_TYPES.
+        :param quality: The qualities of the features.
+        :param image_size: The width and height of the image the minutiae are from, if known.
+        """
+        self.x = np.asarray(x, dtype=np.int32)
+        self.y = np.asarray(y, dtype=np.int32)
+        self.angle = np.asarray(angle, dtype=np.float64)
+        self.minutia_type = np.asarray(minutia_type, dtype=np.int8)
+        self.quality = np.asarray(quality, dtype=np.float64)
+        self.image_size = image_size
+        # Changes whenever the set is modified, e.g. to tell if something rendered from the set is out of date.
+        self.version = next(_versions)
+        self._spatial_index = None
+        self._quality_order = None
+
+        if not len(self.x) == len(self.y) == len(self.angle) == len(self.minutia_type) == len(self.quality):
+            raise ValueError("Every minutiae array must be the same length.")
+
+    @classmethod
+    def from_minutiae(cls, minutiae: Iterable[Minutia]) -> 'MinutiaSet':
+        """
+        Creates a set from Minutia objects.
+        :param minutiae: The minutiae.
+        :return: The set.
+        """
+        minutiae = list(minutiae)
+        return cls([m.x for m in minutiae],
+                   [m.y for m in minutiae],
+                   [m.angle for m in minutiae],
+                   [MINUTIA_TYPE_CODES[m.minutia_type] for m in minutiae],
+                   [m.quality for m in minutiae])
+
+    def to_minutiae(self) -> List[Minutia]:
+        """
+        Converts the set to Minutia objects.
+        :return: The minutiae.
+        """
+        return list(self)
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the arrays backing the set.
+        :return: The x, y, angle, type code and quality arrays.
+        """
+        return self.x, self.y, self.angle, self.minutia_type, self.quality
+
+    def copy(self) -> 'MinutiaSet':
+        return MinutiaSet(*(column.copy() for column in self.columns()), image_size=self.image_size)
+
+    def scaled(self, ratio: float) -> 'MinutiaSet':
+        """
+        Scales the co-ordinates of the minutiae, e.g. to match a resized image.
+        :param ratio: The ratio to scale by.
+        :return: The scaled minutiae.
+        """
+        image_size = None if self.image_size is None else tuple(int(s * ratio) for s in self.image_size)
+        return MinutiaSet((self.x * ratio).astype(np.int32), (self.y * ratio).astype(np.int32),
+                          self.angle.copy(), self.minutia_type.copy(), self.quality.copy(), image_size)
+
+    def rotated(self, degrees: float, centre: Tuple[float, float]) -> 'MinutiaSet':
+        """
+        Rotates the minutiae clockwise about a point, e.g. to match a rotated image. The width and height of the image
+        are swapped by a quarter turn, as they are by Image.transpose, and kept by any other angle, as they are by
+        Image.rotate.
+        :param degrees: The angle to rotate by.
+        :param centre: The point to rotate about.
+        :return: The rotated minutiae.
+        """
+        cx, cy = centre
+        radians = np.radians(degrees)
+        cos, sin = np.cos(radians), np.sin(radians)
+        dx, dy = self.x - cx, self.y - cy
+        x = np.rint(cx + dx * cos - dy * sin).astype(np.int32)
+        y = np.rint(cy + dx * sin + dy * cos).astype(np.int32)
+        image_size = self.image_size
+        if image_size is not None and degrees % 180 == 90:
+            image_size = (image_size[1], image_size[0])
+        return MinutiaSet(x, y, (self.angle + degrees) % 360, self.minutia_type.copy(), self.quality.copy(),
+                          image_size)
+
+    def filtered(self, mask: np.ndarray) -> 'MinutiaSet':
+        """
+        Selects the minutiae where a mask is True.
+        :param mask: A boolean array with an entry for each minutia.
+        :return: The selected minutiae.
+        """
+        return self[np.asarray(mask, dtype=bool)]
+
+    def spatial_index(self) -> SpatialIndex:
+        """
+        Returns a spatial index of the minutiae's co-ordinates. It is built on first use, and kept up to date as
+        minutiae are added to and removed from the set.
+        :return: The spatial index, it identifies minutiae by their index in this set.
+        """
+        if self._spatial_index is None:
+            self._spatial_index = SpatialIndex(self.x, self.y)
+        return self._spatial_index
+
+    def quality_mask(self, min_quality: float) -> np.ndarray:
+        """
+        Finds the minutiae with a quality above a threshold. The minutiae's order by quality is kept between calls until
+        the set changes, so each threshold is a binary search rather than a comparison with every quality.
+        :param min_quality: The threshold, minutiae with exactly this quality are excluded.
+        :return: A boolean mask of the minutiae.
+        """
+        if self._quality_order is None or self._quality_order[0] != self.version:
+            # NaN qualities are sorted last, and are never above a threshold:
+            order = np.argsort(self.quality, kind='stable')
+            order = order[:len(order) - np.count_nonzero(np.isnan(self.quality))]
+            self._quality_order = (self.version, order, self.quality[order])
+        _, order, sorted_quality = self._quality_order
+        mask = np.zeros(len(self), dtype=bool)
+        mask[order[np.searchsorted(sorted_quality, min_quality, side='right'):]] = True
+        return mask
+
+    def type_mask(self, minutia_types: Iterable[MinutiaType]) -> np.ndarray:
+        """
+        Finds the minutiae of some types.
+        :param minutia_types: The types.
+        :return: A boolean mask of the minutiae.
+        """
+        return np.isin(self.minutia_type, [MINUTIA_TYPE_CODES[minutia_type] for minutia_type in minutia_types])
+
+    def region_mask(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        Finds the minutiae inside a rectangle, including its edges, with the spatial index.
+        :param x0: The x co-ordinate of a corner of the rectangle.
+        :param y0: The y co-ordinate of a corner of the rectangle.
+        :param x1: The x co-ordinate of the opposite corner.
+        :param y1: The y co-ordinate of the opposite corner.
+        :return: A boolean mask of the minutiae.
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.spatial_index().in_box(x0, y0, x1, y1)] = True
+        return mask
+
+    def append(self, minutia: Minutia):
+        self.insert(len(self), minutia)
+
+    def insert(self, index: int, minutia: Minutia):
+        self.x = np.insert(self.x, index, minutia.x)
+        self.y = np.insert(self.y, index, minutia.y)
+        self.angle = np.insert(self.angle, index, minutia.angle)
+        self.minutia_type = np.insert(self.minutia_type, index, MINUTIA_TYPE_CODES[minutia.minutia_type])
+        self.quality = np.insert(self.quality, index, minutia.quality)
+        self.version = next(_versions)
+        if self._spatial_index is not None:
+            self._spatial_index.insert(index, minutia.x, minutia.y)
+
+    def extend(self, minutiae: Union['MinutiaSet', Iterable[Minutia]]):
+        other = as_minutia_set(minutiae)
+        self.x, self.y, self.angle, self.minutia_type, self.quality = \
+            (np.concatenate((a, b)) for a, b in zip(self.columns(), other.columns()))
+        self.version = next(_versions)
+        # Rebuilt on next use, that is faster than inserting many minutiae one at a time.
+        self._spatial_index = None
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __iter__(self) -> Iterator[Minutia]:
+        for x, y, angle, code, quality in zip(*(column.tolist() for column in self.columns())):
+            yield Minutia(x, y, angle, MINUTIA_TYPES[code], quality)
+
+    def __getitem__(self, index) -> Union[Minutia, 'MinutiaSet']:
+        if isinstance(index, (int, np.integer)):
+            return Minutia(int(self.x[index]), int(self.y[index]), float(self.angle[index]),
+                           MINUTIA_TYPES[self.minutia_type[index]], float(self.quality[index]))
+        columns = [column[index] for column in self.columns()]
+        # Slices of arrays are views, while other indices already copy:
+        columns = [selected.copy() if np.may_share_memory(selected, column) else selected
+                   for selected, column in zip(columns, self.columns())]
+        return MinutiaSet(*columns, image_size=self.image_size)
+
+    def __setitem__(self, index: int, minutia: Minutia):
+        if self._spatial_index is not None:
+            self._spatial_index.move(index % len(self), minutia.x, minutia.y)
+        self.x[index] = minutia.x
+        self.y[index] = minutia.y
+        self.angle[index] = minutia.angle
+        self.minutia_type[index] = MINUTIA_TYPE_CODES[minutia.minutia_type]
+        self.quality[index] = minutia.quality
+        self.version = next(_versions)
+
+    def __delitem__(self, index):
+        indices = np.arange(len(self))[index]
+        self.x, self.y, self.angle, self.minutia_type, self.quality = \
+            (np.delete(column, indices) for column in self.columns())
+        self.version = next(_versions)
+        if self._spatial_index is not None:
+            self._spatial_index.remove(indices)
+
+    def __str__(self):
+        return "MinutiaSet({} minutiae)".format(len(self))
+
+
+def as_minutia_set(minutiae: Union[MinutiaSet, Iterable[Minutia]]) -> MinutiaSet:
+    """
+    Converts minutiae to a MinutiaSet, a MinutiaSet is returned as is.
+    :param minutiae: A MinutiaSet or Minutia objects.
+    :return: The minutiae as a set.
+    """
+    if isinstance(minutiae, MinutiaSet):
+        return minutiae
+    return MinutiaSet.from_minutiae(minutiae)
@@ -1,42 +1,153 @@
-from typing import List
+from functools import lru_cache
+from typing import Iterable, Tuple, Union
 
 import math
+import numpy as np
 from PIL import ImageDraw, Image
 
+from pyminutiaeviewer import tracing
 from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet, as_minutia_set, MINUTIA_TYPE_CODES
 
+# The colour each minutia type is drawn in.
+MINUTIA_COLOURS = {MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION]: (255, 0, 0, 255),
+                   MINUTIA_TYPE_CODES[MinutiaType.RIDGE_ENDING]: (0, 255, 0, 255)}
+# The length of the line indicating a minutia's angle, as a multiple of the marker size.
+ANGLE_LINE_LENGTH = 1.5
 
-def draw_minutiae(image: Image.Image, minutiae: List[Minutia], size: int = None):
+
+def colour_image(image: Image.Image) -> Image.Image:
+    """
+    Converts an image to the smallest mode minutiae can be drawn on to in colour, e.g. a grayscale fingerprint.
+    :param image: The image.
+    :return: The image in 'RGB' mode, or 'RGBA' mode if it is transparent. Images already in either mode are returned
+    as they are.
+    """
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    transparent = 'A' in image.getbands() or 'transparency' in image.info
+    return image.convert('RGBA' if transparent else 'RGB')
+
+
+@tracing.traced('minutiae.draw')
+def draw_minutiae(image: Image.Image, minutiae: Union[MinutiaSet, Iterable[Minutia]], size: int = None):
     """
     Draws minutiae of to a copy of the image. Bifurcations are drawn as green squares, and ridge ends are drawn as red 
     circles. A line indicates the angle of the minutiae.
-    :param image: An image to drawn the minutiae on to, typically a fingerprint.
-    :param minutiae: A list of minutiae to be drawn.
+    Rather than drawing each minutia in turn, the pixels of every marker and line are found at once, with markers
+    stamped from glyphs rendered once per type and size, and then each colour is pasted in a single operation. The
+    result is the same as drawing each minutia with ImageDraw.
+    :param image: An RGB or RGBA image to drawn the minutiae on to, typically a fingerprint.
+    :param minutiae: The minutiae to be drawn, either a MinutiaSet or Minutia objects.
     :param size: the size of the minutiae visualizations in pixels. If unset an auto scaling value is set.
     :return: The annotated image.
     """
+    if image.mode not in ('RGB', 'RGBA'):
+        raise TypeError("Minutiae can only be drawn on RGB or RGBA images, not '{}' images.".format(image.mode))
     new_image = image.copy()
-    draw = ImageDraw.Draw(new_image)
 
     if size is None:
         size = min(image.size[0], image.size[1]) / 512.0 * 10.0
-    half = size / 2.0
 
-    for m in minutiae:
-        bounding_box = (m.x - half, m.y - half, m.x + half, m.y + half)
-        if m.minutia_type == MinutiaType.BIFURCATION:
-            colour = (255, 0, 0, 255)
-            draw.ellipse(bounding_box, outline=colour)
-        elif m.minutia_type == MinutiaType.RIDGE_ENDING:
-            colour = (0, 255, 0, 255)
-            draw.rectangle(bounding_box, outline=colour)
-        else:
-            raise AttributeError("Unknown minutiae type: {}".format(m))
+    minutiae = as_minutia_set(minutiae)
+    unknown = ~np.isin(minutiae.minutia_type, list(MINUTIA_COLOURS))
+    if unknown.any():
+        raise AttributeError("Unknown minutiae type code: {}".format(minutiae.minutia_type[unknown][0]))
+    if len(minutiae) == 0:
+        return new_image
 
-        angle = (m.angle - 90) % 360
+    # Minutiae too far outside of the image to touch it are skipped, the rest are drawn in to a region of labels that
+    # has a margin wide enough for every marker and line, labelled with the type drawn on each pixel, 0 for none:
+    margin = int(math.ceil(size * ANGLE_LINE_LENGTH)) + int(math.ceil(size / 2.0)) + 2
+    width, height = image.size
+    minutiae = minutiae[(minutiae.x > -margin) & (minutiae.x < width + margin) &
+                        (minutiae.y > -margin) & (minutiae.y < height + margin)]
+    if len(minutiae) == 0:
+        return new_image
+    left, top = int(minutiae.x.min()) - margin, int(minutiae.y.min()) - margin
+    right, bottom = int(minutiae.x.max()) + margin + 1, int(minutiae.y.max()) + margin + 1
+    labels = np.zeros((bottom - top, right - left), dtype=np.uint8)
 
-        x2 = m.x + math.cos(math.radians(angle)) * size * 1.5
-        y2 = m.y + math.sin(math.radians(angle)) * size * 1.5
-        draw.line((m.x, m.y, x2, y2), fill=colour)
+    # Each row holds a minutia's marker pixels then its line pixels, so where minutiae overlap the later one is drawn
+    # on top, as it would be when drawing them one at a time:
+    marker_x, marker_y = _marker_pixels(minutiae, float(size))
+    line_x, line_y = _line_pixels(minutiae, float(size))
+    pixels = np.hstack(((marker_y - top) * labels.shape[1] + (marker_x - left),
+                        (line_y - top) * labels.shape[1] + (line_x - left)))
+    labels.ravel()[pixels.ravel()] = np.repeat(minutiae.minutia_type + 1, pixels.shape[1])
+
+    # Paste each colour through the part of its labels that is inside the image:
+    box = (max(left, 0), max(top, 0), min(right, width), min(bottom, height))
+    labels = labels[box[1] - top:box[3] - top, box[0] - left:box[2] - left]
+    for minutia_type, colour in MINUTIA_COLOURS.items():
+        mask = labels == minutia_type + 1
+        if mask.any():
+            new_image.paste(colour[:len(image.mode)], box, Image.fromarray(mask))
 
     return new_image
+
+
+def _marker_pixels(minutiae: MinutiaSet, size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the pixels of every minutia's marker. ImageDraw truncates the corners of a marker's bounding box towards
+    zero, so markers that are left of or above the image's origin are a pixel narrower or shorter than the rest, and
+    a glyph is stamped for each shape of bounding box.
+    :return: The x and y co-ordinates of the pixels, with a row per minutia.
+    """
+    half = size / 2.0
+    x0, x1 = np.trunc(minutiae.x - half).astype(np.int32), np.trunc(minutiae.x + half).astype(np.int32)
+    y0, y1 = np.trunc(minutiae.y - half).astype(np.int32), np.trunc(minutiae.y + half).astype(np.int32)
+    # Each type, width and height is packed in to a single key, as finding unique ints is faster than unique rows:
+    stride = int(max((x1 - x0).max(), (y1 - y0).max())) + 1
+    keys = (minutiae.minutia_type.astype(np.int64) * stride + (x1 - x0)) * stride + (y1 - y0)
+    shapes, shape_indices = np.unique(keys, return_inverse=True)
+    glyphs = [_glyph(key // stride ** 2, key // stride % stride, key % stride) for key in shapes.tolist()]
+    # Shorter glyphs are padded by repeating their first pixel, so every minutia has the same number of pixels:
+    length = max(len(glyph_x) for glyph_x, _ in glyphs)
+    offsets_x = np.array([np.pad(glyph_x, (0, length - len(glyph_x)), mode='edge') for glyph_x, _ in glyphs],
+                         dtype=np.int32)
+    offsets_y = np.array([np.pad(glyph_y, (0, length - len(glyph_y)), mode='edge') for _, glyph_y in glyphs],
+                         dtype=np.int32)
+    return x0[:, np.newaxis] + offsets_x[shape_indices], y0[:, np.newaxis] + offsets_y[shape_indices]
+
+
+def _line_pixels(minutiae: MinutiaSet, size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the pixels of every minutia's angle line. The end of a line is truncated to a whole pixel and the line is
+    traced with Bresenham's algorithm, as ImageDraw.line does.
+    :return: The x and y co-ordinates of the pixels, with a row per minutia.
+    """
+    length = size * ANGLE_LINE_LENGTH
+    radians = np.radians((minutiae.angle - 90) % 360)
+    x0, y0 = minutiae.x, minutiae.y
+    dx = np.trunc(x0 + np.cos(radians) * length).astype(np.int32) - x0
+    dy = np.trunc(y0 + np.sin(radians) * length).astype(np.int32) - y0
+
+    # Step one pixel at a time along the major axis, rounding the position on the minor axis as Bresenham does:
+    major = np.maximum(np.maximum(np.abs(dx), np.abs(dy)), 1)[:, np.newaxis]
+    steps = np.minimum(np.arange(int(major.max()) + 1, dtype=np.int32), major)
+    minor_x = (2 * steps * np.abs(dx)[:, np.newaxis] + major) // (2 * major)
+    minor_y = (2 * steps * np.abs(dy)[:, np.newaxis] + major) // (2 * major)
+    return (x0[:, np.newaxis] + np.sign(dx)[:, np.newaxis] * minor_x,
+            y0[:, np.newaxis] + np.sign(dy)[:, np.newaxis] * minor_y)
+
+
+@lru_cache(maxsize=64)
+def _glyph(minutia_type: int, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Renders the marker of a minutia type once, as the offsets of its pixels from the top left of its bounding box.
+    :param minutia_type: The minutia type code.
+    :param width: The distance between the left and right of the marker's bounding box, in whole pixels.
+    :param height: The distance between the top and bottom of the marker's bounding box, in whole pixels.
+    :return: The x and y offsets of the marker's pixels.
+    """
+    border = 2
+    glyph = Image.new('L', (width + 2 * border + 1, height + 2 * border + 1))
+    draw = ImageDraw.Draw(glyph)
+    bounding_box = (border, border, border + width, border + height)
+    if minutia_type == MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION]:
+        draw.ellipse(bounding_box, outline=255)
+    else:
+        draw.rectangle(bounding_box, outline=255)
+    glyph_y, glyph_x = np.nonzero(np.array(glyph))
+    return glyph_x - border, glyph_y - border
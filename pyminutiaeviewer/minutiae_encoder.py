@@ -1,15 +1,24 @@
-from typing import List
+import io
+import os
+import secrets
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 from PIL import Image
 
 from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.fingerprint_template import FingerView, encode_template
 from pyminutiaeviewer.minutia import Minutia, MinutiaType
-from pyminutiaeviewer.minutiae_reader import MinutiaeFileFormat
+from pyminutiaeviewer.minutia_set import MinutiaSet, as_minutia_set, MINUTIA_TYPES
+from pyminutiaeviewer.minutiae_reader import MinutiaeFileFormat, BINARY_HEADER, BINARY_MAGIC, BINARY_RECORD, \
+    BINARY_VERSION, XYT_QUALITY_SCALE
 
 
 class MinutiaeEncoder(object):
     def __init__(self, file_format: MinutiaeFileFormat):
         self._file_format = file_format
+        self._binary = file_format in _BINARY_FORMATS
         if file_format == MinutiaeFileFormat.NBIST:
             self._encoder = _encode_nbist_format
         elif file_format == MinutiaeFileFormat.MINDTCT:
@@ -18,87 +27,285 @@ class MinutiaeEncoder(object):
             self._encoder = _encode_simple_format
         elif file_format == MinutiaeFileFormat.XYT:
             self._encoder = _encode_xyt_format
+        elif file_format == MinutiaeFileFormat.BINARY:
+            self._encoder = _encode_binary_format
+        elif file_format == MinutiaeFileFormat.ISO_19794_2:
+            self._encoder = _encode_iso_format
+        elif file_format == MinutiaeFileFormat.ANSI_378:
+            self._encoder = _encode_ansi_format
         else:
             raise AttributeError("MinutiaeReader is not configured to read file format: {}".format(file_format))
 
-    def write(self, absolute_file_path: str, minutiae: List[Minutia], image: Image.Image):
+    def write(self, file: Union[str, IO], minutiae: Union[MinutiaSet, Iterable[Minutia]],
+              image: Optional[Image.Image], atomic: bool = False):
         """
-        Writes minutiae to a text file.
-        :param absolute_file_path: The absolute file path for the minutiae to be written to.
-        :param minutiae: The minutiae to write to file.
-        :param image: The image the minutiae are from, provides metadata to encoding.
+        Writes minutiae to a file. The file is written as it is encoded, so the encoding is never held in memory.
+        :param file: The file path for the minutiae to be written to, or a writable file-like object. Text formats can
+        be written to text or binary file-like objects, binary formats need a binary one.
+        :param minutiae: The minutiae to write to file, either a MinutiaSet or Minutia objects.
+        :param image: The image the minutiae are from, provides metadata to encoding. If None the image size stored
+        with the minutiae is used.
+        :param atomic: If True the minutiae are written to a temporary file that is then renamed to the file path, so
+        the file is never left half written. Only used when writing to a file path.
         """
-        encoded_minutiae = self._encoder(minutiae, image)
+        self._write_chunks(file, self._encoder(as_minutia_set(minutiae), image), atomic)
 
-        with open(absolute_file_path, 'w') as f:
-            f.write(encoded_minutiae)
+    def write_finger_views(self, file: Union[str, IO], finger_views: List[FingerView],
+                           image: Optional[Image.Image], atomic: bool = False):
+        """
+        Writes the minutiae of several finger views to a single file. Only ISO/IEC 19794-2 and ANSI/INCITS 378
+        templates can hold more than one finger view.
+        :param file: The file path for the minutiae to be written to, or a writable file-like object.
+        :param finger_views: The finger views to write.
+        :param image: The image the minutiae are from, provides metadata to encoding. If None the image size stored
+        with the first finger view's minutiae is used.
+        :param atomic: If True the file is written to a temporary file that is then renamed to the file path.
+        """
+        if self._file_format not in _TEMPLATE_FORMATS:
+            if len(finger_views) != 1:
+                raise AttributeError("The {} format can only hold a single finger view.".format(self._file_format))
+            self.write(file, finger_views[0].minutiae, image, atomic)
+            return
+
+        finger_views = [view._replace(minutiae=as_minutia_set(view.minutiae)) for view in finger_views]
+        for view in finger_views:
+            _check_type_codes(view.minutiae)
+        image_size = _image_size(finger_views[0].minutiae if finger_views else MinutiaSet(), image)
+        template = encode_template(finger_views, image_size, self._file_format == MinutiaeFileFormat.ANSI_378)
+        self._write_chunks(file, iter([template]), atomic)
+
+    def _write_chunks(self, file: Union[str, IO], lines: Iterator, atomic: bool):
+        """
+        Writes an encoding to a file path or file-like object.
+        :param file: The file path, or a writable file-like object.
+        :param lines: The chunks of the encoding.
+        :param atomic: If True the encoding is written to a temporary file that is then renamed to the file path.
+        """
+        mode = 'wb' if self._binary else 'w'
+
+        if hasattr(file, 'write'):
+            if self._binary:
+                file.writelines(lines)
+            else:
+                _write_lines(file, lines)
+        elif atomic:
+            path = Path(file)
+            handle, temp_path = _create_temporary_file(path)
+            try:
+                with os.fdopen(handle, mode) as f:
+                    f.writelines(lines)
+                    f.flush()
+                    # The file replaces the old one only once its contents are on disk:
+                    os.fsync(f.fileno())
+                os.replace(temp_path, str(path))
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        else:
+            with open(str(file), mode) as f:
+                f.writelines(lines)
+
+    def encode(self, minutiae: Union[MinutiaSet, Iterable[Minutia]],
+               image: Optional[Image.Image]) -> Union[str, bytes]:
+        """
+        Encodes minutiae to a string.
+        :param minutiae: The minutiae to encode, either a MinutiaSet or Minutia objects.
+        :param image: The image the minutiae are from, provides metadata to encoding. If None the image size stored
+        with the minutiae is used.
+        :return: The string encoding, or bytes for a binary format.
+        """
+        chunks = self._encoder(as_minutia_set(minutiae), image)
+        return b''.join(chunks) if self._binary else ''.join(chunks)
+
+
+def _create_temporary_file(path: Path) -> Tuple[int, str]:
+    """
+    Creates a new file next to a path, to be written and then renamed to it. The file has the permissions of the file
+    it replaces, or if there isn't one the permissions open gives a new file, as the kernel applies the umask.
+    :param path: The path a file is being written to.
+    :return: The file descriptor of the new file, open for writing, and its path.
+    """
+    while True:
+        temp_path = str(path.with_name('.{}.{}.tmp'.format(path.name, secrets.token_hex(4))))
+        try:
+            handle = os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0), 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        if path.exists():
+            os.chmod(temp_path, os.stat(str(path)).st_mode & 0o7777)
+    except BaseException:
+        os.close(handle)
+        os.remove(temp_path)
+        raise
+    return handle, temp_path
 
 
-def _encode_nbist_format(minutiae: List[Minutia], image: Image.Image) -> str:
+# The formats that are encoded to bytes rather than text.
+_BINARY_FORMATS = (MinutiaeFileFormat.BINARY, MinutiaeFileFormat.ISO_19794_2, MinutiaeFileFormat.ANSI_378)
+# The formats that can hold more than one finger view.
+_TEMPLATE_FORMATS = (MinutiaeFileFormat.ISO_19794_2, MinutiaeFileFormat.ANSI_378)
+
+
+def _write_lines(file: IO, lines: Iterator[str]):
+    """
+    Writes text to a text or binary file-like object.
+    :param file: The file-like object.
+    :param lines: The text to write.
+    """
+    if isinstance(file, io.TextIOBase):
+        file.writelines(lines)
+    else:
+        wrapper = io.TextIOWrapper(file, encoding='ascii', newline='')
+        wrapper.writelines(lines)
+        wrapper.flush()
+        # Leave the underlying file open for the caller.
+        wrapper.detach()
+
+
+def _image_size(minutiae: MinutiaSet, image: Optional[Image.Image]) -> Optional[Tuple[int, int]]:
+    """
+    Finds the size of the image minutiae are from.
+    :param minutiae: The minutiae.
+    :param image: The image the minutiae are from, or None.
+    :return: The width and height of the image, or None if it isn't known.
+    """
+    if image is not None:
+        return image.width, image.height
+    return minutiae.image_size
+
+
+def _type_symbols(minutiae: MinutiaSet, symbols: dict) -> List[str]:
+    """
+    Converts the type codes of minutiae to the symbols a file format uses for them.
+    :param minutiae: The minutiae.
+    :param symbols: The symbol of each minutia type.
+    :return: The symbol of each minutia.
+    """
+    _check_type_codes(minutiae)
+    return np.array([symbols[t] for t in MINUTIA_TYPES])[minutiae.minutia_type].tolist()
+
+
+def _check_type_codes(minutiae: MinutiaSet):
+    """
+    Ensures every minutia has a known type.
+    :param minutiae: The minutiae.
+    """
+    codes = minutiae.minutia_type
+    unknown = (codes < 0) | (codes >= len(MINUTIA_TYPES))
+    if np.any(unknown):
+        raise CorruptFileError("Minutiae of unknown type code '{}'".format(codes[unknown][0]))
+
+
+def _encode_nbist_format(minutiae: MinutiaSet, image: Image.Image) -> Iterator[str]:
     """
     Encodes to the NBIST's MINDTCT minutiae file.
     See: http://ws680.nist.gov/publication/get_pdf.cfm?pub_id=51097#page=159
     :param minutiae: The minutiae to encode.
     :param image: The image the minutiae are from, provides metadata to encoding.
-    :return: The string encoding.
+    :return: The lines of the encoding.
     """
-    string = ""
+    image_size = _image_size(minutiae, image)
+    if image_size is None:
+        raise AttributeError("The NBIST format needs the size of the image the minutiae are from.")
 
-    string += "Image (w,h) {} {}\n".format(image.width, image.height)
-    string += '\n'
-    string += "{} Minutiae Detected\n".format(len(minutiae))
-    string += '\n'
+    yield "Image (w,h) {} {}\n".format(*image_size)
+    yield '\n'
+    yield "{} Minutiae Detected\n".format(len(minutiae))
+    yield '\n'
 
-    for i in range(len(minutiae)):
-        m = minutiae[i]
+    minutia_types = _type_symbols(minutiae, {MinutiaType.BIFURCATION: "BIF", MinutiaType.RIDGE_ENDING: "RIG"})
+    directions = np.rint(minutiae.angle / 11.25).astype(np.int64).tolist()
+    for i, (x, y, direction, quality, minutia_type) in enumerate(zip(minutiae.x.tolist(), minutiae.y.tolist(),
+                                                                      directions, minutiae.quality.tolist(),
+                                                                      minutia_types)):
+        yield " {} :  {},  {} : {} :  {} :{} : This file is incomplete\n"\
+            .format(i, x, y, direction, quality, minutia_type)
 
-        if m.minutia_type == MinutiaType.BIFURCATION:
-            minutia_type = "BIF"
-        elif m.minutia_type == MinutiaType.RIDGE_ENDING:
-            minutia_type = "RIG"
-        else:
-            raise CorruptFileError("Minutiae of unknown type '{}'".format(m))
 
-        string += " {} :  {},  {} : {} :  {} :{} : This file is incomplete\n"\
-            .format(i, m.x, m.y, round(m.angle / 11.25), m.quality, minutia_type)
+def _encode_simple_format(minutiae: MinutiaSet, image: Image) -> Iterator[str]:
+    """
+    Encodes to a simplified minutiae file.
+    :param minutiae: The minutiae to encode.
+    :param image: The image the minutiae are from, provides metadata to encoding. This is unused.
+    :return: The lines of the encoding.
+    """
+    minutia_types = _type_symbols(minutiae, {MinutiaType.BIFURCATION: "BIF", MinutiaType.RIDGE_ENDING: "END"})
+    lines = zip(minutiae.x.tolist(), minutiae.y.tolist(), minutiae.angle.tolist(), minutia_types,
+                minutiae.quality.tolist())
 
-    return string
+    # TODO: If this project is upgraded to python 3.6+, use Formatted string literals.
+    # TODO: See: https://www.python.org/dev/peps/pep-0498/
+    return _join_lines("{} {} {} {} {}".format(*line) for line in lines)
 
 
-def _encode_simple_format(minutiae: List[Minutia], image: Image) -> str:
+def _encode_xyt_format(minutiae: MinutiaSet, image: Image) -> Iterator[str]:
     """
-    Encodes to a simplified minutiae file.
+    Encodes to a xyt minutiae file.
     :param minutiae: The minutiae to encode.
     :param image: The image the minutiae are from, provides metadata to encoding. This is unused.
-    :return: The string encoding.
+    :return: The lines of the encoding.
     """
-    string = ""
+    lines = zip(minutiae.x.tolist(), minutiae.y.tolist(), (minutiae.angle % 180).astype(np.int64).tolist(),
+                np.rint(minutiae.quality * XYT_QUALITY_SCALE).astype(np.int64).tolist())
 
-    for m in minutiae:
-        if m.minutia_type == MinutiaType.BIFURCATION:
-            minutia_type = "BIF"
-        elif m.minutia_type == MinutiaType.RIDGE_ENDING:
-            minutia_type = "END"
-        else:
-            raise CorruptFileError("Minutiae of unknown type '{}'".format(m))
+    return _join_lines("{} {} {} {}".format(*line) for line in lines)
 
-        # TODO: If this project is upgraded to python 3.6+, use Formatted string literals.
-        # TODO: See: https://www.python.org/dev/peps/pep-0498/
-        string += "{} {} {} {} {}\n".format(m.x, m.y, m.angle, minutia_type, m.quality)
 
-    return string[:-1]
+def _encode_binary_format(minutiae: MinutiaSet, image: Optional[Image.Image]) -> Iterator[bytes]:
+    """
+    Encodes to a binary minutiae file.
+    :param minutiae: The minutiae to encode.
+    :param image: The image the minutiae are from, provides metadata to encoding.
+    :return: The header and records of the encoding.
+    """
+    width, height = _image_size(minutiae, image) or (0, 0)
+    header = np.array([(BINARY_MAGIC, BINARY_VERSION, BINARY_RECORD.itemsize, width, height, len(minutiae))],
+                      dtype=BINARY_HEADER)
+    _check_type_codes(minutiae)
+
+    records = np.empty(len(minutiae), dtype=BINARY_RECORD)
+    records['x'] = minutiae.x
+    records['y'] = minutiae.y
+    records['angle'] = minutiae.angle
+    records['minutia_type'] = minutiae.minutia_type
+    records['quality'] = minutiae.quality
 
+    yield header.tobytes()
+    yield records.tobytes()
 
-def _encode_xyt_format(minutiae: List[Minutia], image: Image) -> str:
+
+def _encode_iso_format(minutiae: MinutiaSet, image: Optional[Image.Image]) -> Iterator[bytes]:
     """
-    Encodes to a xyt minutiae file.
+    Encodes to an ISO/IEC 19794-2 finger minutiae record with a single finger view.
     :param minutiae: The minutiae to encode.
-    :param image: The image the minutiae are from, provides metadata to encoding. This is unused.
-    :return: The string encoding.
+    :param image: The image the minutiae are from, provides metadata to encoding.
+    :return: The record.
+    """
+    _check_type_codes(minutiae)
+    yield encode_template([FingerView(minutiae, 0, 0, 0, 0)], _image_size(minutiae, image), ansi=False)
+
+
+def _encode_ansi_format(minutiae: MinutiaSet, image: Optional[Image.Image]) -> Iterator[bytes]:
     """
-    string = ""
+    Encodes to an ANSI/INCITS 378 finger minutiae record with a single finger view.
+    :param minutiae: The minutiae to encode.
+    :param image: The image the minutiae are from, provides metadata to encoding.
+    :return: The record.
+    """
+    _check_type_codes(minutiae)
+    yield encode_template([FingerView(minutiae, 0, 0, 0, 0)], _image_size(minutiae, image), ansi=True)
 
-    for m in minutiae:
-        string += "{} {} {} {}\n".format(m.x, m.y, int(m.angle % 180), int(m.quality * 100))
 
-    return string[:-1]
+def _join_lines(lines: Iterator[str]) -> Iterator[str]:
+    """
+    Separates lines with newlines, without a newline after the last line.
+    :param lines: The lines.
+    :return: The lines and separators.
+    """
+    separator = ''
+    for line in lines:
+        yield separator + line
+        separator = '\n'
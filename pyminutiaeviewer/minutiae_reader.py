@@ -1,10 +1,16 @@
+import io
+import itertools
+import os
+import struct
 from enum import Enum
-from typing import List
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Union
 
-import re
+import numpy as np
 
 from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.fingerprint_template import FingerView, parse_template, FORMAT_IDENTIFIER
 from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet, MINUTIA_TYPE_CODES, MINUTIA_TYPES
 
 
 class MinutiaeFileFormat(Enum):
@@ -12,33 +18,237 @@ class MinutiaeFileFormat(Enum):
     MINDTCT = "MINDTCT"
     SIMPLE = "SIMPLE"
     XYT = "XYT"
+    BINARY = "BINARY"
+    ISO_19794_2 = "ISO_19794_2"
+    ANSI_378 = "ANSI_378"
+
+
+# The file extensions the application associates with each minutiae file format.
+MINUTIAE_FILE_EXTENSIONS = {
+    '.min': MinutiaeFileFormat.NBIST,
+    '.sim': MinutiaeFileFormat.SIMPLE,
+    '.xyt': MinutiaeFileFormat.XYT,
+    '.mnb': MinutiaeFileFormat.BINARY,
+    '.ist': MinutiaeFileFormat.ISO_19794_2,
+    '.ansi': MinutiaeFileFormat.ANSI_378,
+}
+# The file extension the application gives each minutiae file format it writes.
+FORMAT_FILE_EXTENSIONS = {file_format: extension for extension, file_format in MINUTIAE_FILE_EXTENSIONS.items()}
+
+# The number of bytes at the start of a file that its format is detected from.
+DETECTION_SIZE = 4096
+# The number of lines of a text file that must agree on its format.
+DETECTION_LINES = 16
+
+# xyt files store qualities from 0 to 100, as MINDTCT writes them, rather than from 0 to 1.
+XYT_QUALITY_SCALE = 100
+
+# The binary format is a fixed size header followed by a fixed size record per minutia, all little-endian. The record's
+# fields have the same types as MinutiaSet's arrays, so each is copied out without conversion.
+BINARY_MAGIC = b'PMVB'
+BINARY_VERSION = 1
+BINARY_HEADER = np.dtype([('magic', 'S4'), ('version', '<u2'), ('record_size', '<u2'),
+                          ('width', '<u4'), ('height', '<u4'), ('count', '<u4')])
+BINARY_RECORD = np.dtype([('x', '<i4'), ('y', '<i4'), ('angle', '<f8'), ('minutia_type', 'i1'), ('quality', '<f8')])
 
 
 class MinutiaeReader(object):
     def __init__(self, file_format: MinutiaeFileFormat):
         self._file_format = file_format
         if file_format == MinutiaeFileFormat.NBIST:
-            self._parser = _parse_nbist_format
+            self._parser, self._bulk_parser = _parse_nbist_format, _bulk_parse_nbist_format
         elif file_format == MinutiaeFileFormat.MINDTCT:
-            self._parser = _parse_nbist_format
+            self._parser, self._bulk_parser = _parse_nbist_format, _bulk_parse_nbist_format
         elif file_format == MinutiaeFileFormat.SIMPLE:
-            self._parser = _parse_simple_format
+            self._parser, self._bulk_parser = _parse_simple_format, _bulk_parse_simple_format
         elif file_format == MinutiaeFileFormat.XYT:
-            self._parser = _parse_xyt_format
+            self._parser, self._bulk_parser = _parse_xyt_format, _bulk_parse_xyt_format
+        elif file_format == MinutiaeFileFormat.BINARY:
+            self._parser, self._bulk_parser = None, _parse_binary_format
+        elif file_format == MinutiaeFileFormat.ISO_19794_2:
+            self._parser, self._bulk_parser = None, _parse_iso_format
+        elif file_format == MinutiaeFileFormat.ANSI_378:
+            self._parser, self._bulk_parser = None, _parse_ansi_format
         else:
             raise AttributeError("MinutiaeReader is not configured to read file format: {}".format(file_format))
 
-    def read(self, absolute_file_path: str) -> List[Minutia]:
+    def read(self, file: Union[str, IO]) -> MinutiaSet:
         """
-        Reads minutiae from a text file.
-        :param absolute_file_path: The absolute file path to the minutiae text file.
+        Reads minutiae from a file. The whole file is parsed in to arrays at once. Only the first finger view of a
+        template with more than one is read, see read_finger_views.
+        :param file: The path to the minutiae file, or a file-like object to read it from.
         :return: The minutiae.
         """
-        with open(absolute_file_path) as f:
-            lines = f.readlines()
-            lines = [x.strip() for x in lines]
+        if self._parser is None:
+            return self._bulk_parser(_read_file(file))
+
+        if hasattr(file, 'read'):
+            text = file.read()
+        else:
+            with open(str(file)) as f:
+                text = f.read()
+        if isinstance(text, bytes):
+            text = text.decode()
+
+        return self._bulk_parser(text)
+
+    def read_finger_views(self, file: Union[str, IO]) -> List[FingerView]:
+        """
+        Reads every finger view from a file. Formats other than ISO/IEC 19794-2 and ANSI/INCITS 378 templates hold a
+        single finger view.
+        :param file: The path to the minutiae file, or a file-like object to read it from.
+        :return: The finger views.
+        """
+        if self._file_format in (MinutiaeFileFormat.ISO_19794_2, MinutiaeFileFormat.ANSI_378):
+            return parse_template(_read_file(file), self._file_format == MinutiaeFileFormat.ANSI_378)
+        return [FingerView(self.read(file), 0, 0, 0, 0)]
+
+    def iter_read(self, file: Union[str, IO]) -> Iterator[Minutia]:
+        """
+        Lazily reads minutiae from a text file, one line at a time.
+        :param file: The path to the minutiae text file, or a file-like object to read it from.
+        :return: An iterator of the minutiae.
+        """
+        if self._parser is None:
+            # The format is binary, so it is read at once.
+            yield from self.read(file)
+        elif hasattr(file, 'read'):
+            yield from self._parser(_decoded_lines(file))
+        else:
+            with open(str(file)) as f:
+                yield from self._parser(f)
+
+
+def detect_format(file: Union[str, IO], default: Optional[MinutiaeFileFormat] = None) -> MinutiaeFileFormat:
+    """
+    Detects the format of a minutiae file from its contents rather than its extension. Binary files are told apart by
+    their magic numbers, ISO/IEC 19794-2 and ANSI/INCITS 378 templates, which share theirs, by which header's record
+    length matches the file's length, NBIST files by their header, and simple and xyt files by the shape of their
+    columns. Only the start of the file is read.
+    :param file: The path to the minutiae file, or a seekable file-like object, which is left where it was.
+    :param default: The format returned if the file is empty or its format can't be detected, e.g. the format of the
+    file's extension. If None a CorruptFileError is raised instead.
+    :return: The format.
+    """
+    if not hasattr(file, 'read'):
+        with open(str(file), 'rb') as f:
+            return detect_format(f, default)
+    try:
+        return _detect_format(file)
+    except CorruptFileError:
+        if default is None:
+            raise
+        return default
+
+
+def _detect_format(file: IO) -> MinutiaeFileFormat:
+    """
+    Detects the format of a minutiae file, see detect_format.
+    :param file: A seekable file-like object, which is left where it was.
+    :return: The format.
+    """
+    position = file.tell()
+    head = file.read(DETECTION_SIZE)
+    size = file.seek(0, os.SEEK_END) - position
+    file.seek(position)
+    if isinstance(head, str):
+        head = head.encode()
+    if not head:
+        raise CorruptFileError("The format of an empty file can't be detected.")
 
-        return self._parser(lines)
+    if head.startswith(BINARY_MAGIC):
+        return MinutiaeFileFormat.BINARY
+    if head.startswith(FORMAT_IDENTIFIER):
+        return _detect_template_format(head, size)
+    file_format = _detect_text_format(head, len(head) == size)
+    if file_format is None:
+        raise CorruptFileError("The file is not in a known minutiae format.")
+    return file_format
+
+
+def _detect_template_format(head: bytes, size: int) -> MinutiaeFileFormat:
+    """
+    Tells an ISO/IEC 19794-2 template from an ANSI/INCITS 378 one. The ISO header has a four byte record length after
+    the version, and the ANSI header a two byte one, or zero followed by a four byte one for long records.
+    """
+    if len(head) >= 14:
+        iso_length, = struct.unpack_from('>I', head, 8)
+        ansi_length, ansi_long_length = struct.unpack_from('>HI', head, 8)
+        if iso_length == size:
+            return MinutiaeFileFormat.ISO_19794_2
+        if ansi_length == size or (ansi_length == 0 and ansi_long_length == size):
+            return MinutiaeFileFormat.ANSI_378
+    raise CorruptFileError("The template's record length doesn't match the file's length of {} bytes.".format(size))
+
+
+def _detect_text_format(head: bytes, complete: bool) -> Optional[MinutiaeFileFormat]:
+    """
+    Detects the format of a text minutiae file from its first lines.
+    :param head: The start of the file.
+    :param complete: True if the head is the whole file, otherwise its last line may have been cut short.
+    :return: The format, or None if it isn't a known text format.
+    """
+    try:
+        text = head.decode('ascii')
+    except UnicodeDecodeError:
+        return None
+    lines = text.splitlines()
+    if not complete:
+        lines = lines[:-1]
+    if lines and lines[0].startswith('Image') or 'Minutiae Detected' in text:
+        return MinutiaeFileFormat.NBIST
+
+    rows = [line.split() for line in lines if line.strip()][:DETECTION_LINES]
+    if not rows:
+        return None
+    if all(len(row) == 5 and row[3] in _SIMPLE_TYPE_CODES and _numbers(row[:3] + row[4:]) for row in rows):
+        return MinutiaeFileFormat.SIMPLE
+    if all(len(row) == 4 and _numbers(row) for row in rows):
+        return MinutiaeFileFormat.XYT
+    return None
+
+
+def _numbers(symbols: List[str]) -> bool:
+    try:
+        for symbol in symbols:
+            float(symbol)
+    except ValueError:
+        return False
+    return True
+
+
+def _decoded_lines(file: IO) -> Iterator[str]:
+    for line in file:
+        yield line.decode() if isinstance(line, bytes) else line
+
+
+def _read_file(file: Union[str, IO]) -> bytearray:
+    """
+    Reads a binary file straight in to a buffer of its size. Unlike a memory mapping, the buffer holds no file
+    descriptor, so any number of files can be read and kept.
+    :param file: The path to the file, or a file-like object.
+    :return: A buffer of the file's contents, which is writable.
+    """
+    if not hasattr(file, 'read'):
+        with open(str(file), 'rb', buffering=0) as f:
+            return _read_file(f)
+
+    try:
+        size = os.fstat(file.fileno()).st_size - file.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        # Not a real file, e.g. an in-memory buffer.
+        return bytearray(file.read())
+
+    buffer = bytearray(max(size, 0))
+    with memoryview(buffer) as view:
+        read = 0
+        while read < len(buffer):
+            count = file.readinto(view[read:])
+            if not count:
+                break
+            read += count
+    del buffer[read:]
+    return buffer
 
 
 # # # # # # # # # # # # # # # # # # # # # # # #
@@ -47,97 +257,280 @@ class MinutiaeReader(object):
 #
 # # # # # # # # # # # # # # # # # # # # # # # #
 
-def _parse_nbist_format(lines: List[str]) -> List[Minutia]:
+# The type codes of the minutia type symbols used in the NBIST and simple formats.
+_NBIST_TYPE_CODES = {"BIF": MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION],
+                     "RIG": MINUTIA_TYPE_CODES[MinutiaType.RIDGE_ENDING]}
+_SIMPLE_TYPE_CODES = {"BIF": MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION],
+                      "END": MINUTIA_TYPE_CODES[MinutiaType.RIDGE_ENDING]}
+
+
+def _parse_nbist_format(lines: Iterable[str]) -> Iterator[Minutia]:
     """
     Reads a NBIST format file that is generated by MINDTCT.
     :param lines: The lines of the text file.
     :return: The minutiae.
     """
-    minutiae = []
+    lines = iter(lines)
+    num_minutiae, _ = _nbist_header(lines)
 
-    # Skip first two lines
+    # read minutiae
+    count = 0
+    for line in lines:
+        if line.isspace() or not line:
+            continue
+        x, y, angle, minutia_type, quality = _nbist_fields(line.split(':', 5))
+        yield Minutia(x=int(x), y=int(y), angle=angle, minutia_type=MINUTIA_TYPES[minutia_type], quality=quality)
+        count += 1
 
-    # Number of minutiae:
-    num_minutiae = int(lines[2].split(' ')[0])
+    # Ensure the number of minutiae read is the expected number:
+    _check_nbist_count(num_minutiae, count)
 
-    # Skip blank line
 
-    # read minutiae
-    for line in lines[4:]:
-        symbols = re.split('[:;, ]', line)
-        symbols = list(filter(None, symbols))
-
-        minutia_type = symbols[5]
-        if minutia_type == "BIF":
-            minutia_type = MinutiaType.BIFURCATION
-        elif minutia_type == "RIG":
-            minutia_type = MinutiaType.RIDGE_ENDING
-        else:
+def _bulk_parse_nbist_format(text: str) -> MinutiaSet:
+    """
+    Reads a NBIST format file that is generated by MINDTCT in to arrays.
+    :param text: The contents of the text file.
+    :return: The minutiae.
+    """
+    lines = iter(text.splitlines())
+    num_minutiae, image_size = _nbist_header(lines)
+
+    # Only the first five fields of each line are needed, the rest are the neighbouring ridges.
+    fields = [line.split(':', 5) for line in lines if line and not line.isspace()]
+    try:
+        co_ordinates = [f[1] for f in fields]
+        # Like the line parser, every co-ordinate pair has exactly one comma and the co-ordinates are integers:
+        if fields and set(map(str.count, co_ordinates, itertools.repeat(','))) != {1}:
+            raise ValueError("malformed co-ordinates")
+        xy = np.array(','.join(co_ordinates).split(','), dtype=np.int32) if fields else np.empty(0, np.int32)
+        minutiae = MinutiaSet(x=xy[0::2],
+                              y=xy[1::2],
+                              angle=np.array([f[2] for f in fields], dtype=np.float64) * 11.25,
+                              minutia_type=_type_codes([f[4].strip() for f in fields], _NBIST_TYPE_CODES),
+                              quality=np.array([f[3] for f in fields], dtype=np.float64),
+                              image_size=image_size)
+    except (IndexError, ValueError):
+        # Parse line by line to find the line at fault:
+        return MinutiaSet.from_minutiae(_parse_nbist_format(text.splitlines()))
+
+    _check_nbist_count(num_minutiae, len(minutiae))
+    return minutiae
+
+
+def _nbist_header(lines: Iterator[str]) -> Tuple[int, Optional[Tuple[int, int]]]:
+    """
+    Reads the header of a NBIST format file.
+    :param lines: The lines of the text file, the four header lines are consumed.
+    :return: The number of minutiae the file declares, and the image size if it is given.
+    """
+    try:
+        # Image size:
+        symbols = next(lines).split()
+        try:
+            image_size = (int(symbols[-2]), int(symbols[-1]))
+        except (IndexError, ValueError):
+            image_size = None
+
+        # Skip blank line
+        next(lines)
+
+        # Number of minutiae:
+        num_minutiae = int(next(lines).split()[0])
+
+        # Skip blank line
+        next(lines)
+    except (StopIteration, IndexError, ValueError):
+        raise CorruptFileError("The file does not start with a NBIST header.")
+    return num_minutiae, image_size
+
+
+def _nbist_fields(symbols: list) -> tuple:
+    """
+    Interprets the fields of a line of a NBIST format file.
+    :param symbols: The line split on to its ':' separated fields.
+    :return: The x co-ordinate, y co-ordinate, angle, type code and quality.
+    """
+    try:
+        x, y = symbols[1].split(',')
+        minutia_type = symbols[4].strip()
+        if minutia_type not in _NBIST_TYPE_CODES:
             raise CorruptFileError("Unknown minutiae type '{}'".format(minutia_type))
+        return int(x), int(y), float(symbols[2]) * 11.25, _NBIST_TYPE_CODES[minutia_type], float(symbols[3])
+    except (IndexError, ValueError):
+        raise CorruptFileError("Malformed minutia line '{}'".format(':'.join(symbols).strip()))
 
-        minutiae.append(Minutia(
-            x=int(symbols[1]),
-            y=int(symbols[2]),
-            angle=float(symbols[3]) * 11.25,
-            minutia_type=minutia_type,
-            quality=float(symbols[4])
-        ))
 
-    # Ensure the number of minutiae read is the expected number:
-    if len(minutiae) != num_minutiae:
+def _check_nbist_count(num_minutiae: int, count: int):
+    if count != num_minutiae:
         raise CorruptFileError("The file declared there would be  {} minutiae, but only read {}."
-                               .format(num_minutiae, len(minutiae)))
-
-    return minutiae
+                               .format(num_minutiae, count))
 
 
-def _parse_simple_format(lines: List[str]) -> List[Minutia]:
+def _parse_simple_format(lines: Iterable[str]) -> Iterator[Minutia]:
     """
     Reads a simplified minutiae file.
     :param lines: The lines of the text file.
     :return: The minutiae.
     """
-    minutiae = []
-
     for line in lines:
-        symbols = line.split(' ')
+        symbols = line.split()
+        if not symbols:
+            continue
 
-        minutia_type = symbols[3]
-        if minutia_type == "BIF":
-            minutia_type = MinutiaType.BIFURCATION
-        elif minutia_type == "END":
-            minutia_type = MinutiaType.RIDGE_ENDING
-        else:
-            raise CorruptFileError("Unknown minutiae type '{}'".format(minutia_type))
+        try:
+            minutia_type = symbols[3]
+            if minutia_type not in _SIMPLE_TYPE_CODES:
+                raise CorruptFileError("Unknown minutiae type '{}'".format(minutia_type))
 
-        minutiae.append(Minutia(
-            x=int(symbols[0]),
-            y=int(symbols[1]),
-            angle=float(symbols[2]),
-            minutia_type=minutia_type,
-            quality=float(symbols[4])
-        ))
+            yield Minutia(
+                x=int(symbols[0]),
+                y=int(symbols[1]),
+                angle=float(symbols[2]),
+                minutia_type=MINUTIA_TYPES[_SIMPLE_TYPE_CODES[minutia_type]],
+                quality=float(symbols[4])
+            )
+        except (IndexError, ValueError):
+            raise CorruptFileError("Malformed minutia line '{}'".format(line.strip()))
 
-    return minutiae
+
+def _bulk_parse_simple_format(text: str) -> MinutiaSet:
+    """
+    Reads a simplified minutiae file in to arrays.
+    :param text: The contents of the text file.
+    :return: The minutiae.
+    """
+    columns = _columns(text, 5)
+    try:
+        if columns is not None:
+            return MinutiaSet(x=np.array(columns[0], dtype=np.int32),
+                              y=np.array(columns[1], dtype=np.int32),
+                              angle=np.array(columns[2], dtype=np.float64),
+                              minutia_type=_type_codes(columns[3], _SIMPLE_TYPE_CODES),
+                              quality=np.array(columns[4], dtype=np.float64))
+    except ValueError:
+        pass
+    # Parse line by line to find the line at fault:
+    return MinutiaSet.from_minutiae(_parse_simple_format(text.splitlines()))
 
 
-def _parse_xyt_format(lines: List[str]) -> List[Minutia]:
+def _parse_xyt_format(lines: Iterable[str]) -> Iterator[Minutia]:
     """
-    Reads a xyt minutiae file.
+    Reads a xyt minutiae file. Qualities are read from 0 to 1, like every other format's.
     :param lines: The lines of the text file.
     :return: The minutiae.
     """
-    minutiae = []
-
     for line in lines:
-        symbols = line.split(' ')
+        symbols = line.split()
+        if not symbols:
+            continue
 
-        minutiae.append(Minutia(
-            x=int(symbols[0]),
-            y=int(symbols[1]),
-            angle=float(symbols[2]),
-            minutia_type=MinutiaType.RIDGE_ENDING,
-            quality=float(symbols[3])
-        ))
+        try:
+            yield Minutia(
+                x=int(symbols[0]),
+                y=int(symbols[1]),
+                angle=float(symbols[2]),
+                minutia_type=MinutiaType.RIDGE_ENDING,
+                quality=float(symbols[3]) / XYT_QUALITY_SCALE
+            )
+        except (IndexError, ValueError):
+            raise CorruptFileError("Malformed minutia line '{}'".format(line.strip()))
 
-    return minutiae
+
+def _bulk_parse_xyt_format(text: str) -> MinutiaSet:
+    """
+    Reads a xyt minutiae file in to arrays. Qualities are read from 0 to 1, like every other format's.
+    :param text: The contents of the text file.
+    :return: The minutiae.
+    """
+    columns = _columns(text, 4)
+    try:
+        if columns is not None:
+            return MinutiaSet(x=np.array(columns[0], dtype=np.int32),
+                              y=np.array(columns[1], dtype=np.int32),
+                              angle=np.array(columns[2], dtype=np.float64),
+                              minutia_type=np.full(len(columns[0]), MINUTIA_TYPE_CODES[MinutiaType.RIDGE_ENDING]),
+                              quality=np.array(columns[3], dtype=np.float64) / XYT_QUALITY_SCALE)
+    except ValueError:
+        pass
+    # Parse line by line to find the line at fault:
+    return MinutiaSet.from_minutiae(_parse_xyt_format(text.splitlines()))
+
+
+def _parse_binary_format(buffer) -> MinutiaSet:
+    """
+    Reads a binary minutiae file. Each field of the records is copied out of the buffer in a single step, so nothing
+    is parsed per minutia and the minutiae don't keep the buffer alive.
+    :param buffer: The contents of the file.
+    :return: The minutiae.
+    """
+    if len(buffer) < BINARY_HEADER.itemsize:
+        raise CorruptFileError("The file is too short to be a binary minutiae file.")
+    header = np.frombuffer(buffer, BINARY_HEADER, count=1)[0]
+    if header['magic'] != BINARY_MAGIC:
+        raise CorruptFileError("The file is not a binary minutiae file.")
+    if header['version'] != BINARY_VERSION or header['record_size'] != BINARY_RECORD.itemsize:
+        raise CorruptFileError("Unsupported binary minutiae file version {}.".format(header['version']))
+
+    count = int(header['count'])
+    if len(buffer) != BINARY_HEADER.itemsize + count * BINARY_RECORD.itemsize:
+        raise CorruptFileError("The file declared there would be {} minutiae, but is {} bytes long."
+                               .format(count, len(buffer)))
+
+    records = np.frombuffer(buffer, BINARY_RECORD, count=count, offset=BINARY_HEADER.itemsize)
+    image_size = (int(header['width']), int(header['height'])) if header['width'] and header['height'] else None
+    return MinutiaSet(records['x'].copy(), records['y'].copy(), records['angle'].copy(),
+                      records['minutia_type'].copy(), records['quality'].copy(), image_size)
+
+
+def _parse_iso_format(buffer) -> MinutiaSet:
+    """
+    Reads the first finger view of an ISO/IEC 19794-2 minutiae template.
+    :param buffer: The contents of the file.
+    :return: The minutiae.
+    """
+    return _first_finger_view(parse_template(buffer, ansi=False))
+
+
+def _parse_ansi_format(buffer) -> MinutiaSet:
+    """
+    Reads the first finger view of an ANSI/INCITS 378 minutiae template.
+    :param buffer: The contents of the file.
+    :return: The minutiae.
+    """
+    return _first_finger_view(parse_template(buffer, ansi=True))
+
+
+def _first_finger_view(finger_views: List[FingerView]) -> MinutiaSet:
+    if len(finger_views) == 0:
+        raise CorruptFileError("The template has no finger views.")
+    return finger_views[0].minutiae
+
+
+def _columns(text: str, width: int):
+    """
+    Splits a whitespace separated text file with a fixed number of fields per line in to its columns.
+    :param text: The contents of the text file.
+    :param width: The number of fields on each line.
+    :return: A list of each column's fields, or None if the file isn't a simple table, e.g. it has blank lines.
+    """
+    symbols = text.split()
+    rows = len(symbols) // width
+    if rows * width != len(symbols) or (rows and text.strip().count('\n') + 1 != rows):
+        return None
+    return [symbols[i::width] for i in range(width)]
+
+
+def _type_codes(symbols: list, codes: dict) -> np.ndarray:
+    """
+    Converts minutia type symbols to type codes.
+    :param symbols: The type symbol of each minutia.
+    :param codes: The type code of each symbol.
+    :return: The type codes.
+    """
+    symbols = np.array(symbols, dtype=str)
+    type_codes = np.full(len(symbols), -1, dtype=np.int8)
+    for symbol, code in codes.items():
+        type_codes[symbols == symbol] = code
+    if np.any(type_codes < 0):
+        raise CorruptFileError("Unknown minutiae type '{}'".format(symbols[type_codes < 0][0]))
+    return type_codes
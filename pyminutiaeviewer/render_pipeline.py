@@ -0,0 +1,127 @@
+import time
+from typing import Any, Callable
+
+from PIL import Image
+
+# The minimum number of seconds between redraws of the window, about 60 frames per second.
+DEFAULT_FRAME_INTERVAL = 1 / 60
+
+
+class RenderStage(object):
+    def __init__(self, render: Callable):
+        """
+        A step of rendering that remembers its last output, and only renders again when its inputs change.
+        Images are compared by identity, as comparing their pixels would cost more than rendering them, while any other
+        input is compared by value.
+        :param render: The function that renders the stage's output from its inputs.
+        """
+        self._render = render
+        self._inputs = None
+        self._output = None
+
+    def __call__(self, *inputs, key: tuple = ()) -> Any:
+        """
+        Returns the output for inputs, rendering it only if the inputs differ from the previous call.
+        :param inputs: The inputs, passed on to the render function.
+        :param key: Anything else the output depends on that isn't passed to the render function, e.g. a version.
+        :return: The output.
+        """
+        inputs_and_key = inputs + (key,)
+        if self._inputs is None or not _same_inputs(self._inputs, inputs_and_key):
+            self._output = self._render(*inputs)
+            self._inputs = inputs_and_key
+        return self._output
+
+    def mark_current(self, *inputs, key: tuple = ()):
+        """
+        Records inputs as rendered without rendering them, for when the caller has updated the output itself.
+        :param inputs: The inputs.
+        :param key: Anything else the output depends on.
+        """
+        self._inputs = inputs + (key,)
+
+    def invalidate(self):
+        """
+        Forgets the last output, so the next call renders it again.
+        """
+        self._inputs = None
+        self._output = None
+
+
+def _same_inputs(a: tuple, b: tuple) -> bool:
+    return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+
+
+def _same(a, b) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, Image.Image) or isinstance(b, Image.Image):
+        return False
+    return type(a) is type(b) and a == b
+
+
+class RedrawScheduler(object):
+    def __init__(self, widget, redraw: Callable, draw_minutiae: Callable,
+                 frame_interval: float = DEFAULT_FRAME_INTERVAL):
+        """
+        Coalesces requests to redraw a window. Requests only mark what needs redrawing, and the redraw runs once the
+        event queue is idle, so a burst of resize or slider events causes a single redraw with the latest settings.
+        Redraws are at most one per frame interval.
+        :param widget: A Tk widget, used to schedule the redraw.
+        :param redraw: Redraws the fingerprint and the minutiae.
+        :param draw_minutiae: Redraws just the minutiae.
+        :param frame_interval: The minimum number of seconds between redraws.
+        """
+        self._widget = widget
+        self._redraw = redraw
+        self._draw_minutiae = draw_minutiae
+        self.frame_interval = frame_interval
+        self._fingerprint_dirty = False
+        self._minutiae_dirty = False
+        self._pending = None
+        self._last_redraw = 0.0
+
+    def request_redraw(self, _=None):
+        """
+        Marks the fingerprint and minutiae as needing to be redrawn. Can be bound to an event directly.
+        """
+        self._fingerprint_dirty = True
+        self._schedule()
+
+    def request_minutiae_redraw(self, _=None):
+        """
+        Marks the minutiae as needing to be redrawn. Can be bound to an event directly.
+        """
+        self._minutiae_dirty = True
+        self._schedule()
+
+    def discard(self, fingerprint: bool):
+        """
+        Forgets requests that a redraw has made stale, e.g. because the window was just redrawn directly.
+        :param fingerprint: True if the fingerprint and minutiae were redrawn, False if only the minutiae were.
+        """
+        if fingerprint:
+            self._fingerprint_dirty = False
+        self._minutiae_dirty = False
+        if not self._fingerprint_dirty and self._pending is not None:
+            self._widget.after_cancel(self._pending)
+            self._pending = None
+
+    def _schedule(self):
+        if self._pending is not None:
+            return
+        delay = self._last_redraw + self.frame_interval - time.perf_counter()
+        if delay > 0:
+            self._pending = self._widget.after(int(delay * 1000) + 1, self._run)
+        else:
+            self._pending = self._widget.after_idle(self._run)
+
+    def _run(self):
+        self._pending = None
+        self._last_redraw = time.perf_counter()
+        fingerprint_dirty, minutiae_dirty = self._fingerprint_dirty, self._minutiae_dirty
+        self._fingerprint_dirty = self._minutiae_dirty = False
+        if fingerprint_dirty:
+            self._redraw()
+        elif minutiae_dirty:
+            self._draw_minutiae()
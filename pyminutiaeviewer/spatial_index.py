@@ -0,0 +1,135 @@
+from typing import Optional
+
+import numpy as np
+
+# The width and height of a grid cell in image pixels.
+DEFAULT_CELL_SIZE = 32
+
+# Cell keys are row * _ROW_STRIDE + column, so the cells of a row are a contiguous range of keys.
+_ROW_STRIDE = 1 << 32
+
+
+class SpatialIndex(object):
+    def __init__(self, x=(), y=(), cell_size: int = DEFAULT_CELL_SIZE):
+        """
+        A uniform grid over points, for finding the points near a location without testing every point. Points are
+        identified by their index, e.g. in a MinutiaSet, and the index is updated in place as points are inserted and
+        removed. The grid is stored as the point indices sorted by cell, so a cell is found with a binary search.
+        :param x: The x co-ordinates of the points.
+        :param y: The y co-ordinates of the points.
+        :param cell_size: The width and height of a grid cell.
+        """
+        self.cell_size = cell_size
+        self._x = np.asarray(x, dtype=np.int64)
+        self._y = np.asarray(y, dtype=np.int64)
+        keys = self._keys(self._x, self._y)
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._order]
+
+    def insert(self, index: int, x: int, y: int):
+        """
+        Inserts a point, the indices of the points at or after it are shifted up by one.
+        :param index: The index of the new point.
+        :param x: The x co-ordinate of the point.
+        :param y: The y co-ordinate of the point.
+        """
+        key = self._keys(np.int64(x), np.int64(y))
+        self._order[self._order >= index] += 1
+        position = np.searchsorted(self._sorted_keys, key, side='right')
+        self._order = np.insert(self._order, position, index)
+        self._sorted_keys = np.insert(self._sorted_keys, position, key)
+        self._x = np.insert(self._x, index, x)
+        self._y = np.insert(self._y, index, y)
+
+    def remove(self, indices):
+        """
+        Removes points, the indices of the points after them are shifted down.
+        :param indices: The index, or an array of indices, of the points to remove.
+        """
+        indices = np.unique(np.asarray(indices, dtype=np.int64).ravel())
+        if len(indices) == 0:
+            return
+        kept = ~np.isin(self._order, indices)
+        self._order = self._order[kept]
+        self._sorted_keys = self._sorted_keys[kept]
+        # Every remaining index moves down by the number of removed indices before it:
+        self._order -= np.searchsorted(indices, self._order)
+        self._x = np.delete(self._x, indices)
+        self._y = np.delete(self._y, indices)
+
+    def move(self, index: int, x: int, y: int):
+        """
+        Moves a point to new co-ordinates.
+        :param index: The index of the point.
+        :param x: The new x co-ordinate.
+        :param y: The new y co-ordinate.
+        """
+        self.remove(index)
+        self.insert(index, x, y)
+
+    def in_box(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        Finds the points inside a rectangle, including its edges.
+        :param x0: The x co-ordinate of a corner of the rectangle.
+        :param y0: The y co-ordinate of a corner of the rectangle.
+        :param x1: The x co-ordinate of the opposite corner.
+        :param y1: The y co-ordinate of the opposite corner.
+        :return: The indices of the points, in ascending order.
+        """
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        candidates = self._candidates(x0, y0, x1, y1)
+        x, y = self._x[candidates], self._y[candidates]
+        return np.sort(candidates[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)])
+
+    def in_radius(self, x: float, y: float, radius: float) -> np.ndarray:
+        """
+        Finds the points within a distance of a location.
+        :param x: The x co-ordinate of the location.
+        :param y: The y co-ordinate of the location.
+        :param radius: The distance.
+        :return: The indices of the points, in ascending order.
+        """
+        candidates = self._candidates(x - radius, y - radius, x + radius, y + radius)
+        distances = np.hypot(self._x[candidates] - x, self._y[candidates] - y)
+        return np.sort(candidates[distances <= radius])
+
+    def nearest(self, x: float, y: float, max_distance: float) -> Optional[int]:
+        """
+        Finds the point closest to a location.
+        :param x: The x co-ordinate of the location.
+        :param y: The y co-ordinate of the location.
+        :param max_distance: Points further away than this are ignored.
+        :return: The index of the closest point, or None if there isn't a point within the maximum distance.
+        """
+        candidates = self._candidates(x - max_distance, y - max_distance, x + max_distance, y + max_distance)
+        if len(candidates) == 0:
+            return None
+        distances = np.hypot(self._x[candidates] - x, self._y[candidates] - y)
+        closest = int(np.argmin(distances))
+        if distances[closest] > max_distance:
+            return None
+        return int(candidates[closest])
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _keys(self, x, y):
+        return (y // self.cell_size) * _ROW_STRIDE + x // self.cell_size
+
+    def _candidates(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        Finds the points in every cell that overlaps a rectangle.
+        :return: The indices of the points.
+        """
+        column0, column1 = int(x0 // self.cell_size), int(x1 // self.cell_size)
+        row0, row1 = int(y0 // self.cell_size), int(y1 // self.cell_size)
+        if row1 - row0 >= len(self._order):
+            # Searching each row would take longer than testing every point.
+            return self._order
+        rows = np.arange(row0, row1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self._sorted_keys, rows * _ROW_STRIDE + column0, side='left')
+        ends = np.searchsorted(self._sorted_keys, rows * _ROW_STRIDE + column1, side='right')
+        if len(rows) == 1:
+            return self._order[starts[0]:ends[0]]
+        return np.concatenate([self._order[start:end] for start, end in zip(starts, ends)])
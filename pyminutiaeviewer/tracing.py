@@ -0,0 +1,293 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where the peak resident memory isn't reported.
+    resource = None
+
+# A timed stage of work. The start is in seconds since the epoch, so spans from different processes can be lined up,
+# and the duration is in seconds. The peak memory is the most memory allocated by Python and NumPy at once during the
+# span, across the whole process, and the peak RSS is the most memory the process has held since it started, both in
+# bytes, or None if they aren't tracked.
+Span = NamedTuple('Span', [('name', str),
+                           ('start', float),
+                           ('duration', float),
+                           ('peak_memory', Optional[int]),
+                           ('peak_rss', Optional[int]),
+                           ('process', int),
+                           ('thread', str),
+                           ('attributes', dict)])
+
+
+class Tracer(object):
+    def __init__(self):
+        """
+        Times spans of work and passes them to listeners. It is off by default, and while it is off a span costs a
+        single check, so spans can be left around hot code.
+        """
+        self.enabled = False
+        self.trace_memory = False
+        self._listeners = []  # type: List[Callable[[Span], None]]
+        self._open = []  # type: List[_ActiveSpan]
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+
+    def enable(self, trace_memory: bool = True):
+        """
+        Starts timing spans.
+        :param trace_memory: If True the peak memory of each span is tracked too, which slows allocation down.
+        """
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.trace_memory = trace_memory
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stops timing spans, spans that are open are still finished.
+        """
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.trace_memory = False
+
+    def add_listener(self, listener: Callable[[Span], None]):
+        """
+        Adds a function that is called with every span as it finishes, on the thread that ran the span.
+        :param listener: The function.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Span], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def span(self, name: str, **attributes):
+        """
+        Times the work done in a with block, e.g. `with tracer.span('image.decode', path=path):`.
+        :param name: The name of the span, dotted from the general to the specific.
+        :param attributes: Details of the work, they must be JSON serialisable.
+        :return: The context manager of the span.
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _ActiveSpan(self, name, attributes)
+
+    def _opened(self, span: '_ActiveSpan'):
+        if self.trace_memory:
+            with self._lock:
+                span.peak_memory = self._memory_mark()
+                self._open.append(span)
+
+    def _closed(self, span: '_ActiveSpan', duration: float):
+        peak_memory = None
+        with self._lock:
+            if span in self._open:
+                self._memory_mark()
+                self._open.remove(span)
+                peak_memory = span.peak_memory
+            listeners = list(self._listeners)
+        finished = Span(span.name, span.start, duration, peak_memory, peak_rss(), os.getpid(),
+                        threading.current_thread().name, span.attributes)
+        for listener in listeners:
+            listener(finished)
+
+    def _memory_mark(self) -> int:
+        """
+        Folds the peak since the last mark in to every open span, and starts measuring a new peak. The peak is shared
+        by the whole process, so this is how spans that nest or run on other threads each see their own peak.
+        :return: The memory allocated now.
+        """
+        if not tracemalloc.is_tracing():
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        for span in self._open:
+            span.peak_memory = max(span.peak_memory, peak)
+        # Before Python 3.9 the peak can't be reset, so spans see the peak since tracing started.
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        return current
+
+
+class _ActiveSpan(object):
+    __slots__ = ('tracer', 'name', 'attributes', 'start', 'peak_memory', '_started')
+
+    def __init__(self, tracer: Tracer, name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.peak_memory = 0
+        self._started = 0.0
+
+    def __enter__(self):
+        self.tracer._opened(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *_):
+        duration = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        self.tracer._closed(self, duration)
+        return False
+
+
+class _NoSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class TraceFileWriter(object):
+    def __init__(self, path: Path):
+        """
+        Appends spans to a file as JSON lines. Each span is written with a single os.write to an unbuffered file
+        opened for appending, so the worker processes of a batch can share one trace file without splitting lines.
+        :param path: The path of the trace file.
+        """
+        self.path = Path(path)
+        self.process = os.getpid()
+        self._file = self.path.open('ab', buffering=0)
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        record = {'name': span.name, 'start': span.start, 'duration': span.duration,
+                  'peak_memory': span.peak_memory, 'peak_rss': span.peak_rss,
+                  'process': span.process, 'thread': span.thread}
+        if span.attributes:
+            record['attributes'] = span.attributes
+        line = (json.dumps(record, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+        with self._lock:
+            os.write(self._file.fileno(), line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class LatestSpans(object):
+    def __init__(self):
+        """
+        Keeps the latest span of each name, e.g. for a status bar to show where the time of the last redraw went.
+        """
+        self._spans = {}  # type: Dict[str, Span]
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        with self._lock:
+            self._spans[span.name] = span
+
+    def spans(self) -> List[Span]:
+        """
+        :return: The latest span of each name, in the order they finished.
+        """
+        with self._lock:
+            return sorted(self._spans.values(), key=lambda span: span.start + span.duration)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Finds the most memory this process has held in RAM since it started.
+    :return: The peak resident set size in bytes, or None if the platform doesn't report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes:
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# The tracer the application's spans are timed by.
+tracer = Tracer()
+_trace_file = None  # type: Optional[TraceFileWriter]
+
+
+def span(name: str, **attributes):
+    """
+    Times the work done in a with block with the application's tracer, see Tracer.span.
+    """
+    return tracer.span(name, **attributes)
+
+
+def traced(name: str):
+    """
+    Times every call of a function with the application's tracer, as a span of its own.
+    :param name: The name of the span.
+    :return: The decorator.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with tracer.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def trace_to_file(path: Path, trace_memory: bool = True):
+    """
+    Enables the application's tracer and appends its spans to a JSON lines file. Also used to initialise the worker
+    processes of a batch, which share the file.
+    :param path: The path of the trace file.
+    :param trace_memory: If True the peak memory of each span is tracked too.
+    """
+    global _trace_file
+    path = Path(path)
+    if _trace_file is not None:
+        if _trace_file.process == os.getpid() and _trace_file.path == path:
+            return
+        # A forked worker inherits its parent's writer, and replaces it so that its own spans are written once:
+        tracer.remove_listener(_trace_file)
+    _trace_file = TraceFileWriter(path)
+    tracer.add_listener(_trace_file)
+    tracer.enable(trace_memory)
+
+
+def stop_tracing_to_file():
+    """
+    Stops writing spans to the trace file, and disables the application's tracer.
+    """
+    global _trace_file
+    if _trace_file is not None:
+        tracer.remove_listener(_trace_file)
+        _trace_file.close()
+        _trace_file = None
+    tracer.disable()
+
+
+def pool_arguments() -> dict:
+    """
+    The arguments for a multiprocessing Pool whose workers should trace to the same file as this process.
+    :return: The initializer arguments, or none if this process isn't tracing to a file.
+    """
+    if _trace_file is None:
+        return {}
+    return {'initializer': trace_to_file, 'initargs': (_trace_file.path, tracer.trace_memory)}
@@ -0,0 +1,124 @@
+import math
+from typing import NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageChops
+
+from pyminutiaeviewer import tracing
+from pyminutiaeviewer.image_pyramid import ImagePyramid
+
+# The limits of zooming, as multiples of the zoom that fits the whole image to the canvas and as displayed pixels per
+# image pixel.
+MIN_ZOOM_OF_FIT = 0.5
+MAX_ZOOM = 32.0
+
+# The part of an image shown on a canvas. The zoom is displayed pixels per image pixel, and x and y are the image
+# co-ordinates of the canvas' top left corner.
+View = NamedTuple('View', [('zoom', float),
+                           ('x', float),
+                           ('y', float),
+                           ('width', int),
+                           ('height', int)])
+
+
+def compact_image(image: Image.Image) -> Image.Image:
+    """
+    Converts a fingerprint to the smallest mode it can be shown in without losing detail, a byte per pixel for grey
+    images, including RGB images whose channels are all equal, and three for colour images. Any transparency is
+    dropped, as the fingerprint's opacity is set when it is displayed.
+    :param image: The image, which is loaded if it was opened lazily.
+    :return: The image, in 'L' or 'RGB' mode.
+    """
+    if image.mode == 'L':
+        image.load()
+        return image
+    if image.mode in ('1', 'LA', 'La', 'I', 'I;16', 'F'):
+        return image.convert('L')
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    # Compare a channel at a time, so no more than a few single channel copies are held at once:
+    red = image.getchannel('R')
+    if all(ImageChops.difference(red, image.getchannel(band)).getbbox() is None for band in ('G', 'B')):
+        return red
+    return image if image.mode == 'RGB' else image.convert('RGB')
+
+
+def fit_view(image_size: Tuple[int, int], canvas_size: Tuple[int, int]) -> View:
+    """
+    Creates a view of the whole image, scaled to fit the canvas while maintaining its aspect ratio.
+    :param image_size: The width and height of the image.
+    :param canvas_size: The width and height of the canvas.
+    :return: The view.
+    """
+    zoom = min(canvas_size[0] / image_size[0], canvas_size[1] / image_size[1])
+    return View(zoom, 0.0, 0.0, canvas_size[0], canvas_size[1])
+
+
+def zoomed_view(view: View, factor: float, x: float, y: float, fit_zoom: float) -> View:
+    """
+    Zooms a view about a point on the canvas, the image under the point stays where it is.
+    :param view: The view.
+    :param factor: The factor to multiply the zoom by.
+    :param x: The x co-ordinate of the point on the canvas.
+    :param y: The y co-ordinate of the point on the canvas.
+    :param fit_zoom: The zoom that fits the whole image to the canvas, used to limit zooming out.
+    :return: The zoomed view.
+    """
+    zoom = min(max(view.zoom * factor, fit_zoom * MIN_ZOOM_OF_FIT), max(MAX_ZOOM, fit_zoom))
+    image_x, image_y = view.x + x / view.zoom, view.y + y / view.zoom
+    return view._replace(zoom=zoom, x=image_x - x / zoom, y=image_y - y / zoom)
+
+
+def panned_view(view: View, dx: float, dy: float) -> View:
+    """
+    Moves a view with the mouse, e.g. dragging right shows more of the left of the image.
+    :param view: The view.
+    :param dx: The distance moved across the canvas.
+    :param dy: The distance moved down the canvas.
+    :return: The moved view.
+    """
+    return view._replace(x=view.x - dx / view.zoom, y=view.y - dy / view.zoom)
+
+
+def visible_box(view: View, image_size: Tuple[int, int]) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Finds the part of an image that is visible on the canvas.
+    :param view: The view.
+    :param image_size: The width and height of the image.
+    :return: The left, top, right and bottom of the visible part in image co-ordinates, or None if none is visible.
+    """
+    x0, y0 = max(0.0, view.x), max(0.0, view.y)
+    x1 = min(float(image_size[0]), view.x + view.width / view.zoom)
+    y1 = min(float(image_size[1]), view.y + view.height / view.zoom)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
+def render_view(pyramid: ImagePyramid, view: View) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Renders the visible part of an image from the level of its pyramid closest to the zoom, only touching the tiles
+    that are visible.
+    :param pyramid: The pyramid of the image.
+    :param view: The view.
+    :return: The rendered image, and the canvas co-ordinates of its top left corner.
+    """
+    box = visible_box(view, pyramid.image.size)
+    if box is None:
+        return Image.new(pyramid.image.mode, (1, 1)), (-1, -1)
+
+    level = pyramid.level_for_zoom(view.zoom)
+    scale = 1 << level
+    level_width, level_height = pyramid.level_size(level)
+    level_box = (int(math.floor(box[0] / scale)), int(math.floor(box[1] / scale)),
+                 min(int(math.ceil(box[2] / scale)), level_width), min(int(math.ceil(box[3] / scale)), level_height))
+    with tracing.span('image.tiles', level=level):
+        region = pyramid.render(level_box, level)
+
+    left, top = (level_box[0] * scale - view.x) * view.zoom, (level_box[1] * scale - view.y) * view.zoom
+    size = (max(1, round(region.width * scale * view.zoom)), max(1, round(region.height * scale * view.zoom)))
+    # Magnified pixels are kept sharp for detail work:
+    resample = Image.NEAREST if view.zoom > 1 else Image.LANCZOS
+    with tracing.span('image.scale', width=size[0], height=size[1]):
+        region = region.resize(size, resample)
+    return region, (round(left), round(top))
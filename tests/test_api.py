@@ -0,0 +1,62 @@
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import pyminutiaeviewer as pmv
+from pyminutiaeviewer.minutia_set import MinutiaSet
+
+MINUTIAE = MinutiaSet(x=[10, 20, 30, 40], y=[10, 20, 30, 40], angle=[0.0, 90.0, 180.0, 270.0],
+                      minutia_type=[0, 1, 0, 1], quality=[0.0, 0.25, 0.5, 1.0])
+FINGERPRINT_IMAGE = Path(__file__).parent / 'fingerprint.png'
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+# The modules that need a display, or aren't installed on servers.
+GUI_MODULES = ('tkinter', 'ttkthemes', 'PIL.ImageTk')
+
+# Uses the whole headless API, along with the modules of the command line tools, then lists the GUI modules loaded.
+HEADLESS_SCRIPT = '''
+import json, os, sys, tempfile
+import pyminutiaeviewer as pmv
+from pyminutiaeviewer import batch, corpus, matcher, mindtct, tracing
+minutiae = pmv.read_minutiae(sys.argv[1])
+with tempfile.TemporaryDirectory() as directory:
+    pmv.write_minutiae(os.path.join(directory, 'fingerprint.min'), minutiae)
+pmv.draw_minutiae(sys.argv[2], pmv.filter_minutiae(minutiae, min_quality=0.5))
+for name in pmv.__all__:
+    getattr(pmv, name)
+print(json.dumps([name for name in {} if name in sys.modules]))
+'''.format(GUI_MODULES)
+
+
+class FilterMinutiaeTest(unittest.TestCase):
+    def test_no_filters(self):
+        self.assertEqual(pmv.filter_minutiae(MINUTIAE).quality.tolist(), [0.0, 0.25, 0.5, 1.0])
+
+    def test_min_quality_is_exclusive(self):
+        self.assertEqual(pmv.filter_minutiae(MINUTIAE, min_quality=0.25).quality.tolist(), [0.5, 1.0])
+        self.assertEqual(pmv.filter_minutiae(MINUTIAE, min_quality=0.0).quality.tolist(), [0.25, 0.5, 1.0])
+
+    def test_types_and_region(self):
+        bifurcations = pmv.filter_minutiae(MINUTIAE, minutia_types=[pmv.MinutiaType.BIFURCATION])
+        self.assertEqual(bifurcations.x.tolist(), [20, 40])
+        self.assertEqual(pmv.filter_minutiae(MINUTIAE, region=(15, 15, 35, 35)).x.tolist(), [20, 30])
+        self.assertEqual(pmv.filter_minutiae(MINUTIAE, 0.25, [pmv.MinutiaType.RIDGE_ENDING], (0, 0, 50, 50)).x.tolist(),
+                         [30])
+
+
+class HeadlessImportTest(unittest.TestCase):
+    def test_no_gui_modules_are_imported(self):
+        # A fresh interpreter, as this one may have imported the GUI for other tests:
+        output = subprocess.check_output([sys.executable, '-c', HEADLESS_SCRIPT, str(FINGERPRINT_MINUTIAE),
+                                          str(FINGERPRINT_IMAGE)], cwd=str(Path(__file__).parent.parent))
+        self.assertEqual(json.loads(output.decode()), [])
+
+    def test_importing_imports_nothing_else(self):
+        script = 'import sys, pyminutiaeviewer; print(sorted(m for m in sys.modules if m.startswith("pyminutiae")))'
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=str(Path(__file__).parent.parent))
+        self.assertEqual(output.decode().strip(), "['pyminutiaeviewer']")
+
+
+if __name__ == '__main__':
+    unittest.main()
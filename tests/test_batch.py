@@ -0,0 +1,228 @@
+import itertools
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from pyminutiaeviewer.batch import ConvertJob, DrawJob, convert_minutiae_batch, draw_minutiae_batch, find_images, \
+    find_minutiae_file
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat, FORMAT_FILE_EXTENSIONS
+
+FORMATS = (MinutiaeFileFormat.NBIST, MinutiaeFileFormat.SIMPLE, MinutiaeFileFormat.XYT, MinutiaeFileFormat.BINARY,
+           MinutiaeFileFormat.ISO_19794_2, MinutiaeFileFormat.ANSI_378)
+# The formats that don't store the size of the image.
+UNSIZED_FORMATS = (MinutiaeFileFormat.SIMPLE, MinutiaeFileFormat.XYT)
+# The most each format can change an angle by, in degrees. NBIST stores directions in 11.25 degree steps, xyt whole
+# degrees and the templates 360/256 and 2 degree steps.
+ANGLE_TOLERANCE = {MinutiaeFileFormat.NBIST: 11.25 / 2, MinutiaeFileFormat.SIMPLE: 0, MinutiaeFileFormat.XYT: 1,
+                   MinutiaeFileFormat.BINARY: 0, MinutiaeFileFormat.ISO_19794_2: 360 / 512,
+                   MinutiaeFileFormat.ANSI_378: 1}
+IMAGE_SIZE = (329, 450)
+FINGERPRINT_IMAGE = Path(__file__).parent / 'fingerprint.png'
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+SCRIPT = Path(__file__).parent.parent / 'py-minutiae-viewer.py'
+
+
+def angle_error(a: np.ndarray, b: np.ndarray, period: float) -> np.ndarray:
+    difference = np.abs(a - b) % period
+    return np.minimum(difference, period - difference)
+
+
+class ConvertMinutiaeTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temporary_directory.name)
+        # Qualities in hundredths, which every format stores exactly:
+        self.minutiae = MinutiaSet(x=[22, 40, 300, 0], y=[387, 345, 12, 449], angle=[67.5, 200.25, 359.0, 0.0],
+                                   minutia_type=[0, 1, 1, 0], quality=[0.12, 0.87, 1.0, 0.0], image_size=IMAGE_SIZE)
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def write(self, name: str, file_format: MinutiaeFileFormat) -> Path:
+        path = self.directory / (name + FORMAT_FILE_EXTENSIONS[file_format])
+        MinutiaeEncoder(file_format).write(str(path), self.minutiae, None)
+        return path
+
+    def convert(self, path: Path, output_format: MinutiaeFileFormat, image_size=None):
+        output_path = self.directory / 'out' / (path.stem + FORMAT_FILE_EXTENSIONS[output_format])
+        result, = convert_minutiae_batch([ConvertJob(path, output_path)], output_format, processes=1,
+                                         image_size=image_size)
+        return result
+
+    def test_every_format_pair(self):
+        for input_format, output_format in itertools.product(FORMATS, FORMATS):
+            with self.subTest(input_format=input_format, output_format=output_format):
+                path = self.write('{}-{}'.format(input_format.value, output_format.value), input_format)
+                result = self.convert(path, output_format, IMAGE_SIZE)
+                self.assertIsNone(result.error)
+                converted = MinutiaeReader(output_format).read(str(result.output_path))
+
+                np.testing.assert_array_equal(converted.x, self.minutiae.x)
+                np.testing.assert_array_equal(converted.y, self.minutiae.y)
+                np.testing.assert_allclose(converted.quality, self.minutiae.quality, atol=1e-9)
+                # xyt files store ridge directions from 0 to 180 degrees, and only ridge endings:
+                lossy = MinutiaeFileFormat.XYT in (input_format, output_format)
+                tolerance = ANGLE_TOLERANCE[input_format] + ANGLE_TOLERANCE[output_format] + 1e-9
+                self.assertTrue(np.all(angle_error(converted.angle, self.minutiae.angle, 180 if lossy else 360)
+                                       <= tolerance))
+                if not lossy:
+                    np.testing.assert_array_equal(converted.minutia_type, self.minutiae.minutia_type)
+                if output_format not in UNSIZED_FORMATS:
+                    self.assertEqual(converted.image_size, IMAGE_SIZE)
+
+    def test_xyt_qualities(self):
+        path = self.directory / 'fingerprint.xyt'
+        path.write_text('22 387 67 12\n40 345 20 100\n')
+        result = self.convert(path, MinutiaeFileFormat.XYT)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.output_path.read_text(), '22 387 67 12\n40 345 20 100')
+
+    def test_missing_image_size(self):
+        for input_format in UNSIZED_FORMATS:
+            with self.subTest(input_format=input_format):
+                result = self.convert(self.write('unsized', input_format), MinutiaeFileFormat.NBIST)
+                self.assertIsNone(result.output_path)
+                self.assertIn('size of its image', result.error)
+
+    def test_template_without_image_size(self):
+        self.minutiae.image_size = None
+        result = self.convert(self.write('unsized', MinutiaeFileFormat.ISO_19794_2), MinutiaeFileFormat.NBIST)
+        self.assertIn('size of its image', result.error)
+        result = self.convert(self.write('unsized', MinutiaeFileFormat.ISO_19794_2), MinutiaeFileFormat.NBIST,
+                              IMAGE_SIZE)
+        self.assertIsNone(result.error)
+        self.assertEqual(MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(result.output_path)).image_size,
+                         IMAGE_SIZE)
+
+
+class DrawMinutiaeTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temporary_directory.name)
+        self.images = self.directory / 'images'
+        self.images.mkdir()
+        self.output = self.directory / 'output'
+        self.minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(FINGERPRINT_MINUTIAE))
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def add_image(self, name: str, directory: Path = None) -> Path:
+        path = (directory or self.images) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(str(FINGERPRINT_IMAGE), str(path))
+        return path
+
+    def add_minutiae(self, name: str, directory: Path = None) -> Path:
+        path = (directory or self.images) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_format = MinutiaeFileFormat.BINARY if path.suffix == '.mnb' else MinutiaeFileFormat.NBIST
+        MinutiaeEncoder(file_format).write(str(path), self.minutiae, None)
+        return path
+
+    def draw_command(self, *arguments: str) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, str(SCRIPT), '-j', '1', '-d'] + list(arguments),
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+    def test_pairing_images_with_minutiae(self):
+        self.add_image('a.png')
+        self.add_image('nested/b.jpg')
+        self.add_image('c.png')
+        self.add_minutiae('a.min')
+        self.add_minutiae('nested/b.mnb')
+        minutiae_dir = self.directory / 'minutiae'
+        self.add_minutiae('c.min', minutiae_dir)
+
+        found = {relative_path: find_minutiae_file(image_path) for image_path, relative_path in find_images(
+            [str(self.images)])}
+        self.assertEqual(found, {Path('a.png'): self.images / 'a.min',
+                                 Path('c.png'): None,
+                                 Path('nested/b.jpg'): self.images / 'nested' / 'b.mnb'})
+        self.assertEqual(find_minutiae_file(self.images / 'c.png', minutiae_dir), minutiae_dir / 'c.min')
+        self.assertIsNone(find_minutiae_file(self.images / 'a.png', minutiae_dir))
+
+    def test_errors_on_single_files(self):
+        good = DrawJob(self.add_image('good.png'), self.add_minutiae('good.min'), self.output / 'good.jpg', None)
+        corrupt_path = self.images / 'corrupt.min'
+        corrupt_path.write_text('not a minutiae file\n')
+        corrupt = DrawJob(self.add_image('corrupt.png'), corrupt_path, self.output / 'corrupt.png', None)
+        missing = DrawJob(self.images / 'missing.png', good.minutiae_path, self.output / 'missing.png', 4)
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                results = {result.image_path.stem: result
+                           for result in draw_minutiae_batch([corrupt, good, missing], processes)}
+                self.assertIsNone(results['good'].error)
+                self.assertEqual(results['good'].output_path, self.output / 'good.jpg')
+                with Image.open(str(self.output / 'good.jpg')) as image:
+                    self.assertEqual((image.mode, image.size), ('RGB', IMAGE_SIZE))
+                for name in ('corrupt', 'missing'):
+                    self.assertIsNone(results[name].output_path)
+                    self.assertIsNotNone(results[name].error)
+                    self.assertFalse((self.output / (name + '.png')).exists())
+                self.assertIn('FileNotFoundError', results['missing'].error)
+
+    def test_command(self):
+        self.add_image('a.png')
+        self.add_image('nested/b.png')
+        self.add_image('no_minutiae.png')
+        self.add_minutiae('a.min')
+        self.add_minutiae('nested/b.min')
+        result = self.draw_command(str(self.images), '-o', str(self.output))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('Drew 2 image(s), 0 failed.', result.stdout)
+        self.assertIn("No minutiae file found for '{}'".format(self.images / 'no_minutiae.png'), result.stderr)
+        self.assertEqual(sorted(path.relative_to(self.output) for path in self.output.rglob('*.png')),
+                         [Path('a.png'), Path('nested/b.png')])
+
+    def test_command_single_image(self):
+        image_path = self.add_image('a.png')
+        minutiae_path = self.add_minutiae('other.min', self.directory)
+        output_path = self.directory / 'drawn.png'
+        result = self.draw_command(str(image_path), str(minutiae_path), '-o', str(output_path))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertTrue(output_path.is_file())
+
+    def test_command_output_collision(self):
+        # Both images are drawn to x.png:
+        self.add_image('x.png')
+        self.add_image('x.jpg')
+        self.add_minutiae('x.min')
+        result = self.draw_command(str(self.images), '-o', str(self.output))
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('is also drawn to', result.stderr)
+        self.assertIn('Drew 1 image(s), 1 failed.', result.stdout)
+        self.assertEqual(list(self.output.iterdir()), [self.output / 'x.png'])
+
+    def test_command_several_images_to_one_file(self):
+        self.add_image('a.png')
+        self.add_image('b.png')
+        self.add_minutiae('a.min')
+        self.add_minutiae('b.min')
+        output_path = self.directory / 'drawn.png'
+        result = self.draw_command(str(self.images), '-o', str(output_path))
+        self.assertEqual(result.returncode, 2)
+        self.assertIn('the output must be a directory', result.stderr)
+        self.assertFalse(output_path.exists())
+
+    def test_command_error_on_a_single_file(self):
+        self.add_image('a.png')
+        self.add_image('b.png')
+        self.add_minutiae('a.min')
+        (self.images / 'b.min').write_text('not a minutiae file\n')
+        result = self.draw_command(str(self.images), '-o', str(self.output))
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Failed to draw '{}'".format(self.images / 'b.png'), result.stderr)
+        self.assertIn('Drew 1 image(s), 1 failed.', result.stdout)
+        self.assertEqual(list(self.output.iterdir()), [self.output / 'a.png'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import io
+import unittest
+from pathlib import Path
+
+from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.minutia import MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet, MINUTIA_TYPE_CODES
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
+
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+TEXT_FORMATS = (MinutiaeFileFormat.NBIST, MinutiaeFileFormat.SIMPLE, MinutiaeFileFormat.XYT)
+
+
+def rows(minutiae) -> list:
+    return [(m.x, m.y, m.angle, m.minutia_type, m.quality) for m in minutiae]
+
+
+class BulkParserTest(unittest.TestCase):
+    """
+    The bulk parsers read whole files in to arrays, and must agree with the line by line parsers.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.text = FINGERPRINT_MINUTIAE.read_text()
+        cls.minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(FINGERPRINT_MINUTIAE))
+
+    def test_fingerprint(self):
+        self.assertEqual(len(self.minutiae), 41)
+        self.assertEqual(self.minutiae.image_size, (329, 450))
+        self.assertEqual(rows(self.minutiae[:2]), [(22, 387, 67.5, MinutiaType.RIDGE_ENDING, 0.126),
+                                                   (40, 345, 56.25, MinutiaType.RIDGE_ENDING, 0.869)])
+        self.assertEqual(int((self.minutiae.minutia_type == MINUTIA_TYPE_CODES[MinutiaType.BIFURCATION]).sum()), 12)
+
+    def test_nbist_matches_line_parser(self):
+        reader = MinutiaeReader(MinutiaeFileFormat.NBIST)
+        self.assertEqual(rows(self.minutiae), rows(reader.iter_read(io.StringIO(self.text))))
+
+    def test_text_formats_match_line_parser(self):
+        for file_format in TEXT_FORMATS:
+            with self.subTest(file_format=file_format):
+                reader = MinutiaeReader(file_format)
+                text = MinutiaeEncoder(file_format).encode(self.minutiae, None)
+                self.assertEqual(rows(reader.read(io.StringIO(text))), rows(reader.iter_read(io.StringIO(text))))
+
+    def test_round_trip(self):
+        for file_format in (MinutiaeFileFormat.NBIST, MinutiaeFileFormat.SIMPLE):
+            with self.subTest(file_format=file_format):
+                text = MinutiaeEncoder(file_format).encode(self.minutiae, None)
+                self.assertEqual(rows(MinutiaeReader(file_format).read(io.StringIO(text))), rows(self.minutiae))
+
+    def test_empty_files(self):
+        for file_format in (MinutiaeFileFormat.SIMPLE, MinutiaeFileFormat.XYT):
+            with self.subTest(file_format=file_format):
+                self.assertEqual(len(MinutiaeReader(file_format).read(io.StringIO(''))), 0)
+        text = MinutiaeEncoder(MinutiaeFileFormat.NBIST).encode(MinutiaSet(image_size=(329, 450)), None)
+        self.assertEqual(len(MinutiaeReader(MinutiaeFileFormat.NBIST).read(io.StringIO(text))), 0)
+
+    def test_malformed_line(self):
+        lines = self.text.splitlines()
+        lines[10] = lines[10].replace('RIG', 'XXX').replace('BIF', 'XXX')
+        with self.assertRaises(CorruptFileError):
+            MinutiaeReader(MinutiaeFileFormat.NBIST).read(io.StringIO('\n'.join(lines)))
+        with self.assertRaises(CorruptFileError):
+            MinutiaeReader(MinutiaeFileFormat.XYT).read(io.StringIO('1 2 3 4\n1 2 three 4\n'))
+
+    def test_non_integer_co_ordinates(self):
+        lines = self.text.splitlines()
+        for replacement in ('22.5,  387', '22,  387.0', '22,  1e3', '22  387', '22, 387, 1'):
+            with self.subTest(replacement=replacement):
+                text = '\n'.join(lines[:4] + [lines[4].replace('22,  387', replacement)] + lines[5:])
+                reader = MinutiaeReader(MinutiaeFileFormat.NBIST)
+                with self.assertRaises(CorruptFileError):
+                    list(reader.iter_read(io.StringIO(text)))
+                with self.assertRaises(CorruptFileError):
+                    reader.read(io.StringIO(text))
+        # A missing comma on one line can't be made up for by an extra one on another:
+        text = '\n'.join(lines[:4] + [lines[4].replace('22,  387', '22  387'),
+                                       lines[5].replace('40,  345', '40, 345, 1')] + lines[6:])
+        with self.assertRaises(CorruptFileError):
+            MinutiaeReader(MinutiaeFileFormat.NBIST).read(io.StringIO(text))
+
+        for file_format, text in ((MinutiaeFileFormat.SIMPLE, '22 387.5 67.5 END 0.5\n'),
+                                  (MinutiaeFileFormat.XYT, '22.5 387 67 12\n')):
+            with self.subTest(file_format=file_format), self.assertRaises(CorruptFileError):
+                MinutiaeReader(file_format).read(io.StringIO(text))
+
+    def test_wrong_count(self):
+        text = self.text.replace('41 Minutiae Detected', '42 Minutiae Detected')
+        with self.assertRaises(CorruptFileError):
+            MinutiaeReader(MinutiaeFileFormat.NBIST).read(io.StringIO(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
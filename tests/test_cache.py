@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from pyminutiaeviewer.mindtct.cache import ExtractionCache
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
+
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+
+
+class ExtractionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ExtractionCache(Path(self.directory.name))
+        self.image = Image.new('L', (329, 450))
+        self.key = self.cache.key(self.image, ())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get(self.key))
+        self.cache.put_file(self.key, FINGERPRINT_MINUTIAE)
+        self.assertEqual(len(self.cache.get(self.key)), 41)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_replacing_an_entry_keeps_the_size(self):
+        self.cache.put_file(self.key, FINGERPRINT_MINUTIAE)
+        self.cache.put_file(self.key, FINGERPRINT_MINUTIAE)
+        self.assertEqual(self.cache.size(), FINGERPRINT_MINUTIAE.stat().st_size)
+
+        minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(FINGERPRINT_MINUTIAE))[:5]
+        self.cache.put(self.key, minutiae, self.image)
+        self.assertEqual(self.cache.size(), self.cache.get_file(self.key).stat().st_size)
+        self.assertEqual(self.cache.size(), ExtractionCache(Path(self.directory.name)).size())
+
+    def test_eviction(self):
+        self.cache.max_size = FINGERPRINT_MINUTIAE.stat().st_size
+        keys = [self.cache.key(self.image, (setting,)) for setting in range(3)]
+        for key in keys:
+            self.cache.put_file(key, FINGERPRINT_MINUTIAE)
+        self.assertLessEqual(self.cache.size(), self.cache.max_size)
+        self.assertIsNotNone(self.cache.get_file(keys[-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from pyminutiaeviewer.corpus import ScanJob, QUALITY_BINS, minutiae_statistics, scan_corpus
+from pyminutiaeviewer.minutia_set import MinutiaSet
+
+
+class CorpusTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def scan(self, name: str, text: str):
+        path = Path(self.directory.name) / name
+        path.write_text(text)
+        statistics, = scan_corpus([ScanJob(path, None)], processes=1)
+        return statistics
+
+    def test_statistics(self):
+        minutiae = MinutiaSet(x=[0, 10, 400], y=[0, 20, 30], angle=[5.0, 355.0, 360.0], minutia_type=[0, 1, 1],
+                              quality=[0.0, 1.0, 1.5])
+        statistics = minutiae_statistics(minutiae, (329, 450))
+        self.assertEqual(statistics['count'], 3)
+        self.assertEqual(statistics['type_counts'].tolist(), [1, 2])
+        self.assertEqual(statistics['quality_histogram'][0], 1)
+        self.assertEqual(statistics['quality_histogram'][QUALITY_BINS - 1], 1)
+        self.assertEqual(statistics['quality_out_of_range'], 1)
+        self.assertEqual(statistics['angle_histogram'][0], 2)
+        self.assertEqual(statistics['angle_histogram'][-1], 1)
+        self.assertEqual(statistics['out_of_bounds'], 1)
+
+    def test_xyt_quality_is_normalised(self):
+        statistics = self.scan('fingerprint.xyt', '10 20 30 5\n40 50 60 55\n70 80 90 100\n')
+        self.assertIsNone(statistics.error)
+        self.assertEqual(statistics.file_format, 'XYT')
+        self.assertEqual(statistics.quality_out_of_range, 0)
+        self.assertEqual(statistics.quality_histogram.tolist(), [1, 0, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertAlmostEqual(statistics.mean_quality, 0.5333333)
+
+    def test_simple_quality_is_not_scaled(self):
+        statistics = self.scan('fingerprint.sim', '10 20 30 END 0.55\n')
+        self.assertIsNone(statistics.error)
+        self.assertEqual(statistics.quality_histogram.tolist(), [0, 0, 0, 0, 0, 1, 0, 0, 0, 0])
+
+    def test_corrupt_file(self):
+        statistics = self.scan('fingerprint.sim', '10 20 thirty END 0.5\n')
+        self.assertIsNotNone(statistics.error)
+        self.assertEqual(statistics.count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pyminutiaeviewer.edit_log import EditLog, InsertMinutiae, RemoveMinutiae, MoveMinutia
+from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet
+
+A = Minutia(10, 20, 30.0, MinutiaType.RIDGE_ENDING, 0.5)
+B = Minutia(40, 50, 60.0, MinutiaType.BIFURCATION, 0.75)
+C = Minutia(70, 80, 90.0, MinutiaType.RIDGE_ENDING, 0.25)
+
+
+def rows(minutiae) -> list:
+    return [(m.x, m.y, m.angle, m.minutia_type, m.quality) for m in minutiae]
+
+
+class EditLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal_path = Path(self.directory.name) / 'fingerprint.png.journal'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def recovered(self) -> MinutiaSet:
+        log = EditLog(self.journal_path)
+        try:
+            return log.recover()
+        finally:
+            log.close()
+
+    def test_do_undo_redo(self):
+        minutiae = MinutiaSet.from_minutiae([A])
+        log = EditLog()
+        log.do(minutiae, InsertMinutiae((1,), (B,)))
+        log.do(minutiae, MoveMinutia(0, A, C))
+        self.assertEqual(rows(minutiae), rows([C, B]))
+
+        log.undo(minutiae)
+        self.assertEqual(rows(minutiae), rows([A, B]))
+        log.undo(minutiae)
+        self.assertEqual(rows(minutiae), rows([A]))
+        self.assertIsNone(log.undo(minutiae))
+
+        log.redo(minutiae)
+        self.assertEqual(rows(minutiae), rows([A, B]))
+        log.do(minutiae, RemoveMinutiae((0,), (A,)))
+        self.assertEqual(rows(minutiae), rows([B]))
+        self.assertFalse(log.can_redo())
+
+    def test_recover(self):
+        minutiae = MinutiaSet.from_minutiae([A])
+        log = EditLog(self.journal_path)
+        log.do(minutiae, InsertMinutiae((1,), (B,)))
+        log.do(minutiae, InsertMinutiae((2,), (C,)))
+        log.undo(minutiae)
+        log.close()
+
+        self.assertEqual(rows(self.recovered()), rows([A, B]))
+
+    def test_recover_keeps_undo_and_redo(self):
+        minutiae = MinutiaSet.from_minutiae([A])
+        log = EditLog(self.journal_path)
+        log.do(minutiae, InsertMinutiae((1,), (B,)))
+        log.do(minutiae, InsertMinutiae((2,), (C,)))
+        log.undo(minutiae)
+        log.close()
+
+        log = EditLog(self.journal_path)
+        recovered = log.recover()
+        log.redo(recovered)
+        self.assertEqual(rows(recovered), rows([A, B, C]))
+        log.undo(recovered)
+        log.undo(recovered)
+        self.assertEqual(rows(recovered), rows([A]))
+        log.close()
+
+    def test_recover_after_saving(self):
+        minutiae = MinutiaSet()
+        log = EditLog(self.journal_path)
+        log.do(minutiae, InsertMinutiae((0,), (A,)))
+        log.saved()
+        self.assertFalse(self.journal_path.exists())
+        log.do(minutiae, InsertMinutiae((1,), (B,)))
+        log.close()
+
+        self.assertEqual(rows(self.recovered()), rows([A, B]))
+
+    def test_recover_twice(self):
+        minutiae = MinutiaSet()
+        log = EditLog(self.journal_path)
+        log.do(minutiae, InsertMinutiae((0,), (A,)))
+        log.close()
+
+        self.assertEqual(rows(self.recovered()), rows([A]))
+        self.assertEqual(rows(self.recovered()), rows([A]))
+
+    def test_recover_truncated_last_line(self):
+        minutiae = MinutiaSet()
+        log = EditLog(self.journal_path)
+        log.do(minutiae, InsertMinutiae((0,), (A,)))
+        log.do(minutiae, InsertMinutiae((1,), (B,)))
+        log.close()
+
+        text = self.journal_path.read_text(encoding='utf-8')
+        self.journal_path.write_text(text[:-10], encoding='utf-8')
+        self.assertEqual(rows(self.recovered()), rows([A]))
+
+    def test_recover_corrupt_line(self):
+        minutiae = MinutiaSet()
+        log = EditLog(self.journal_path)
+        log.do(minutiae, InsertMinutiae((0,), (A,)))
+        log.close()
+
+        with self.journal_path.open('a', encoding='utf-8') as journal:
+            journal.write('not json\n{"undo":true}\n')
+        with self.assertRaises(CorruptFileError):
+            self.recovered()
+
+    def test_unwritable_journal(self):
+        minutiae = MinutiaSet.from_minutiae([A])
+        log = EditLog(Path('/proc/nope/fingerprint.png.journal'))
+        log.do(minutiae, InsertMinutiae((1,), (B,)))
+        self.assertEqual(rows(minutiae), rows([A, B]))
+        self.assertIsInstance(log.journal_error, OSError)
+
+        log.do(minutiae, MoveMinutia(0, A, C))
+        log.undo(minutiae)
+        self.assertEqual(rows(minutiae), rows([A, B]))
+        log.redo(minutiae)
+        self.assertEqual(rows(minutiae), rows([C, B]))
+        log.saved()
+        log.close()
+
+    def test_journal_in_read_only_directory(self):
+        directory = self.journal_path.parent
+        directory.chmod(0o500)
+        try:
+            if os.access(str(directory), os.W_OK):
+                self.skipTest("Directory permissions aren't enforced for this user.")
+            minutiae = MinutiaSet()
+            log = EditLog(self.journal_path)
+            log.do(minutiae, InsertMinutiae((0,), (A,)))
+            self.assertEqual(rows(minutiae), rows([A]))
+            self.assertIsNotNone(log.journal_error)
+            self.assertEqual(list(directory.iterdir()), [])
+            log.close()
+        finally:
+            directory.chmod(0o700)
+
+
+if __name__ == '__main__':
+    unittest.main()
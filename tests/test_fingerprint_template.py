@@ -0,0 +1,77 @@
+import io
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from pyminutiaeviewer.fingerprint_template import ANSI_ANGLE_UNIT, ISO_ANGLE_UNIT, FingerView
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
+
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+TEMPLATE_FORMATS = {MinutiaeFileFormat.ISO_19794_2: ISO_ANGLE_UNIT, MinutiaeFileFormat.ANSI_378: ANSI_ANGLE_UNIT}
+
+
+def random_minutiae(rng: np.random.Generator, count: int) -> MinutiaSet:
+    return MinutiaSet(x=rng.integers(0, 329, count), y=rng.integers(0, 450, count), angle=rng.uniform(0, 360, count),
+                      minutia_type=rng.integers(0, 2, count), quality=rng.uniform(0, 1, count), image_size=(329, 450))
+
+
+class TemplateRoundTripTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(FINGERPRINT_MINUTIAE))
+
+    def round_trip(self, file_format: MinutiaeFileFormat, minutiae: MinutiaSet) -> MinutiaSet:
+        return MinutiaeReader(file_format).read(io.BytesIO(MinutiaeEncoder(file_format).encode(minutiae, None)))
+
+    def assertTemplateEqual(self, read: MinutiaSet, minutiae: MinutiaSet, angle_unit: float):
+        """
+        Templates store whole pixels, angles in angle_unit steps and qualities in hundredths.
+        """
+        np.testing.assert_array_equal(read.x, minutiae.x)
+        np.testing.assert_array_equal(read.y, minutiae.y)
+        np.testing.assert_array_equal(read.minutia_type, minutiae.minutia_type)
+        angle_error = np.abs(read.angle - minutiae.angle) % 360
+        self.assertTrue(np.all(np.minimum(angle_error, 360 - angle_error) <= angle_unit / 2 + 1e-9))
+        np.testing.assert_allclose(read.quality, minutiae.quality, atol=0.005 + 1e-9)
+        self.assertEqual(read.image_size, minutiae.image_size)
+
+    def test_templates(self):
+        for file_format, angle_unit in TEMPLATE_FORMATS.items():
+            with self.subTest(file_format=file_format):
+                self.assertTemplateEqual(self.round_trip(file_format, self.minutiae), self.minutiae, angle_unit)
+
+    def test_templates_empty(self):
+        for file_format in TEMPLATE_FORMATS:
+            with self.subTest(file_format=file_format):
+                read = self.round_trip(file_format, MinutiaSet(image_size=(329, 450)))
+                self.assertEqual(len(read), 0)
+                self.assertEqual(read.image_size, (329, 450))
+
+    def test_templates_several_finger_views(self):
+        rng = np.random.default_rng(0)
+        # Enough full views for an ANSI record longer than a two byte length can hold:
+        views = [FingerView(self.minutiae, 1, 0, 0, 60), FingerView(MinutiaSet(image_size=(329, 450)), 2, 1, 0, 0)] + \
+                [FingerView(random_minutiae(rng, 255), 3, view % 16, 1, 80) for view in range(45)]
+        for file_format, angle_unit in TEMPLATE_FORMATS.items():
+            with self.subTest(file_format=file_format):
+                file = io.BytesIO()
+                MinutiaeEncoder(file_format).write_finger_views(file, views, None)
+                file.seek(0)
+                read = MinutiaeReader(file_format).read_finger_views(file)
+                self.assertEqual(len(read), len(views))
+                for read_view, view in zip(read, views):
+                    self.assertEqual(read_view[1:], view[1:])
+                    self.assertTemplateEqual(read_view.minutiae, view.minutiae, angle_unit)
+
+    def test_templates_too_many_minutiae(self):
+        minutiae = random_minutiae(np.random.default_rng(0), 256)
+        for file_format in TEMPLATE_FORMATS:
+            with self.subTest(file_format=file_format), self.assertRaises(ValueError):
+                MinutiaeEncoder(file_format).encode(minutiae, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
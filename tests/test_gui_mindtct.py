@@ -0,0 +1,144 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.viewport import compact_image
+
+try:
+    from pyminutiaeviewer.gui_mindtct import MindtctFrame
+    GUI_IMPORT_ERROR = None
+except Exception as e:
+    MindtctFrame = None
+    GUI_IMPORT_ERROR = e
+
+FINGERPRINT_IMAGE = Path(__file__).parent / 'fingerprint.png'
+
+
+def drawn_in_rgba(image: Image.Image, opacity: int, brightness: int, contrast: int) -> Image.Image:
+    """
+    Adjusts a fingerprint as MindtctFrame did when every image was RGBA, apart from rounding the opacity.
+    """
+    image = image.convert('RGBA')
+    image.putalpha(round(opacity * 2.55))
+    image = ImageEnhance.Brightness(image).enhance(2.0 * (brightness + 100.0) / 200.0)
+    return ImageEnhance.Contrast(image).enhance(2.0 * (contrast + 100.0) / 200.0)
+
+
+class FakeVariable(object):
+    """
+    Stands in for a Tk variable, which needs a Tk interpreter.
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeMindtctFrame(object):
+    """
+    Holds the variables of a MindtctFrame that its drawing methods read, without any widgets.
+    """
+    def __init__(self):
+        self.min_quality_var = FakeVariable(0.0)
+        self.show_ridge_endings_var = FakeVariable(True)
+        self.show_bifurcations_var = FakeVariable(True)
+        self.fp_opacity_var = FakeVariable(100)
+        self.fp_brightness_var = FakeVariable(0)
+        self.fp_contrast_var = FakeVariable(0)
+
+    def shown_minutia_types(self) -> tuple:
+        return MindtctFrame.shown_minutia_types(self)
+
+
+@unittest.skipIf(MindtctFrame is None, "The MINDTCT tab can't be imported: {}".format(GUI_IMPORT_ERROR))
+class MinutiaeMaskTest(unittest.TestCase):
+    def setUp(self):
+        self.frame = FakeMindtctFrame()
+        self.minutiae = MinutiaSet(x=[0] * 5, y=[0] * 5, angle=[0.0] * 5, minutia_type=[0, 1, 0, 1, 0],
+                                   quality=[0.5, 0.5, 0.25, 0.75, 1.0])
+
+    def mask(self) -> list:
+        return MindtctFrame.minutiae_mask(self.frame, self.minutiae).tolist()
+
+    def test_quality_threshold_is_exclusive(self):
+        for min_quality, expected in ((0.0, [True] * 5),
+                                      (0.25, [True, True, False, True, True]),
+                                      (0.5, [False, False, False, True, True]),
+                                      (1.0, [False] * 5)):
+            with self.subTest(min_quality=min_quality):
+                self.frame.min_quality_var.set(min_quality)
+                self.assertEqual(self.mask(), expected)
+
+    def test_minutia_types(self):
+        self.frame.min_quality_var.set(0.25)
+        self.frame.show_bifurcations_var.set(False)
+        self.assertEqual(self.mask(), [True, False, False, False, True])
+        self.frame.show_ridge_endings_var.set(False)
+        self.assertEqual(self.mask(), [False] * 5)
+
+    def test_ties_after_edits(self):
+        self.frame.min_quality_var.set(0.5)
+        self.assertEqual(self.mask(), [False, False, False, True, True])
+        self.minutiae[3] = Minutia(0, 0, 0.0, MinutiaType.BIFURCATION, 0.5)
+        self.assertEqual(self.mask(), [False, False, False, False, True])
+        self.minutiae.append(Minutia(0, 0, 0.0, MinutiaType.RIDGE_ENDING, 0.5))
+        self.assertEqual(self.mask(), [False, False, False, False, True, False])
+        self.assertEqual(self.mask(), (self.minutiae.quality > 0.5).tolist())
+        np.testing.assert_array_equal(self.minutiae.quality_mask(0.5), self.minutiae.quality > 0.5)
+
+
+@unittest.skipIf(MindtctFrame is None, "The MINDTCT tab can't be imported: {}".format(GUI_IMPORT_ERROR))
+class FingerprintDrawingTest(unittest.TestCase):
+    def setUp(self):
+        self.frame = FakeMindtctFrame()
+        self.grey = compact_image(Image.open(FINGERPRINT_IMAGE))
+        self.colour = Image.merge('RGB', (self.grey, self.grey.point(lambda v: 255 - v), self.grey))
+
+    def draw(self, image: Image.Image, opacity: int, brightness: int = 0, contrast: int = 0) -> Image.Image:
+        self.frame.fp_opacity_var.set(opacity)
+        self.frame.fp_brightness_var.set(brightness)
+        self.frame.fp_contrast_var.set(contrast)
+        return MindtctFrame.fingerprint_drawing(self.frame, image)
+
+    def test_neutral_settings_leave_the_image_as_it_is(self):
+        for image in (self.grey, self.colour):
+            with self.subTest(mode=image.mode):
+                self.assertIs(self.draw(image, 100), image)
+
+    def test_opaque_fingerprint_stays_in_its_mode(self):
+        for image in (self.grey, self.colour):
+            for brightness, contrast in ((50, 0), (0, -50), (-30, 70)):
+                with self.subTest(mode=image.mode, brightness=brightness, contrast=contrast):
+                    drawn = self.draw(image, 100, brightness, contrast)
+                    self.assertEqual(drawn.mode, image.mode)
+                    self.assertEqual(drawn.size, image.size)
+
+    def test_translucent_fingerprint_is_rgba(self):
+        for opacity in (0, 1, 50, 99):
+            with self.subTest(opacity=opacity):
+                drawn = self.draw(self.grey, opacity, 20, 20)
+                self.assertEqual(drawn.mode, 'RGBA')
+                self.assertEqual(drawn.getchannel('A').getextrema(), (round(opacity * 2.55),) * 2)
+        # 100 * 2.55 is a little under 255, so full opacity used to be truncated to 254:
+        self.assertEqual(self.draw(self.grey, 100, 20, 20).mode, 'L')
+
+    def test_same_as_drawing_in_rgba(self):
+        for image in (self.grey, self.colour):
+            for opacity, brightness, contrast in ((100, 0, 0), (100, 40, 0), (100, 0, -60), (60, -25, 35),
+                                                  (0, 100, 100), (100, -100, -100)):
+                with self.subTest(mode=image.mode, opacity=opacity, brightness=brightness, contrast=contrast):
+                    drawn = self.draw(image, opacity, brightness, contrast).convert('RGBA')
+                    expected = drawn_in_rgba(image, opacity, brightness, contrast)
+                    np.testing.assert_array_equal(np.array(drawn), np.array(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
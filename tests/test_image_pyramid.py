@@ -0,0 +1,101 @@
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from pyminutiaeviewer.image_pyramid import ImagePyramid
+
+TILE_SIZE = 16
+
+
+def random_image(width: int, height: int, mode: str = 'L') -> Image.Image:
+    rng = np.random.default_rng(0)
+    shape = (height, width) if mode == 'L' else (height, width, len(mode))
+    return Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode)
+
+
+def halved(image: Image.Image) -> Image.Image:
+    """
+    Halves an image by averaging each two by two block, repeating the last column and row of an odd size.
+    """
+    pixels = np.array(image, dtype=np.float64)
+    if pixels.shape[1] % 2:
+        pixels = np.concatenate((pixels, pixels[:, -1:]), axis=1)
+    if pixels.shape[0] % 2:
+        pixels = np.concatenate((pixels, pixels[-1:]), axis=0)
+    blocks = (pixels[0::2, 0::2] + pixels[1::2, 0::2] + pixels[0::2, 1::2] + pixels[1::2, 1::2]) / 4
+    return Image.fromarray(np.rint(blocks).astype(np.uint8), image.mode)
+
+
+class ImagePyramidTest(unittest.TestCase):
+    def setUp(self):
+        # An odd width and height that aren't multiples of the tile size:
+        self.image = random_image(71, 45)
+        self.pyramid = ImagePyramid(self.image, TILE_SIZE)
+
+    def test_levels(self):
+        # 71 pixels need 5 tiles at level 0, 3 at level 1, 2 at level 2 and 1 at level 3:
+        self.assertEqual(self.pyramid.levels, 4)
+        self.assertEqual([self.pyramid.level_size(level) for level in range(4)],
+                         [(71, 45), (36, 23), (18, 12), (9, 6)])
+        self.assertEqual(ImagePyramid(random_image(16, 16), TILE_SIZE).levels, 1)
+        self.assertEqual(ImagePyramid(random_image(4, 4), TILE_SIZE).levels, 1)
+        self.assertEqual(ImagePyramid(random_image(17, 3), TILE_SIZE).levels, 2)
+
+    def test_level_for_zoom(self):
+        for zoom, level in ((32, 0), (1, 0), (0.99, 0), (0.5, 1), (0.3, 1), (0.25, 2), (0.2, 2), (0.125, 3),
+                            (0.01, 3)):
+            with self.subTest(zoom=zoom):
+                self.assertEqual(self.pyramid.level_for_zoom(zoom), level)
+
+    def test_tiles_at_edges(self):
+        for level in range(self.pyramid.levels):
+            width, height = self.pyramid.level_size(level)
+            columns, rows = -(-width // TILE_SIZE), -(-height // TILE_SIZE)
+            for column in range(columns):
+                for row in range(rows):
+                    with self.subTest(level=level, column=column, row=row):
+                        tile = self.pyramid.tile(level, column, row)
+                        self.assertEqual(tile.size, (min(TILE_SIZE, width - column * TILE_SIZE),
+                                                     min(TILE_SIZE, height - row * TILE_SIZE)))
+
+    def test_level_zero_is_the_image(self):
+        for box in ((0, 0, 71, 45), (3, 5, 40, 44), (64, 32, 71, 45), (15, 15, 17, 17)):
+            with self.subTest(box=box):
+                self.assertEqual(self.pyramid.render(box, 0).tobytes(), self.image.crop(box).tobytes())
+
+    def test_levels_are_halved(self):
+        below = self.image
+        for level in range(1, self.pyramid.levels):
+            with self.subTest(level=level):
+                rendered = self.pyramid.render((0, 0) + self.pyramid.level_size(level), level)
+                difference = np.abs(np.array(rendered, dtype=np.int16) - np.array(halved(below), dtype=np.int16))
+                # Pillow's box filter rounds halves differently:
+                self.assertLessEqual(int(difference.max()), 1)
+            below = rendered
+
+    def test_colour_image(self):
+        pyramid = ImagePyramid(random_image(33, 20, 'RGB'), TILE_SIZE)
+        tile = pyramid.tile(1, 1, 0)
+        self.assertEqual(tile.mode, 'RGB')
+        self.assertEqual(tile.size, (1, 10))
+
+    def test_cache_is_limited(self):
+        pyramid = ImagePyramid(self.image, TILE_SIZE, cache_tiles=2)
+        first = pyramid.tile(0, 0, 0)
+        pyramid.tile(0, 1, 0)
+        self.assertIs(pyramid.tile(0, 0, 0), first)
+        pyramid.tile(0, 2, 0)
+        pyramid.tile(2, 0, 0)
+        self.assertEqual(len(pyramid._tiles), 2)
+        self.assertIsNot(pyramid.tile(0, 0, 0), first)
+
+    def test_uncached_tiles(self):
+        pyramid = ImagePyramid(self.image, TILE_SIZE)
+        pyramid.tile(1, 0, 0, cache=False)
+        pyramid.render((0, 0, 36, 23), 1, cache=False)
+        self.assertEqual(len(pyramid._tiles), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from pyminutiaeviewer.matcher import Gallery, match_score, read_template
+from pyminutiaeviewer.minutia_set import MinutiaSet
+
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+
+
+def random_template(rng: np.random.Generator, count: int = 40) -> MinutiaSet:
+    return MinutiaSet(x=rng.integers(0, 329, count), y=rng.integers(0, 450, count), angle=rng.uniform(0, 360, count),
+                      minutia_type=rng.integers(0, 2, count), quality=rng.uniform(0, 1, count))
+
+
+class MatcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.fingerprint = read_template(FINGERPRINT_MINUTIAE)
+        cls.templates = [random_template(rng) for _ in range(9)] + [cls.fingerprint]
+
+    def test_same_template_matches(self):
+        self.assertGreater(match_score(self.fingerprint, self.fingerprint), 20)
+
+    def test_rotated_template_matches(self):
+        self.assertGreater(match_score(self.fingerprint.rotated(30, (164, 225)), self.fingerprint), 20)
+
+    def test_search(self):
+        with Gallery(self.templates, processes=1) as gallery:
+            best = gallery.search(self.fingerprint, top=1)[0]
+        self.assertEqual(best.index, len(self.templates) - 1)
+
+    def test_shards_score_like_one_process(self):
+        with Gallery(self.templates, processes=1) as gallery:
+            expected = [gallery.scores(template).tolist() for template in self.templates[-2:]]
+        with Gallery(self.templates, processes=3) as gallery:
+            self.assertEqual([gallery.scores(template).tolist() for template in self.templates[-2:]], expected)
+
+    def test_more_processes_than_templates(self):
+        with Gallery(self.templates[:2], processes=4) as gallery:
+            self.assertEqual(len(gallery.scores(self.fingerprint)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+from pyminutiaeviewer import mindtct
+from pyminutiaeviewer.errors import MindtctError, MindtctCancelledError
+from pyminutiaeviewer.mindtct import ExtractionJob, MINDTCT_PATH_VARIABLE, SCRATCH_DIR_VARIABLE, mindtct_async, \
+    mindtct_batch, scratch_root, scratch_size
+
+FINGERPRINT_IMAGE = Path(__file__).parent / 'fingerprint.png'
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+DiskUsage = type(shutil.disk_usage('.'))
+
+
+class ScratchRootTest(unittest.TestCase):
+    def setUp(self):
+        environment = {name: value for name, value in os.environ.items() if name != SCRATCH_DIR_VARIABLE}
+        patcher = mock.patch.dict(os.environ, environment, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_override(self):
+        os.environ[SCRATCH_DIR_VARIABLE] = '/scratch'
+        self.assertEqual(scratch_root(1 << 40), '/scratch')
+
+    @unittest.skipUnless(mindtct.RAM_SCRATCH_DIR.is_dir(), 'There is no RAM scratch directory.')
+    def test_ram_scratch_space(self):
+        with mock.patch('shutil.disk_usage', return_value=DiskUsage(1 << 30, 0, 1 << 30)):
+            self.assertEqual(scratch_root(scratch_size((329, 450))), str(mindtct.RAM_SCRATCH_DIR))
+
+    def test_full_ram_scratch_space(self):
+        with mock.patch('shutil.disk_usage', return_value=DiskUsage(1 << 30, 1 << 30, 1 << 20)):
+            self.assertIsNone(scratch_root(scratch_size((329, 450))))
+
+
+@unittest.skipUnless(mindtct.mindtct_path().exists(), 'There is no MINDTCT binary for this platform.')
+class ExtractionTest(unittest.TestCase):
+    def test_full_scratch_space(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = Path(directory) / 'fingerprint.min'
+            with mock.patch.object(mindtct, '_has_room', return_value=False):
+                result, = mindtct_batch([ExtractionJob(FINGERPRINT_IMAGE, output_path)], workers=1)
+            self.assertIsNone(result.error)
+            self.assertGreater(len(result.minutiae), 0)
+            self.assertTrue(output_path.exists())
+
+
+@unittest.skipIf(os.name != 'posix', 'The MINDTCT stubs are shell scripts.')
+class StubMindtctTestCase(unittest.TestCase):
+    """
+    Runs a shell script in place of MINDTCT, with the scratch directories made in a directory of the test's own.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.scratch = Path(self.directory.name) / 'scratch'
+        self.scratch.mkdir()
+        self.stub = Path(self.directory.name) / 'mindtct'
+        patcher = mock.patch.dict(os.environ, {MINDTCT_PATH_VARIABLE: str(self.stub),
+                                               SCRATCH_DIR_VARIABLE: str(self.scratch)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_stub(self, script: str):
+        # exec replaces the shell, so killing the stub kills the command too:
+        self.stub.write_text('#!/bin/sh\n' + script + '\n')
+        self.stub.chmod(self.stub.stat().st_mode | stat.S_IXUSR)
+
+    def assertScratchIsEmpty(self):
+        self.assertEqual(list(self.scratch.iterdir()), [])
+
+
+class ExtractionFailureTest(StubMindtctTestCase):
+    def setUp(self):
+        super().setUp()
+        self.image = Image.new('L', (64, 64))
+        self.ran = Path(self.directory.name) / 'ran'
+
+    def test_non_zero_exit(self):
+        self.write_stub('echo "Bad image" >&2\nexit 1')
+        with self.assertRaises(MindtctError) as context:
+            mindtct.mindtct(self.image)
+        self.assertIn('exited with code 1', str(context.exception))
+        self.assertIn('Bad image', str(context.exception))
+        self.assertScratchIsEmpty()
+
+    def test_timeout(self):
+        self.write_stub('exec sleep 30')
+        start = time.monotonic()
+        with self.assertRaises(MindtctError) as context:
+            mindtct.mindtct(self.image, timeout=0.2)
+        self.assertNotIsInstance(context.exception, MindtctCancelledError)
+        self.assertIn('timed out', str(context.exception))
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertScratchIsEmpty()
+
+    def test_cancelled_before_running(self):
+        self.write_stub('touch "{}"'.format(self.ran))
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(MindtctCancelledError):
+            mindtct.mindtct(self.image, cancel=cancel)
+        self.assertFalse(self.ran.exists())
+        self.assertScratchIsEmpty()
+
+    def test_cancel_running_extraction(self):
+        self.write_stub('exec sleep 30')
+        running = threading.Event()
+        start = time.monotonic()
+        future = mindtct_async(self.image, progress=lambda step: running.set() if step == 'Running MINDTCT' else None)
+        self.assertTrue(running.wait(10))
+        self.assertTrue(future.cancel())
+        self.assertIsInstance(future.exception(timeout=10), MindtctCancelledError)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertScratchIsEmpty()
+
+    def test_async_failure(self):
+        self.write_stub('exit 1')
+        future = mindtct_async(self.image)
+        self.assertIsInstance(future.exception(timeout=10), MindtctError)
+        # A finished extraction can't be cancelled:
+        self.assertFalse(future.cancel())
+        self.assertScratchIsEmpty()
+
+    def test_async_timeout(self):
+        self.write_stub('exec sleep 30')
+        future = mindtct_async(self.image, timeout=0.2)
+        error = future.exception(timeout=10)
+        self.assertIsInstance(error, MindtctError)
+        self.assertIn('timed out', str(error))
+        self.assertScratchIsEmpty()
+
+
+class BatchFailureTest(StubMindtctTestCase):
+    def setUp(self):
+        super().setUp()
+        # Fails on images named bad, hangs on images named slow, and otherwise writes the fixture's minutiae:
+        self.write_stub('for argument; do image="$output"; output="$argument"; done\n'
+                        'case "$(basename "$image")" in\n'
+                        '    bad*) echo "Bad image" >&2; exit 1;;\n'
+                        '    slow*) exec sleep 30;;\n'
+                        'esac\n'
+                        'cp "{}" "$output.min"'.format(FINGERPRINT_MINUTIAE))
+        self.images = Path(self.directory.name) / 'images'
+        self.images.mkdir()
+        self.output = Path(self.directory.name) / 'output'
+
+    def jobs(self, *names: str) -> list:
+        jobs = []
+        for name in names:
+            shutil.copyfile(str(FINGERPRINT_IMAGE), str(self.images / (name + '.png')))
+            jobs.append(ExtractionJob(self.images / (name + '.png'), self.output / (name + '.min')))
+        return jobs
+
+    def test_failures_are_reported_and_the_batch_continues(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                jobs = self.jobs('good1', 'bad', 'slow', 'good2')
+                start = time.monotonic()
+                results = {result.image_path.stem: result for result in mindtct_batch(jobs, workers, timeout=0.3)}
+                self.assertLess(time.monotonic() - start, 20)
+
+                self.assertEqual(sorted(results), ['bad', 'good1', 'good2', 'slow'])
+                for name in ('good1', 'good2'):
+                    self.assertIsNone(results[name].error)
+                    self.assertEqual(len(results[name].minutiae), 41)
+                    self.assertTrue((self.output / (name + '.min')).exists())
+                self.assertIsInstance(results['bad'].error, MindtctError)
+                self.assertIn('Bad image', str(results['bad'].error))
+                self.assertIsInstance(results['slow'].error, MindtctError)
+                self.assertIn('timed out', str(results['slow'].error))
+                for name in ('bad', 'slow'):
+                    self.assertIsNone(results[name].minutiae)
+                    self.assertFalse((self.output / (name + '.min')).exists())
+                self.assertScratchIsEmpty()
+
+    def test_missing_image(self):
+        job = ExtractionJob(self.images / 'missing.png', None)
+        result, = mindtct_batch([job], workers=1)
+        self.assertIsInstance(result.error, OSError)
+        self.assertScratchIsEmpty()
+
+    def test_stopping_early(self):
+        results = mindtct_batch(self.jobs(*('good{}'.format(i) for i in range(20))), workers=2)
+        self.assertIsNone(next(results).error)
+        results.close()
+        self.assertScratchIsEmpty()
+
+
+if __name__ == '__main__':
+    unittest.main()
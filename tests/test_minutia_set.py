@@ -0,0 +1,105 @@
+import unittest
+
+import numpy as np
+
+from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet
+
+A = Minutia(10, 20, 30.0, MinutiaType.RIDGE_ENDING, 0.5)
+
+
+def minutia_set() -> MinutiaSet:
+    return MinutiaSet(x=[10, 40, 70, 100], y=[20, 50, 80, 110], angle=[30.0, 60.0, 90.0, 120.0],
+                      minutia_type=[0, 1, 0, 1], quality=[0.5, 0.75, 0.25, 1.0], image_size=(329, 450))
+
+
+class DerivedSetTest(unittest.TestCase):
+    def test_slice_is_a_copy(self):
+        minutiae = minutia_set()
+        minutiae.quality_mask(0.4)
+        minutiae.spatial_index()
+        version = minutiae.version
+
+        selected = minutiae[1:3]
+        selected[0] = A
+        selected.quality[1] = 0.0
+        self.assertEqual(minutiae.version, version)
+        self.assertEqual(minutiae[1].x, 40)
+        self.assertEqual(minutiae.quality[2], 0.25)
+        np.testing.assert_array_equal(minutiae.quality_mask(0.4), [True, True, False, True])
+        np.testing.assert_array_equal(minutiae.region_mask(35, 45, 45, 55), [False, True, False, False])
+
+    def test_every_index_is_a_copy(self):
+        minutiae = minutia_set()
+        for index in (slice(None), slice(None, None, 2), Ellipsis, [0, 2], np.array([True, False, True, False])):
+            with self.subTest(index=index):
+                selected = minutiae[index]
+                for selected_column, column in zip(selected.columns(), minutiae.columns()):
+                    self.assertFalse(np.shares_memory(selected_column, column))
+
+    def test_scaled_and_rotated_are_copies(self):
+        minutiae = minutia_set()
+        for derived in (minutiae.scaled(0.5), minutiae.rotated(90, (0, 0)), minutiae.copy()):
+            with self.subTest(derived=derived):
+                for derived_column, column in zip(derived.columns(), minutiae.columns()):
+                    self.assertFalse(np.shares_memory(derived_column, column))
+
+    def test_scaled(self):
+        scaled = minutia_set().scaled(0.5)
+        np.testing.assert_array_equal(scaled.x, [5, 20, 35, 50])
+        self.assertEqual(scaled.image_size, (164, 225))
+
+    def test_rotated_image_size(self):
+        minutiae = minutia_set()
+        for degrees, image_size in ((0, (329, 450)), (90, (450, 329)), (180, (329, 450)), (270, (450, 329)),
+                                    (-90, (450, 329)), (45, (329, 450))):
+            with self.subTest(degrees=degrees):
+                self.assertEqual(minutiae.rotated(degrees, (0, 0)).image_size, image_size)
+        minutiae.image_size = None
+        self.assertIsNone(minutiae.rotated(90, (0, 0)).image_size)
+
+    def test_rotated_quarter_turn(self):
+        rotated = minutia_set().rotated(90, (0, 0))
+        np.testing.assert_array_equal(rotated.x, [-20, -50, -80, -110])
+        np.testing.assert_array_equal(rotated.y, [10, 40, 70, 100])
+        np.testing.assert_allclose(rotated.angle, [120.0, 150.0, 180.0, 210.0])
+
+
+class QualityMaskTest(unittest.TestCase):
+    def brute_force(self, minutiae: MinutiaSet, min_quality: float) -> list:
+        return [quality > min_quality for quality in minutiae.quality.tolist()]
+
+    def test_threshold_is_exclusive(self):
+        minutiae = MinutiaSet(x=[0] * 6, y=[0] * 6, angle=[0.0] * 6, minutia_type=[0] * 6,
+                              quality=[0.5, 0.25, 0.5, 0.75, float('nan'), 0.0])
+        for min_quality in (-1.0, 0.0, 0.25, 0.5, 0.6, 0.75, 1.0):
+            with self.subTest(min_quality=min_quality):
+                self.assertEqual(minutiae.quality_mask(min_quality).tolist(), self.brute_force(minutiae, min_quality))
+        self.assertEqual(minutiae.quality_mask(0.5).tolist(), [False, False, False, True, False, False])
+
+    def test_ties_after_changes(self):
+        minutiae = minutia_set()
+        self.assertEqual(minutiae.quality_mask(0.5).tolist(), [False, True, False, True])
+
+        # Every change bumps the version, so the cached order by quality is rebuilt:
+        minutiae[1] = A
+        self.assertEqual(minutiae.quality_mask(0.5).tolist(), [False, False, False, True])
+        minutiae.insert(0, Minutia(1, 2, 3.0, MinutiaType.BIFURCATION, 0.5000001))
+        self.assertEqual(minutiae.quality_mask(0.5).tolist(), [True, False, False, False, True])
+        minutiae.extend([A, Minutia(1, 2, 3.0, MinutiaType.BIFURCATION, 0.9)])
+        self.assertEqual(minutiae.quality_mask(0.5).tolist(), [True, False, False, False, True, False, True])
+        del minutiae[[0, 4]]
+        self.assertEqual(minutiae.quality_mask(0.5).tolist(), [False, False, False, False, True])
+        self.assertEqual(minutiae.quality_mask(0.5).tolist(), self.brute_force(minutiae, 0.5))
+
+    def test_random_qualities(self):
+        rng = np.random.default_rng(0)
+        # Qualities in hundredths, so that many are tied with each threshold:
+        minutiae = MinutiaSet(x=np.zeros(500), y=np.zeros(500), angle=np.zeros(500),
+                              minutia_type=np.zeros(500), quality=rng.integers(0, 101, 500) / 100)
+        for min_quality in np.arange(0, 101) / 100:
+            self.assertEqual(minutiae.quality_mask(min_quality).tolist(), self.brute_force(minutiae, min_quality))
+
+
+if __name__ == '__main__':
+    unittest.main()
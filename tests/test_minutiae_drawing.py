@@ -0,0 +1,125 @@
+import math
+import unittest
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from pyminutiaeviewer.minutia import MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.minutiae_drawing import colour_image, draw_minutiae
+
+IMAGE_SIZE = (329, 450)
+
+
+def draw_one_at_a_time(image: Image.Image, minutiae, size: float = None) -> Image.Image:
+    """
+    Draws each minutia in turn with ImageDraw, as draw_minutiae did before it was vectorised.
+    """
+    new_image = image.copy()
+    draw = ImageDraw.Draw(new_image)
+    if size is None:
+        size = min(image.size[0], image.size[1]) / 512.0 * 10.0
+    half = size / 2.0
+
+    for m in minutiae:
+        bounding_box = (m.x - half, m.y - half, m.x + half, m.y + half)
+        if m.minutia_type == MinutiaType.BIFURCATION:
+            colour = (255, 0, 0, 255)
+            draw.ellipse(bounding_box, outline=colour)
+        else:
+            colour = (0, 255, 0, 255)
+            draw.rectangle(bounding_box, outline=colour)
+
+        angle = (m.angle - 90) % 360
+        x2 = m.x + math.cos(math.radians(angle)) * size * 1.5
+        y2 = m.y + math.sin(math.radians(angle)) * size * 1.5
+        draw.line((m.x, m.y, x2, y2), fill=colour)
+    return new_image
+
+
+def random_minutiae(rng: np.random.Generator, count: int, margin: int) -> MinutiaSet:
+    width, height = IMAGE_SIZE
+    return MinutiaSet(x=rng.integers(-margin, width + margin, count), y=rng.integers(-margin, height + margin, count),
+                      angle=rng.uniform(0, 360, count), minutia_type=rng.integers(0, 2, count),
+                      quality=rng.uniform(0, 1, count))
+
+
+class DrawMinutiaeTest(unittest.TestCase):
+    # The number of pixels that may differ from drawing one minutia at a time:
+    TOLERANCE = 0
+
+    def assertSameAsOneAtATime(self, image: Image.Image, minutiae: MinutiaSet, size: float = None):
+        expected = np.array(draw_one_at_a_time(image, minutiae, size))
+        drawn = np.array(draw_minutiae(image, minutiae, size))
+        self.assertLessEqual(int(np.any(expected != drawn, axis=-1).sum()), self.TOLERANCE)
+
+    def test_dense_minutiae(self):
+        # Overlapping markers, including those cut by the edges of the image:
+        rng = np.random.default_rng(0)
+        image = Image.new('RGB', IMAGE_SIZE, (128, 128, 128))
+        minutiae = random_minutiae(rng, 3000, 10)
+        for size in (None, 4, 7.3, 12):
+            with self.subTest(size=size):
+                self.assertSameAsOneAtATime(image, minutiae, size)
+
+    def test_markers_either_side_of_the_origin(self):
+        image = Image.new('RGBA', (40, 40), (128, 128, 128, 255))
+        for minutia_type in (0, 1):
+            for size in (1, 5.5, 6, 6.43, 7.3):
+                for x in range(-8, 8):
+                    with self.subTest(minutia_type=minutia_type, size=size, x=x):
+                        minutiae = MinutiaSet(x=[x, 20], y=[20, x], angle=[45.0, 200.0],
+                                              minutia_type=[minutia_type] * 2, quality=[0.5, 0.5])
+                        self.assertSameAsOneAtATime(image, minutiae, size)
+
+    def test_random_images(self):
+        rng = np.random.default_rng(1)
+        for _ in range(10):
+            size = float(rng.uniform(0.5, 20))
+            image = Image.new('RGBA', tuple(rng.integers(20, 200, 2).tolist()), (128, 128, 128, 255))
+            minutiae = random_minutiae(rng, int(rng.integers(1, 400)), 25)
+            with self.subTest(size=size, image_size=image.size):
+                self.assertSameAsOneAtATime(image, minutiae, size)
+
+    def test_no_minutiae_in_the_image(self):
+        image = Image.new('RGB', IMAGE_SIZE, (128, 128, 128))
+        self.assertEqual(np.array(draw_minutiae(image, MinutiaSet())).tolist(), np.array(image).tolist())
+        far_away = MinutiaSet(x=[-1000], y=[-1000], angle=[0.0], minutia_type=[0], quality=[0.5])
+        self.assertEqual(np.array(draw_minutiae(image, far_away)).tolist(), np.array(image).tolist())
+
+
+class ColourImageTest(unittest.TestCase):
+    def test_colour_images_are_returned_as_they_are(self):
+        for mode in ('RGB', 'RGBA'):
+            with self.subTest(mode=mode):
+                image = Image.new(mode, (4, 4))
+                self.assertIs(colour_image(image), image)
+
+    def test_grey_images(self):
+        grey = Image.new('L', (4, 4), 100)
+        for mode in ('L', '1', 'I', 'P'):
+            with self.subTest(mode=mode):
+                coloured = colour_image(grey.convert(mode))
+                self.assertEqual(coloured.mode, 'RGB')
+                self.assertEqual(coloured.getpixel((0, 0)), grey.convert(mode).convert('RGB').getpixel((0, 0)))
+
+    def test_transparent_images(self):
+        translucent = Image.new('LA', (4, 4), (100, 128))
+        self.assertEqual(colour_image(translucent).mode, 'RGBA')
+        self.assertEqual(colour_image(translucent).getpixel((0, 0)), (100, 100, 100, 128))
+
+        palette = Image.new('P', (4, 4), 1)
+        palette.info['transparency'] = 1
+        self.assertEqual(colour_image(palette).mode, 'RGBA')
+        self.assertEqual(colour_image(palette).getpixel((0, 0))[3], 0)
+
+    def test_minutiae_are_drawn_in_colour_on_grey_images(self):
+        minutiae = MinutiaSet(x=[20], y=[20], angle=[0.0], minutia_type=[0], quality=[0.5])
+        grey = Image.new('L', (40, 40), 128)
+        drawn = draw_minutiae(colour_image(grey), minutiae, 6)
+        self.assertEqual(drawn.mode, 'RGB')
+        np.testing.assert_array_equal(np.array(drawn), np.array(draw_one_at_a_time(grey.convert('RGB'), minutiae, 6)))
+
+
+if __name__ == '__main__':
+    unittest.main()
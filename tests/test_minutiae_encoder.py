@@ -0,0 +1,91 @@
+import io
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.minutia import Minutia, MinutiaType
+from pyminutiaeviewer.minutia_set import MinutiaSet
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat
+
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+MINUTIAE = [Minutia(10, 20, 30.0, MinutiaType.RIDGE_ENDING, 0.5)]
+
+
+class RoundTripTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(FINGERPRINT_MINUTIAE))
+
+    def round_trip(self, file_format: MinutiaeFileFormat, minutiae: MinutiaSet) -> MinutiaSet:
+        return MinutiaeReader(file_format).read(io.BytesIO(MinutiaeEncoder(file_format).encode(minutiae, None)))
+
+    def test_binary(self):
+        read = self.round_trip(MinutiaeFileFormat.BINARY, self.minutiae)
+        for name in ('x', 'y', 'angle', 'minutia_type', 'quality'):
+            np.testing.assert_array_equal(getattr(read, name), getattr(self.minutiae, name))
+        self.assertEqual(read.image_size, (329, 450))
+
+    def test_binary_empty(self):
+        read = self.round_trip(MinutiaeFileFormat.BINARY, MinutiaSet(image_size=(329, 450)))
+        self.assertEqual(len(read), 0)
+        self.assertEqual(read.image_size, (329, 450))
+
+    def test_binary_truncated(self):
+        encoding = MinutiaeEncoder(MinutiaeFileFormat.BINARY).encode(self.minutiae, None)
+        with self.assertRaises(CorruptFileError):
+            MinutiaeReader(MinutiaeFileFormat.BINARY).read(io.BytesIO(encoding[:-1]))
+
+
+@unittest.skipIf(os.name != 'posix', 'File permissions are only checked on POSIX systems.')
+class AtomicWriteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'fingerprint.sim'
+        self.encoder = MinutiaeEncoder(MinutiaeFileFormat.SIMPLE)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_new_file_mode_follows_umask(self):
+        umask = os.umask(0o027)
+        try:
+            self.encoder.write(str(self.path), MINUTIAE, None, atomic=True)
+        finally:
+            os.umask(umask)
+        self.assertEqual(stat.S_IMODE(self.path.stat().st_mode), 0o640)
+
+    def test_replaced_file_mode_is_kept(self):
+        self.path.write_text('')
+        os.chmod(str(self.path), 0o604)
+        self.encoder.write(str(self.path), MINUTIAE, None, atomic=True)
+        self.assertEqual(stat.S_IMODE(self.path.stat().st_mode), 0o604)
+        self.assertEqual(list(Path(self.directory.name).iterdir()), [self.path])
+
+    def test_umask_is_not_changed(self):
+        # Changing the umask, even briefly, would change the permissions of files other threads create:
+        with mock.patch('os.umask', side_effect=AssertionError('The umask was changed.')):
+            self.encoder.write(str(self.path), MINUTIAE, None, atomic=True)
+        self.assertTrue(self.path.exists())
+
+    def test_file_is_synced_before_it_replaces_the_old_one(self):
+        calls = []
+        with mock.patch('os.fsync', side_effect=lambda fd: calls.append('fsync')), \
+                mock.patch('os.replace', side_effect=lambda *paths: calls.append('replace')):
+            self.encoder.write(str(self.path), MINUTIAE, None, atomic=True)
+        self.assertEqual(calls, ['fsync', 'replace'])
+
+    def test_failed_write_leaves_no_files(self):
+        with mock.patch('os.replace', side_effect=OSError('replace failed')), self.assertRaises(OSError):
+            self.encoder.write(str(self.path), MINUTIAE, None, atomic=True)
+        self.assertEqual(list(Path(self.directory.name).iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pyminutiaeviewer.errors import CorruptFileError
+from pyminutiaeviewer.minutiae_encoder import MinutiaeEncoder
+from pyminutiaeviewer.minutiae_reader import MinutiaeReader, MinutiaeFileFormat, detect_format
+
+FINGERPRINT_MINUTIAE = Path(__file__).parent / 'fingerprint.min'
+
+
+class BinaryReadTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'fingerprint.mnb'
+        minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(FINGERPRINT_MINUTIAE))
+        MinutiaeEncoder(MinutiaeFileFormat.BINARY).write(str(self.path), minutiae, None)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @unittest.skipUnless(Path('/proc/self/fd').is_dir(), 'Open files can only be counted with /proc.')
+    def test_read_minutiae_hold_no_files_open(self):
+        open_files = len(os.listdir('/proc/self/fd'))
+        minutiae = [MinutiaeReader(MinutiaeFileFormat.BINARY).read(str(self.path)) for _ in range(20)]
+        self.assertEqual(len(os.listdir('/proc/self/fd')), open_files)
+        self.assertEqual(len(minutiae[-1]), 41)
+
+    def test_read_minutiae_can_be_edited(self):
+        minutiae = MinutiaeReader(MinutiaeFileFormat.BINARY).read(str(self.path))
+        minutiae.x[0] = 1
+        self.assertEqual(MinutiaeReader(MinutiaeFileFormat.BINARY).read(str(self.path)).x[0], 22)
+
+
+class DetectFormatTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.minutiae = MinutiaeReader(MinutiaeFileFormat.NBIST).read(str(FINGERPRINT_MINUTIAE))
+
+    def encoded(self, file_format: MinutiaeFileFormat) -> bytes:
+        encoding = MinutiaeEncoder(file_format).encode(self.minutiae, None)
+        return encoding if isinstance(encoding, bytes) else encoding.encode('ascii')
+
+    def test_every_format(self):
+        for file_format in MinutiaeFileFormat:
+            with self.subTest(file_format=file_format):
+                # MINDTCT files are NBIST files:
+                expected = MinutiaeFileFormat.NBIST if file_format == MinutiaeFileFormat.MINDTCT else file_format
+                self.assertEqual(detect_format(io.BytesIO(self.encoded(file_format))), expected)
+
+    def test_path(self):
+        self.assertEqual(detect_format(str(FINGERPRINT_MINUTIAE)), MinutiaeFileFormat.NBIST)
+
+    def test_position_is_kept(self):
+        file = io.BytesIO(b'padding' + self.encoded(MinutiaeFileFormat.SIMPLE))
+        file.seek(7)
+        self.assertEqual(detect_format(file), MinutiaeFileFormat.SIMPLE)
+        self.assertEqual(file.tell(), 7)
+
+    def test_text_file(self):
+        text = self.encoded(MinutiaeFileFormat.XYT).decode('ascii')
+        self.assertEqual(detect_format(io.StringIO(text)), MinutiaeFileFormat.XYT)
+
+    def test_empty_file(self):
+        with self.assertRaises(CorruptFileError):
+            detect_format(io.BytesIO())
+        for file_format in MinutiaeFileFormat:
+            with self.subTest(file_format=file_format):
+                self.assertEqual(detect_format(io.BytesIO(), file_format), file_format)
+
+    def test_empty_file_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'fingerprint.xyt'
+            path.touch()
+            self.assertEqual(detect_format(str(path), MinutiaeFileFormat.XYT), MinutiaeFileFormat.XYT)
+
+    def test_unknown_format(self):
+        with self.assertRaises(CorruptFileError):
+            detect_format(io.BytesIO(b'not a minutiae file\n'))
+        self.assertEqual(detect_format(io.BytesIO(b'not a minutiae file\n'), MinutiaeFileFormat.SIMPLE),
+                         MinutiaeFileFormat.SIMPLE)
+
+    def test_mismatched_template_length(self):
+        with self.assertRaises(CorruptFileError):
+            detect_format(io.BytesIO(self.encoded(MinutiaeFileFormat.ISO_19794_2) + b'\0'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from pyminutiaeviewer.render_pipeline import RenderStage, RedrawScheduler
+
+
+class FakeWidget(object):
+    """
+    Schedules callbacks like a Tk widget, but only runs them when asked to.
+    """
+    def __init__(self):
+        self.idle = {}
+        self.timers = {}
+        self._ids = 0
+
+    def after_idle(self, callback):
+        self._ids += 1
+        self.idle[self._ids] = callback
+        return self._ids
+
+    def after(self, milliseconds: int, callback):
+        self._ids += 1
+        self.timers[self._ids] = (milliseconds, callback)
+        return self._ids
+
+    def after_cancel(self, callback_id):
+        self.idle.pop(callback_id, None)
+        self.timers.pop(callback_id, None)
+
+    def run_idle(self):
+        callbacks, self.idle = list(self.idle.values()), {}
+        for callback in callbacks:
+            callback()
+
+    def run_timers(self):
+        callbacks, self.timers = [callback for _, callback in self.timers.values()], {}
+        for callback in callbacks:
+            callback()
+
+
+class RenderStageTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def render(*inputs):
+            self.calls.append(inputs)
+            return len(self.calls)
+
+        self.stage = RenderStage(render)
+
+    def test_renders_only_when_inputs_change(self):
+        self.assertEqual(self.stage(1, 'a'), 1)
+        self.assertEqual(self.stage(1, 'a'), 1)
+        self.assertEqual(self.stage(2, 'a'), 2)
+        self.assertEqual(self.stage(2, 'a'), 2)
+        self.assertEqual(self.stage(2, 'b'), 3)
+        self.assertEqual(self.calls, [(1, 'a'), (2, 'a'), (2, 'b')])
+
+    def test_inputs_are_compared_by_value_and_type(self):
+        self.stage((1, 2), [3])
+        self.stage((1, 2), [3])
+        self.assertEqual(len(self.calls), 1)
+        # 1 == 1.0 == True, but they may render differently:
+        self.stage(1)
+        self.stage(1.0)
+        self.stage(True)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_images_are_compared_by_identity(self):
+        image = Image.new('L', (4, 4))
+        self.stage(image)
+        self.stage(image)
+        self.assertEqual(len(self.calls), 1)
+        # An equal image is still a different input:
+        self.stage(image.copy())
+        self.assertEqual(len(self.calls), 2)
+
+    def test_key(self):
+        self.stage(1, key=(0,))
+        self.stage(1, key=(0,))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.stage(1, key=(1,)), 2)
+        # The key isn't passed on to the render function:
+        self.assertEqual(self.calls[-1], (1,))
+
+    def test_number_of_inputs(self):
+        self.stage(1)
+        self.stage(1, None)
+        self.stage()
+        self.assertEqual(len(self.calls), 3)
+
+    def test_mark_current(self):
+        self.stage(1)
+        self.stage.mark_current(2)
+        self.assertEqual(self.stage(2), 1)
+        self.assertEqual(len(self.calls), 1)
+        self.stage(3)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_invalidate(self):
+        self.stage(1)
+        self.stage.invalidate()
+        self.assertEqual(self.stage(1), 2)
+        self.assertEqual(self.stage(1), 2)
+
+
+class RedrawSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.redraws = []
+        self.scheduler = RedrawScheduler(self.widget, lambda: self.redraws.append('redraw'),
+                                         lambda: self.redraws.append('minutiae'))
+        # The clock starts well after the last redraw, so the first request isn't delayed:
+        self.now = 100.0
+        patcher = mock.patch('time.perf_counter', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_are_coalesced(self):
+        for _ in range(10):
+            self.scheduler.request_redraw()
+            self.scheduler.request_minutiae_redraw()
+        self.assertEqual(len(self.widget.idle), 1)
+        self.assertEqual(self.redraws, [])
+
+        self.widget.run_idle()
+        # Redrawing everything redraws the minutiae too:
+        self.assertEqual(self.redraws, ['redraw'])
+        self.widget.run_idle()
+        self.assertEqual(self.redraws, ['redraw'])
+
+    def test_minutiae_redraw(self):
+        self.scheduler.request_minutiae_redraw()
+        self.scheduler.request_minutiae_redraw()
+        self.widget.run_idle()
+        self.assertEqual(self.redraws, ['minutiae'])
+
+    def test_requests_after_a_redraw_schedule_another(self):
+        self.scheduler.request_redraw()
+        self.widget.run_idle()
+        self.now += 1
+        self.scheduler.request_minutiae_redraw()
+        self.assertEqual(len(self.widget.idle), 1)
+        self.widget.run_idle()
+        self.assertEqual(self.redraws, ['redraw', 'minutiae'])
+
+    def test_redraws_are_limited_to_the_frame_rate(self):
+        self.scheduler.request_redraw()
+        self.widget.run_idle()
+        self.now += self.scheduler.frame_interval / 2
+        self.scheduler.request_redraw()
+        self.scheduler.request_redraw()
+        self.assertEqual(len(self.widget.idle), 0)
+        self.assertEqual(len(self.widget.timers), 1)
+        (milliseconds, _), = self.widget.timers.values()
+        self.assertGreater(milliseconds, 0)
+        self.assertLessEqual(milliseconds, int(self.scheduler.frame_interval * 1000) + 1)
+
+        self.widget.run_timers()
+        self.assertEqual(self.redraws, ['redraw', 'redraw'])
+
+    def test_discard(self):
+        self.scheduler.request_minutiae_redraw()
+        self.scheduler.discard(fingerprint=False)
+        self.assertEqual(len(self.widget.idle), 0)
+        self.widget.run_idle()
+        self.assertEqual(self.redraws, [])
+
+        # Redrawing just the minutiae doesn't make a pending redraw of the fingerprint stale:
+        self.scheduler.request_redraw()
+        self.scheduler.discard(fingerprint=False)
+        self.widget.run_idle()
+        self.assertEqual(self.redraws, ['redraw'])
+
+        self.scheduler.request_redraw()
+        self.scheduler.discard(fingerprint=True)
+        self.assertEqual(len(self.widget.idle), 0)
+        self.now += 1
+        self.scheduler.request_minutiae_redraw()
+        self.widget.run_idle()
+        self.assertEqual(self.redraws, ['redraw', 'minutiae'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+
+import numpy as np
+
+from pyminutiaeviewer.spatial_index import SpatialIndex
+
+CELL_SIZE = 8
+
+
+class BruteForce(object):
+    """
+    Answers the spatial index's queries by testing every point.
+    """
+    def __init__(self, x, y):
+        self.x = list(x)
+        self.y = list(y)
+
+    def in_box(self, x0, y0, x1, y1) -> np.ndarray:
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        return np.array([i for i, (x, y) in enumerate(zip(self.x, self.y)) if x0 <= x <= x1 and y0 <= y <= y1],
+                        dtype=np.int64)
+
+    def in_radius(self, cx, cy, radius) -> np.ndarray:
+        return np.array([i for i, distance in enumerate(self.distances(cx, cy)) if distance <= radius], dtype=np.int64)
+
+    def distances(self, cx, cy) -> np.ndarray:
+        return np.hypot(np.array(self.x, dtype=np.float64) - cx, np.array(self.y, dtype=np.float64) - cy)
+
+
+class SpatialIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def random_points(self, count: int):
+        # Points on and either side of cell boundaries, including negative co-ordinates, as well as anywhere:
+        boundaries = np.arange(-2, 8) * CELL_SIZE
+        x = np.where(self.rng.random(count) < 0.5, self.rng.choice(boundaries, count) + self.rng.integers(-1, 2, count),
+                     self.rng.integers(-20, 80, count))
+        y = np.where(self.rng.random(count) < 0.5, self.rng.choice(boundaries, count) + self.rng.integers(-1, 2, count),
+                     self.rng.integers(-20, 80, count))
+        return x.tolist(), y.tolist()
+
+    def random_box(self):
+        return tuple(self.rng.choice([self.rng.integers(-24, 80), self.rng.integers(-3, 10) * CELL_SIZE])
+                     for _ in range(4))
+
+    def assertQueriesMatch(self, index: SpatialIndex, brute_force: BruteForce):
+        self.assertEqual(len(index), len(brute_force.x))
+        for _ in range(50):
+            box = self.random_box()
+            np.testing.assert_array_equal(index.in_box(*box), brute_force.in_box(*box), err_msg=str(box))
+
+            cx, cy = self.rng.uniform(-30, 90, 2)
+            radius = self.rng.choice([0, CELL_SIZE, self.rng.uniform(0, 40)])
+            np.testing.assert_array_equal(index.in_radius(cx, cy, radius), brute_force.in_radius(cx, cy, radius))
+
+            nearest = index.nearest(cx, cy, radius)
+            distances = brute_force.distances(cx, cy)
+            if len(distances) == 0 or distances.min() > radius:
+                self.assertIsNone(nearest)
+            else:
+                # Any of several equally close points may be returned:
+                self.assertEqual(distances[nearest], distances.min())
+
+    def test_empty(self):
+        index = SpatialIndex(cell_size=CELL_SIZE)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.in_box(-100, -100, 100, 100)), 0)
+        self.assertEqual(len(index.in_radius(0, 0, 100)), 0)
+        self.assertIsNone(index.nearest(0, 0, 100))
+        index.remove([])
+        self.assertEqual(len(index), 0)
+
+    def test_queries_match_brute_force(self):
+        for count in (1, 10, 200):
+            with self.subTest(count=count):
+                x, y = self.random_points(count)
+                self.assertQueriesMatch(SpatialIndex(x, y, CELL_SIZE), BruteForce(x, y))
+
+    def test_cell_boundaries(self):
+        # Points on every corner and edge of a cell:
+        x = [0, CELL_SIZE - 1, CELL_SIZE, 0, CELL_SIZE, -1, -CELL_SIZE, 2 * CELL_SIZE]
+        y = [0, 0, 0, CELL_SIZE, CELL_SIZE, -1, -CELL_SIZE, CELL_SIZE - 1]
+        index = SpatialIndex(x, y, CELL_SIZE)
+        brute_force = BruteForce(x, y)
+        for box in ((0, 0, CELL_SIZE, CELL_SIZE), (0, 0, CELL_SIZE - 1, CELL_SIZE - 1), (-1, -1, -1, -1),
+                    (CELL_SIZE, CELL_SIZE, 0, 0), (-CELL_SIZE, -CELL_SIZE, 2 * CELL_SIZE, CELL_SIZE)):
+            with self.subTest(box=box):
+                np.testing.assert_array_equal(index.in_box(*box), brute_force.in_box(*box))
+        np.testing.assert_array_equal(index.in_radius(CELL_SIZE, 0, 1), [1, 2])
+        np.testing.assert_array_equal(index.in_radius(0, 0, CELL_SIZE), [0, 1, 2, 3, 5])
+        self.assertEqual(index.nearest(-CELL_SIZE, -CELL_SIZE, 0), 6)
+
+    def test_edits_match_brute_force(self):
+        x, y = self.random_points(50)
+        index = SpatialIndex(x, y, CELL_SIZE)
+        brute_force = BruteForce(x, y)
+        for step in range(60):
+            operation = step % 3 if len(brute_force.x) else 0
+            if operation == 0:
+                i = int(self.rng.integers(0, len(brute_force.x) + 1))
+                (px,), (py,) = self.random_points(1)
+                index.insert(i, px, py)
+                brute_force.x.insert(i, px)
+                brute_force.y.insert(i, py)
+            elif operation == 1:
+                indices = np.unique(self.rng.integers(0, len(brute_force.x), self.rng.integers(1, 4)))
+                index.remove(indices)
+                for i in reversed(indices.tolist()):
+                    del brute_force.x[i], brute_force.y[i]
+            else:
+                i = int(self.rng.integers(0, len(brute_force.x)))
+                (px,), (py,) = self.random_points(1)
+                index.move(i, px, py)
+                brute_force.x[i], brute_force.y[i] = px, py
+            self.assertQueriesMatch(index, brute_force)
+
+    def test_remove_every_point(self):
+        x, y = self.random_points(20)
+        index = SpatialIndex(x, y, CELL_SIZE)
+        index.remove(np.arange(20))
+        self.assertQueriesMatch(index, BruteForce([], []))
+        index.insert(0, 3, 4)
+        self.assertEqual(index.nearest(0, 0, 5), 0)
+        self.assertIsNone(index.nearest(0, 0, 4.9))
+
+
+if __name__ == '__main__':
+    unittest.main()
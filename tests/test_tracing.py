@@ -0,0 +1,163 @@
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+from multiprocessing import Pool
+from pathlib import Path
+from unittest import mock
+
+from pyminutiaeviewer import tracing
+from pyminutiaeviewer.tracing import Span, TraceFileWriter, Tracer
+
+# Large enough to stand out from everything else the tests allocate.
+ALLOCATION = 16 << 20
+
+
+def traced_work(value: int) -> int:
+    with tracing.span('test.work', value=value):
+        return value * 2
+
+
+class TracerTest(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer()
+        self.spans = []
+        self.tracer.add_listener(self.spans.append)
+        self.addCleanup(self.tracer.disable)
+
+    def test_disabled(self):
+        with self.tracer.span('outer'):
+            pass
+        self.assertEqual(self.spans, [])
+
+    def test_nesting(self):
+        self.tracer.enable(trace_memory=False)
+        with self.tracer.span('outer', path='a.png'):
+            with self.tracer.span('inner'):
+                pass
+            with self.tracer.span('inner'):
+                pass
+        self.assertEqual([span.name for span in self.spans], ['inner', 'inner', 'outer'])
+        first, second, outer = self.spans
+        self.assertLessEqual(outer.start, first.start)
+        self.assertLessEqual(first.start + first.duration, second.start + 1e-3)
+        self.assertGreaterEqual(outer.duration, first.duration + second.duration)
+        self.assertEqual(outer.attributes, {'path': 'a.png'})
+        self.assertIsNone(outer.peak_memory)
+        self.assertEqual(outer.process, os.getpid())
+
+    def test_error(self):
+        self.tracer.enable(trace_memory=False)
+        with self.assertRaises(KeyError), self.tracer.span('outer'):
+            raise KeyError()
+        self.assertEqual(self.spans[0].attributes, {'error': 'KeyError'})
+
+    def test_listeners(self):
+        self.tracer.enable(trace_memory=False)
+        self.tracer.remove_listener(self.spans.append)
+        with self.tracer.span('outer'):
+            pass
+        self.assertEqual(self.spans, [])
+
+    @unittest.skipUnless(hasattr(tracemalloc, 'reset_peak'), 'The peak memory can only be reset from Python 3.9.')
+    def test_peak_memory_is_folded_in_to_open_spans(self):
+        self.tracer.enable()
+        with self.tracer.span('outer'):
+            with self.tracer.span('before'):
+                pass
+            with self.tracer.span('allocating'):
+                data = bytearray(ALLOCATION)
+                del data
+            with self.tracer.span('after'):
+                pass
+        spans = {span.name: span for span in self.spans}
+        # The outer span sees the peak of the span nested in it, while spans before and after it don't:
+        self.assertGreaterEqual(spans['allocating'].peak_memory, ALLOCATION)
+        self.assertGreaterEqual(spans['outer'].peak_memory, ALLOCATION)
+        self.assertLess(spans['before'].peak_memory, ALLOCATION)
+        self.assertLess(spans['after'].peak_memory, ALLOCATION)
+
+    def test_tracemalloc_is_only_stopped_if_the_tracer_started_it(self):
+        if tracemalloc.is_tracing():
+            self.skipTest('Memory is already being traced.')
+        self.tracer.enable()
+        self.assertTrue(tracemalloc.is_tracing())
+        self.tracer.disable()
+        self.assertFalse(tracemalloc.is_tracing())
+
+        tracemalloc.start()
+        try:
+            self.tracer.enable()
+            self.tracer.disable()
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+
+class TraceFileWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = Path(self.directory.name) / 'trace.jsonl'
+
+    def span(self, name: str, **attributes) -> Span:
+        return Span(name, 1.5, 0.25, 1024, 2048, 7, 'MainThread', attributes)
+
+    def records(self) -> list:
+        return [json.loads(line) for line in self.path.read_text(encoding='utf-8').splitlines()]
+
+    def test_records(self):
+        writer = TraceFileWriter(self.path)
+        writer(self.span('image.decode', path=Path('a.png')))
+        writer(self.span('image.save'))
+        writer.close()
+        self.assertEqual(self.records(), [
+            {'name': 'image.decode', 'start': 1.5, 'duration': 0.25, 'peak_memory': 1024, 'peak_rss': 2048,
+             'process': 7, 'thread': 'MainThread', 'attributes': {'path': 'a.png'}},
+            {'name': 'image.save', 'start': 1.5, 'duration': 0.25, 'peak_memory': 1024, 'peak_rss': 2048,
+             'process': 7, 'thread': 'MainThread'}])
+
+    def test_unbuffered_append(self):
+        self.path.write_text('{"name":"earlier"}\n', encoding='utf-8')
+        writer = TraceFileWriter(self.path)
+        self.addCleanup(writer.close)
+        self.assertIsInstance(writer._file, io.FileIO)
+        self.assertEqual(writer._file.mode, 'ab')
+
+        # Each span is a single write, and reaches the file straight away:
+        with mock.patch('os.write', wraps=os.write) as write:
+            writer(self.span('a'))
+            writer(self.span('b', size=[1, 2]))
+        self.assertEqual(write.call_count, 2)
+        for (_, line), _ in write.call_args_list:
+            self.assertTrue(line.endswith(b'\n'))
+            self.assertEqual(line.count(b'\n'), 1)
+        self.assertEqual([record['name'] for record in self.records()], ['earlier', 'a', 'b'])
+
+    def test_writers_share_a_file(self):
+        writers = [TraceFileWriter(self.path) for _ in range(3)]
+        for i in range(30):
+            writers[i % 3](self.span('span', i=i))
+        for writer in writers:
+            writer.close()
+        self.assertEqual([record['attributes']['i'] for record in self.records()], list(range(30)))
+
+    def test_worker_processes(self):
+        tracing.trace_to_file(self.path, trace_memory=False)
+        self.addCleanup(tracing.stop_tracing_to_file)
+        with Pool(2, **tracing.pool_arguments()) as pool:
+            self.assertEqual(sorted(pool.map(traced_work, range(10))), list(range(0, 20, 2)))
+        with tracing.span('test.main'):
+            pass
+
+        records = self.records()
+        self.assertEqual(sorted(record['attributes']['value'] for record in records if record['name'] == 'test.work'),
+                         list(range(10)))
+        self.assertNotIn(os.getpid(), {record['process'] for record in records if record['name'] == 'test.work'})
+        self.assertEqual([record['process'] for record in records if record['name'] == 'test.main'], [os.getpid()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from pyminutiaeviewer.image_pyramid import ImagePyramid
+from pyminutiaeviewer.viewport import View, MAX_ZOOM, MIN_ZOOM_OF_FIT, compact_image, fit_view, panned_view, \
+    render_view, visible_box, zoomed_view
+
+IMAGE_SIZE = (329, 450)
+FINGERPRINT_IMAGE = Path(__file__).parent / 'fingerprint.png'
+
+
+def to_image(view: View, x: float, y: float):
+    """
+    Converts canvas co-ordinates to image co-ordinates.
+    """
+    return view.x + x / view.zoom, view.y + y / view.zoom
+
+
+class ViewTest(unittest.TestCase):
+    def setUp(self):
+        self.view = fit_view(IMAGE_SIZE, (658, 600))
+        self.fit_zoom = self.view.zoom
+
+    def assertViewAlmostEqual(self, a: View, b: View):
+        np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+
+    def test_fit_view(self):
+        self.assertEqual(self.view, View(600 / 450, 0.0, 0.0, 658, 600))
+        self.assertEqual(visible_box(self.view, IMAGE_SIZE), (0.0, 0.0, 329.0, 450.0))
+
+    def test_zoom_keeps_the_point_under_the_mouse(self):
+        for factor in (1.1, 2, 0.8):
+            for x, y in ((0, 0), (100, 250), (658, 600)):
+                with self.subTest(factor=factor, x=x, y=y):
+                    zoomed = zoomed_view(self.view, factor, x, y, self.fit_zoom)
+                    self.assertAlmostEqual(zoomed.zoom, self.view.zoom * factor)
+                    np.testing.assert_allclose(to_image(zoomed, x, y), to_image(self.view, x, y))
+
+    def test_zoom_round_trip(self):
+        view = zoomed_view(self.view, 3, 120, 80, self.fit_zoom)
+        for factor in (1.25, 4, 0.5):
+            with self.subTest(factor=factor):
+                there = zoomed_view(view, factor, 200, 310, self.fit_zoom)
+                self.assertViewAlmostEqual(zoomed_view(there, 1 / factor, 200, 310, self.fit_zoom), view)
+
+    def test_zoom_limits(self):
+        self.assertEqual(zoomed_view(self.view, 1e6, 10, 10, self.fit_zoom).zoom, MAX_ZOOM)
+        self.assertAlmostEqual(zoomed_view(self.view, 1e-6, 10, 10, self.fit_zoom).zoom,
+                               self.fit_zoom * MIN_ZOOM_OF_FIT)
+        # An image smaller than the canvas can always be zoomed to fit:
+        self.assertEqual(zoomed_view(self.view, 1e6, 10, 10, 64.0).zoom, 64.0)
+
+    def test_pan_round_trip(self):
+        view = zoomed_view(self.view, 2.5, 300, 300, self.fit_zoom)
+        panned = panned_view(view, 37.5, -12)
+        self.assertEqual(to_image(panned, 37.5, -12), to_image(view, 0, 0))
+        self.assertViewAlmostEqual(panned_view(panned, -37.5, 12), view)
+
+    def test_visible_box_at_the_edges(self):
+        view = View(2.0, -10.0, 400.0, 100, 200)
+        self.assertEqual(visible_box(view, IMAGE_SIZE), (0.0, 400.0, 40.0, 450.0))
+        view = View(2.0, 300.0, -20.0, 100, 200)
+        self.assertEqual(visible_box(view, IMAGE_SIZE), (300.0, 0.0, 329.0, 80.0))
+        for view in (View(1.0, -100.0, 0.0, 100, 100), View(1.0, 329.0, 0.0, 100, 100), View(1.0, 0.0, 450.0, 10, 10)):
+            with self.subTest(view=view):
+                self.assertIsNone(visible_box(view, IMAGE_SIZE))
+
+
+class RenderViewTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.image = Image.fromarray(rng.integers(0, 256, IMAGE_SIZE[::-1], dtype=np.uint8), 'L')
+        self.pyramid = ImagePyramid(self.image, tile_size=64)
+
+    def test_actual_size(self):
+        region, position = render_view(self.pyramid, View(1.0, 10.0, 20.0, 100, 50))
+        self.assertEqual(position, (0, 0))
+        self.assertEqual(region.tobytes(), self.image.crop((10, 20, 110, 70)).tobytes())
+
+    def test_image_edges(self):
+        # The region stops at the image's edges, and is placed where the image is on the canvas:
+        region, position = render_view(self.pyramid, View(1.0, -30.0, 400.0, 100, 100))
+        self.assertEqual(position, (30, 0))
+        self.assertEqual(region.tobytes(), self.image.crop((0, 400, 70, 450)).tobytes())
+
+    def test_magnified(self):
+        region, position = render_view(self.pyramid, View(4.0, 100.5, 200.0, 40, 40))
+        # The region starts at a whole image pixel, half of which is left of the canvas:
+        self.assertEqual(position, (-2, 0))
+        self.assertEqual(region.size, (44, 40))
+        self.assertEqual(region.getpixel((0, 0)), self.image.getpixel((100, 200)))
+        self.assertEqual(region.getpixel((43, 39)), self.image.getpixel((110, 209)))
+
+    def test_shrunk_uses_a_smaller_level(self):
+        view = fit_view(IMAGE_SIZE, (82, 112))
+        region, position = render_view(self.pyramid, view)
+        self.assertEqual(self.pyramid.level_for_zoom(view.zoom), 2)
+        self.assertEqual(position, (0, 0))
+        self.assertLessEqual(abs(region.width - 82), 1)
+        self.assertLessEqual(abs(region.height - 112), 1)
+
+    def test_nothing_visible(self):
+        region, position = render_view(self.pyramid, View(1.0, 1000.0, 0.0, 100, 100))
+        self.assertEqual(region.size, (1, 1))
+        self.assertEqual(position, (-1, -1))
+
+
+class CompactImageTest(unittest.TestCase):
+    def setUp(self):
+        self.grey = Image.open(FINGERPRINT_IMAGE)
+        self.grey.load()
+
+    def assertCompacted(self, image: Image.Image, mode: str, expected: Image.Image):
+        compacted = compact_image(image)
+        self.assertEqual(compacted.mode, mode)
+        np.testing.assert_array_equal(np.array(compacted), np.array(expected))
+
+    def test_grey_images(self):
+        self.assertIs(compact_image(self.grey), self.grey)
+        for mode in ('RGB', 'RGBA', 'LA', 'I', 'P'):
+            with self.subTest(mode=mode):
+                self.assertCompacted(self.grey.convert(mode), 'L', self.grey)
+
+    def test_lazily_opened_image_is_loaded(self):
+        image = Image.open(FINGERPRINT_IMAGE)
+        self.addCleanup(image.close)
+        compacted = compact_image(image)
+        self.assertIsNotNone(compacted.im)
+        np.testing.assert_array_equal(np.array(compacted), np.array(self.grey))
+
+    def test_black_and_white_image(self):
+        image = self.grey.convert('1')
+        self.assertCompacted(image, 'L', image.convert('L'))
+
+    def test_colour_images(self):
+        colour = Image.merge('RGB', (self.grey, self.grey.point(lambda v: 255 - v), self.grey))
+        self.assertCompacted(colour, 'RGB', colour)
+        # Transparency is dropped, as the fingerprint's opacity is set when it is displayed:
+        translucent = colour.convert('RGBA')
+        translucent.putalpha(128)
+        self.assertCompacted(translucent, 'RGB', colour)
+        # A single pixel is enough to keep an image in colour:
+        nearly_grey = self.grey.convert('RGB')
+        nearly_grey.putpixel((10, 20), (0, 0, 1))
+        self.assertCompacted(nearly_grey, 'RGB', nearly_grey)
+
+
+if __name__ == '__main__':
+    unittest.main()